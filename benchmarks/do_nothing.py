@@ -16,8 +16,9 @@ MAX_TS = 1000
 ENV_NAME = "rte_case14_realistic"
 
 
-def main(max_ts, ENV_NAME):
+def main(max_ts, ENV_NAME, small_grid_threshold=None):
     backend = LightSimBackend()
+    backend.small_grid_threshold = small_grid_threshold
     param = Parameters()
     param.init_from_dict({"NO_OVERFLOW_DISCONNECTION": True})
 
@@ -45,9 +46,12 @@ if __name__ == "__main__":
                         help='Environment name to be used for the benchmark.')
     parser.add_argument('--number', type=int, default=MAX_TS,
                         help='Maximum number of time steps for which the benchamark will be run.')
+    parser.add_argument('--small_grid_threshold', type=int, default=None,
+                        help='Grids with at most this number of buses are solved with dense matrices (default: the '
+                             'one of lightsim2grid, that does not use them).')
 
     args = parser.parse_args()
 
     max_ts = int(args.number)
     name = str(args.name)
-    main(max_ts, name)
+    main(max_ts, name, args.small_grid_threshold)
@@ -0,0 +1,47 @@
+# Copyright (c) 2020, RTE (https://www.rte-france.com)
+# See AUTHORS.txt
+# This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+# If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+# you can obtain one at http://mozilla.org/MPL/2.0/.
+# SPDX-License-Identifier: MPL-2.0
+# This file is part of LightSim2grid, LightSim2grid a implements a c++ backend targeting the Grid2Op platform.
+
+import time
+import warnings
+import numpy as np
+import pandapower.networks as pn
+from lightsim2grid.initGridModel import init
+
+NB_RUN = 20
+CASES = ["case14", "case118", "case300", "case1354pegase", "case1888rte", "case2848rte", "case6515rte",
+         "case9241pegase"]
+
+
+def main(nb_run, cases):
+    print("{:>16} {:>8} {:>8} {:>14} {:>14}".format("grid", "nb bus", "nb br", "init (ms)", "std (ms)"))
+    for case_name in cases:
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            pp_net = getattr(pn, case_name)()
+        nb_branch = pp_net.line.shape[0] + pp_net.trafo.shape[0]
+        init(pp_net)  # warm up
+        times = np.zeros(nb_run)
+        for i in range(nb_run):
+            beg_ = time.perf_counter()
+            init(pp_net)
+            times[i] = time.perf_counter() - beg_
+        print("{:>16} {:>8} {:>8} {:>14.2f} {:>14.2f}".format(case_name, pp_net.bus.shape[0], nb_branch,
+                                                                1000. * np.median(times), 1000. * np.std(times)))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the conversion of pandapower grids of different sizes '
+                                                 'into GridModel (with "init")')
+    parser.add_argument('--number', type=int, default=NB_RUN,
+                        help='Number of conversions for each grid.')
+    parser.add_argument('--cases', nargs="+", default=CASES, type=str,
+                        help='Names of the pandapower.networks grids to use.')
+
+    args = parser.parse_args()
+    main(int(args.number), args.cases)
@@ -0,0 +1,75 @@
+# Copyright (c) 2020, RTE (https://www.rte-france.com)
+# See AUTHORS.txt
+# This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+# If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+# you can obtain one at http://mozilla.org/MPL/2.0/.
+# SPDX-License-Identifier: MPL-2.0
+# This file is part of LightSim2grid, LightSim2grid a implements a c++ backend targeting the Grid2Op platform.
+
+import os
+import time
+import zipfile
+import numpy as np
+from scipy import sparse
+from lightsim2grid_cpp import KLUSolver
+
+NB_RUN = 20
+MAX_IT = 30
+TOL = 1e-8
+CASES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lightsim2grid", "tests")
+# the "stressed" scenarios multiply all the injections by these factors
+STRESS = [1.0, 1.5, 2.0, 2.5, 3.0]
+
+
+def load_case(path):
+    res = {}
+    with zipfile.ZipFile(path) as myzip:
+        for nm in ["V0", "pq", "pv", "Sbus", "Ybus"]:
+            with myzip.open("{}.npy".format(nm)) as f:
+                res[nm] = np.load(f)
+    res["Ybus"] = sparse.csc_matrix(res["Ybus"])
+    return res
+
+
+def run_case(case, stress, line_search, nb_run):
+    solver = KLUSolver()
+    solver.set_line_search(line_search)
+    Sbus = stress * case["Sbus"]
+    times = np.zeros(nb_run)
+    for i in range(nb_run):
+        solver.reset()
+        beg_ = time.perf_counter()
+        conv = solver.do_newton(case["Ybus"], case["V0"], Sbus, case["pv"], case["pq"], MAX_IT, TOL)
+        times[i] = time.perf_counter() - beg_
+    return conv, solver.get_nb_iter(), solver.get_nb_backtrack(), solver.get_error(), np.median(times)
+
+
+def main(nb_run, stress_factors):
+    print("{:>12} {:>7} | {:>5} {:>5} {:>10} | {:>5} {:>5} {:>5} {:>10}".format(
+        "grid", "stress", "conv", "iter", "time (ms)", "conv", "iter", "halv.", "time (ms)"))
+    print("{:>12} {:>7} | {:^22} | {:^28}".format("", "", "full newton step", "line search"))
+    for path in sorted(os.listdir(CASES_DIR)):
+        case_name, ext = os.path.splitext(path)
+        if ext != ".zip":
+            continue
+        case = load_case(os.path.join(CASES_DIR, path))
+        for stress in stress_factors:
+            conv, nb_iter, _, _, time_ = run_case(case, stress, False, nb_run)
+            conv_ls, nb_iter_ls, nb_halv, _, time_ls = run_case(case, stress, True, nb_run)
+            print("{:>12} {:>7.2f} | {:>5} {:>5} {:>10.3f} | {:>5} {:>5} {:>5} {:>10.3f}".format(
+                case_name, stress, str(conv), nb_iter, 1000. * time_, str(conv_ls), nb_iter_ls, nb_halv,
+                1000. * time_ls))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the newton raphson with and without line search on the '
+                                                 'cases used by the tests, with all the injections multiplied by '
+                                                 'a "stress" factor')
+    parser.add_argument('--number', type=int, default=NB_RUN,
+                        help='Number of powerflows for each case.')
+    parser.add_argument('--stress', nargs="+", default=STRESS, type=float,
+                        help='Factors applied to the injections.')
+
+    args = parser.parse_args()
+    main(int(args.number), args.stress)
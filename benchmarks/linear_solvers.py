@@ -0,0 +1,79 @@
+# Copyright (c) 2020, RTE (https://www.rte-france.com)
+# See AUTHORS.txt
+# This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+# If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+# you can obtain one at http://mozilla.org/MPL/2.0/.
+# SPDX-License-Identifier: MPL-2.0
+# This file is part of LightSim2grid, LightSim2grid a implements a c++ backend targeting the Grid2Op platform.
+
+import os
+import time
+import zipfile
+import numpy as np
+from scipy import sparse
+from lightsim2grid_cpp import KLUSolver, LinearSolverType
+
+NB_RUN = 20
+MAX_IT = 10
+TOL = 1e-8
+CASES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lightsim2grid", "tests")
+SOLVERS = {"KLU": LinearSolverType.KLU,
+           "SparseLU": LinearSolverType.SparseLU,
+           "DenseLU": LinearSolverType.DenseLU}
+# the dense solver is far too slow (and uses too much memory) above this size
+MAX_SIZE_DENSE = 1000
+
+
+def load_case(path):
+    res = {}
+    with zipfile.ZipFile(path) as myzip:
+        for nm in ["V0", "pq", "pv", "Sbus", "Ybus"]:
+            with myzip.open("{}.npy".format(nm)) as f:
+                res[nm] = np.load(f)
+    res["Ybus"] = sparse.csc_matrix(res["Ybus"])
+    return res
+
+
+def run_case(case, solver_type, nb_run):
+    solver = KLUSolver()
+    solver.set_linear_solver(solver_type)
+    times = np.zeros(nb_run)
+    for i in range(nb_run):
+        solver.reset()
+        beg_ = time.perf_counter()
+        conv = solver.do_newton(case["Ybus"], case["V0"], case["Sbus"], case["pv"], case["pq"], MAX_IT, TOL)
+        times[i] = time.perf_counter() - beg_
+    return conv, solver.get_nb_iter(), np.median(times)
+
+
+def main(nb_run, solver_names):
+    print("{:>12} {:>6} | ".format("grid", "n_bus") + " | ".join("{:^22}".format(nm) for nm in solver_names))
+    print("{:>12} {:>6} | ".format("", "") + " | ".join("{:>5} {:>5} {:>10}".format("conv", "iter", "time (ms)")
+                                                       for _ in solver_names))
+    for path in sorted(os.listdir(CASES_DIR)):
+        case_name, ext = os.path.splitext(path)
+        if ext != ".zip":
+            continue
+        case = load_case(os.path.join(CASES_DIR, path))
+        n_bus = case["V0"].shape[0]
+        res = []
+        for nm in solver_names:
+            if SOLVERS[nm] == LinearSolverType.DenseLU and n_bus > MAX_SIZE_DENSE:
+                res.append("{:^22}".format("skipped"))
+                continue
+            conv, nb_iter, time_ = run_case(case, SOLVERS[nm], nb_run)
+            res.append("{:>5} {:>5} {:>10.3f}".format(str(conv), nb_iter, 1000. * time_))
+        print("{:>12} {:>6} | ".format(case_name, n_bus) + " | ".join(res))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark the newton raphson with the different linear solvers '
+                                                 'available on the cases used by the tests')
+    parser.add_argument('--number', type=int, default=NB_RUN,
+                        help='Number of powerflows for each case.')
+    parser.add_argument('--solvers', nargs="+", default=list(SOLVERS), choices=list(SOLVERS),
+                        help='Linear solvers to compare.')
+
+    args = parser.parse_args()
+    main(int(args.number), args.solvers)
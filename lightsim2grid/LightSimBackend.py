@@ -7,20 +7,20 @@
 # This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
 
 import copy
+import time
 import numpy as np
-from grid2op.Action import CompleteAction
-from grid2op.dtypes import dt_int
 
 import pdb
 
 try:
     # TODO will be deprecated in future version
+    from grid2op.Action import CompleteAction
     from grid2op.Backend import Backend
     # from grid2op.BackendPandaPower import PandaPowerBackend
     from grid2op.Backend import PandaPowerBackend
     from grid2op.Exceptions import InvalidLineStatus, BackendError, DivergingPowerFlow
     from grid2op.Action._BackendAction import _BackendAction
-    from grid2op.dtypes import dt_float, dt_int
+    from grid2op.dtypes import dt_float, dt_int, dt_bool
     grid2op_installed = True
 except (ImportError, ModuleNotFoundError) as e:
     grid2op_installed = False
@@ -31,6 +31,8 @@ except (ImportError, ModuleNotFoundError) as e:
             pass
 
 from lightsim2grid.initGridModel import init
+from lightsim2grid_cpp import LinearSolverType
+from lightsim2grid.warmStart import VoltageCache, InitPolicy, VoltagePredictor
 
 
 class LightSimBackend(Backend):
@@ -54,13 +56,42 @@ class LightSimBackend(Backend):
         # it is done to keep track of the redispatching
 
         self.topo_vect = None
+        self._last_topo_vect = None
         self.shunt_topo_vect = None
 
-        self.init_pp_backend = PandaPowerBackend()
+        # pandapower backend used to read the grid. It is released at the end of "load_grid" (the
+        # GridModel is copied natively) unless "keep_pp_backend" is set to True before loading the grid. Each copy
+        # of the backend is then about 0.4MB smaller on rte_case14_realistic (1.1MB on rte_case118_example).
+        self.init_pp_backend = None
+        self.keep_pp_backend = False
 
         self.V = None
+        # converged voltages of the last topologies encountered, to start the powerflow from the closest one
+        self.voltage_cache = VoltageCache()
+        # chooses how to initialize the voltages of each powerflow, depending on what has been modified (_dirty)
+        self.init_policy = InitPolicy()
+        self._dirty = InitPolicy.TOPOLOGY
+        # optional extrapolation of the last solutions (for time series with a fixed topology), for example
+        # VoltagePredictor(order=2)
+        self.voltage_predictor = None
         self.max_it = 10
         self.tol = 1e-8  # tolerance for the solver
+        # if the grid is split, each connected component with a generator is solved separately (the first generator of
+        # each component compensates its losses) instead of making the powerflow fail. Used by "load_grid".
+        self.solve_islands = False
+        # grids with at most this number of buses are solved with dense matrices (see
+        # GridModel.set_small_grid_threshold), None keeps the default of the GridModel (0, always sparse matrices). Used
+        # by "load_grid".
+        self.small_grid_threshold = None
+        # options of KLU (ordering, btf, scale), see GridModel.set_klu_options, None keeps the defaults. Used by
+        # "load_grid". If "autotune_klu" is True (and the options are not set), the fastest options for the jacobian
+        # matrix of the first powerflow solved with KLU are chosen, and stored there. Nothing is tuned while the
+        # powerflows use dense matrices (grids smaller than "small_grid_threshold").
+        self.klu_options = None
+        self.autotune_klu = False
+        # time and number of calls of the phases of "apply_action" and "runpf" done in python (see set_profiling), None
+        # if the profiling is disabled
+        self._profile = None
 
         self.prod_pu_to_kv = None
         self.load_pu_to_kv = None
@@ -100,10 +131,16 @@ class LightSimBackend(Backend):
 
     def load_grid(self, path=None, filename=None):
 
-        # if self.init_pp_backend is None:
+        self.init_pp_backend = PandaPowerBackend()
         self.init_pp_backend.load_grid(path, filename)
 
         self._grid = init(self.init_pp_backend._grid)
+        self._grid.set_solve_islands(self.solve_islands)
+        self._grid.set_profiling(self._profile is not None)
+        if self.small_grid_threshold is not None:
+            self._grid.set_small_grid_threshold(self.small_grid_threshold)
+        if self.klu_options is not None:
+            self._grid.set_klu_options(*self.klu_options)
 
         self.n_line = self.init_pp_backend.n_line
         self.n_gen = self.init_pp_backend.n_gen
@@ -178,6 +215,8 @@ class LightSimBackend(Backend):
         self.nb_obj_per_bus = np.zeros(2 * self.__nb_bus_before, dtype=np.int)
 
         self.topo_vect = np.ones(self.dim_topo, dtype=np.int)
+        # last bus each element was connected to (used to reconnect the powerlines in "simulate_actions")
+        self._last_topo_vect = np.ones(self.dim_topo, dtype=np.int)
         if self.shunts_data_available:
             self.shunt_topo_vect = np.ones(self.n_shunt, dtype=np.int)
 
@@ -205,6 +244,11 @@ class LightSimBackend(Backend):
         self._init_action_to_set = self._backend_action_class()
         self._init_action_to_set += _init_action_to_set
 
+        if not self.keep_pp_backend:
+            # everything has been read, the pandapower grid is not needed anymore
+            self.init_pp_backend.close()
+            self.init_pp_backend = None
+
     def _count_object_per_bus(self):
         # should be called only when self.topo_vect and self.shunt_topo_vect are set
         # todo factor that more properly to update it when it's modified, and not each time
@@ -245,7 +289,8 @@ class LightSimBackend(Backend):
                 self._grid.reactivate_bus(bus_id)
 
     def close(self):
-        self.init_pp_backend.close()
+        if self.init_pp_backend is not None:
+            self.init_pp_backend.close()
         self._grid = None
 
     def _convert_id_topo(self, id_big_topo):
@@ -270,7 +315,12 @@ class LightSimBackend(Backend):
         """
         Specific implementation of the method to apply an action modifying a powergrid in the pandapower format.
         """
+        profile = self._profile is not None
+        if profile:
+            beg_ = time.perf_counter()
         active_bus, (prod_p, prod_v, load_p, load_q), topo__, shunts__ = backendAction()
+        if profile:
+            beg_ = self._add_profile("apply_action.read", beg_)
 
         # handle active bus
         for i, (bus1_status, bus2_status) in enumerate(active_bus):
@@ -283,41 +333,58 @@ class LightSimBackend(Backend):
                 self._grid.reactivate_bus(i + self.__nb_bus_before)
             else:
                 self._grid.deactivate_bus(i + self.__nb_bus_before)
+        if profile:
+            beg_ = self._add_profile("apply_action.bus", beg_)
+
+        if self.shunts_data_available:
+            shunt_p, shunt_q, shunt_bus = shunts__
+        else:
+            shunt_p, shunt_q, shunt_bus = (), (), ()
 
         # update the injections
+        modif_inj = False
+        modif_topo = False
         for gen_id, new_p in prod_p:
             self._grid.change_p_gen(gen_id, new_p)
+            modif_inj = True
 
         for gen_id, new_v in prod_v:
             new_v /= self.prod_pu_to_kv[gen_id]
             self._grid.change_v_gen(gen_id, new_v)
+            modif_inj = True
 
         for load_id, new_p in load_p:
             self._grid.change_p_load(load_id, new_p)
+            modif_inj = True
 
         for load_id, new_q in load_q:
             self._grid.change_q_load(load_id, new_q)
+            modif_inj = True
 
         # handle shunts
-        if self.shunts_data_available:
-            shunt_p, shunt_q, shunt_bus = shunts__
-            for sh_id, new_p in shunt_p:
-                self._grid.change_p_shunt(sh_id, new_p)
-            for sh_id, new_q in shunt_q:
-                self._grid.change_q_shunt(sh_id, new_q)
-
-            # shunt topology
-            for sh_id, new_bus in shunt_bus:
-                if new_bus == -1:
-                    self._grid.deactivate_shunt(sh_id)
-                else:
-                    self._grid.reactivate_shunt(sh_id)
-                    self._grid.change_bus_shunt(sh_id, new_bus)
+        for sh_id, new_p in shunt_p:
+            self._grid.change_p_shunt(sh_id, new_p)
+            modif_inj = True
+        for sh_id, new_q in shunt_q:
+            self._grid.change_q_shunt(sh_id, new_q)
+            modif_inj = True
+        if profile:
+            beg_ = self._add_profile("apply_action.injection", beg_)
+
+        # shunt topology
+        for sh_id, new_bus in shunt_bus:
+            modif_topo = True
+            if new_bus == -1:
+                self._grid.deactivate_shunt(sh_id)
+            else:
+                self._grid.reactivate_shunt(sh_id)
+                self._grid.change_bus_shunt(sh_id, new_bus)
 
         # and now change the overall topology
         for id_el, new_bus in topo__:
             id_el_backend, type_obj = self._convert_id_topo(id_el)
             self.topo_vect[id_el] = new_bus
+            modif_topo = True
 
             if type_obj == "load":
                 if new_bus > 0:
@@ -365,6 +432,56 @@ class LightSimBackend(Backend):
                         self._grid.reactivate_trafo(id_el_backend)
                         self._grid.change_bus_trafo_lv(id_el_backend, new_bus_backend)
 
+        if modif_topo:
+            self._dirty = InitPolicy.TOPOLOGY
+            connected = self.topo_vect > 0
+            self._last_topo_vect[connected] = self.topo_vect[connected]
+        elif modif_inj and self._dirty == InitPolicy.NONE:
+            self._dirty = InitPolicy.INJECTION
+        if profile:
+            self._add_profile("apply_action.topology", beg_)
+
+    def set_profiling(self, profiling):
+        """
+        Record (or not) the time (in s) and the number of calls of each phase of the powerflows (see
+        GridModel.set_profiling) and of the python phases of "apply_action" and "runpf". The profile is cumulated
+        until "reset_profile" is called, see "get_profile". When the profiling is disabled, nothing is measured and
+        the profile is empty. Each call starts a new profile.
+        """
+        self._profile = {} if profiling else None
+        if getattr(self, "_grid", None) is not None:
+            self._grid.set_profiling(profiling)
+            self._grid.reset_profile()
+
+    def reset_profile(self):
+        if self._profile is not None:
+            self._profile = {}
+        if getattr(self, "_grid", None) is not None:
+            self._grid.reset_profile()
+
+    def get_profile(self):
+        """
+        Returns a dictionnary {phase: (time, number of calls)} with the phases of the GridModel ("ybus", "sbus",
+        "pv_pq", "analyze", "factor", "refactor", "solve", "jacobian", "mismatch", "newton", "results_init" (what the
+        results need from the topology, computed when it changed), "results", "ac_pf" and "dc_pf") and the python
+        ones ("apply_action.read", "apply_action.bus", "apply_action.injection", "apply_action.topology" and
+        "runpf.results"). It is empty if the profiling is disabled.
+        """
+        res = {}
+        if self._profile is None:
+            return res
+        if getattr(self, "_grid", None) is not None:
+            res.update(self._grid.get_profile())
+        res.update({phase: tuple(val) for phase, val in self._profile.items()})
+        return res
+
+    def _add_profile(self, phase, beg_):
+        end_ = time.perf_counter()
+        val = self._profile.setdefault(phase, [0., 0])
+        val[0] += end_ - beg_
+        val[1] += 1
+        return end_
+
     def runpf(self, is_dc=False):
         try:
             if is_dc:
@@ -373,22 +490,34 @@ class LightSimBackend(Backend):
                     self.V = np.ones(self.nb_bus_total, dtype=np.complex_)
                 self.V = self._grid.dc_pf(self.V, self.max_it, self.tol)
             else:
-                if self.V is None:
-                    # init from dc approx in this case
-                    self.V = np.ones(self.nb_bus_total, dtype=np.complex_) * 1.04
-
-                if self.initdc:
-                    V = self._grid.dc_pf(self.V, self.max_it, self.tol)
-                    if V.shape[0] == 0:
-                        # V = self._grid.ac_pf(self.V, self.max_it, self.tol)
-                        raise DivergingPowerFlow("divergence of powerflow (non connected grid)")
-                    self.V[:] = V
-
-                V = self._grid.ac_pf(self.V, self.max_it, self.tol)
+                V_cache, same_topo = self.voltage_cache.get(self.topo_vect)
+                category = self._dirty
+                self._dirty = InitPolicy.NONE
+                policy = self.init_policy.choose(category, self.V is not None, V_cache is not None, same_topo,
+                                                 initdc=self.initdc)
+                if self.voltage_predictor is not None:
+                    if category == InitPolicy.TOPOLOGY or self.V is None:
+                        self.voltage_predictor.clear()
+                    elif policy == InitPolicy.LAST_AC and self.voltage_predictor.ready():
+                        policy = InitPolicy.EXTRAPOLATED
+                V = self._ac_pf_from(policy, category, V_cache)
+                if V.shape[0] == 0:
+                    # no retry if the grid cannot be solved anyway
+                    self._check_islands()
+                if V.shape[0] == 0 and policy != InitPolicy.DC and self.init_policy.retry_dc:
+                    # the fast initialization diverged, the dc approximation is more robust
+                    self.init_policy.nb_retry += 1
+                    V = self._ac_pf_from(InitPolicy.DC, category, V_cache)
                 if V.shape[0] == 0:
                     # V = self._grid.ac_pf(self.V, self.max_it, self.tol)
                     raise DivergingPowerFlow("divergence of powerflow")
-                self.V[:] = V
+                self.V = V
+                self.voltage_cache.add(self.topo_vect, self.V)
+                if self.voltage_predictor is not None:
+                    self.voltage_predictor.add(self.V)
+                profile = self._profile is not None
+                if profile:
+                    beg_ = time.perf_counter()
                 # self.V[self.V == 0.] = 1.
                 lpor, lqor, lvor, laor = self._grid.get_lineor_res()
                 lpex, lqex, lvex, laex = self._grid.get_lineex_res()
@@ -408,9 +537,15 @@ class LightSimBackend(Backend):
                 self.load_p[:], self.load_q[:], self.load_v[:] = self._grid.get_loads_res()
                 self.prod_p[:], self.prod_q[:], self.prod_v[:] = self._grid.get_gen_res()
                 self.next_prod_p[:] = self.prod_p
+                if profile:
+                    self._add_profile("runpf.results", beg_)
+                if self.autotune_klu and self.klu_options is None and \
+                        self._grid.get_linear_solver_used() == LinearSolverType.KLU:
+                    self.klu_options = self._grid.autotune_klu()
                 res = True
         except Exception as e:
             # of the powerflow has not converged, results are Nan
+            self.V = None
             self.p_or[:] = np.NaN
             self.q_or[:] = np.NaN
             self.v_or[:] = np.NaN
@@ -429,23 +564,188 @@ class LightSimBackend(Backend):
             res = False
         return res
 
+    def simulate_actions(self, actions, nb_thread=1):
+        """
+        Evaluates many actions (for example all the candidates of a topology search agent) from the current state of
+        the grid, without modifying it. The powerflows are computed in parallel (with `nb_thread` threads) without
+        copying the backend.
+
+        Only the topological part of the actions (buses of the elements and status of the powerlines) is taken into
+        account, the injections are the ones of the current state. As in grid2op, a powerline that is reconnected
+        without specifying its buses is reconnected to the buses it was last connected to.
+
+        Parameters
+        ----------
+        actions: ``list``
+            The grid2op actions to evaluate
+
+        nb_thread: ``int``
+            Number of threads used to compute the powerflows
+
+        Returns
+        -------
+        rho: ``numpy.ndarray``, float
+            The relative flows (current flow divided by the thermal limit), one row per action and one column per
+            powerline (NaN if the powerflow diverged)
+
+        p_or: ``numpy.ndarray``, float
+            The active flows at the origin side of the powerlines (MW), one row per action (NaN if the powerflow
+            diverged)
+
+        converged: ``numpy.ndarray``, bool
+            Whether the powerflow converged, for each action
+
+        """
+        nb_action = len(actions)
+        action_ptr = np.zeros(nb_action + 1, dtype=np.int32)
+        el_type = []
+        el_id = []
+        el_bus = []
+        bus_status = np.full((nb_action, self.nb_bus_total), fill_value=-1, dtype=np.int32)
+        sub_of_topo = np.repeat(np.arange(self.n_sub), self.sub_info)
+        for act_id, act in enumerate(actions):
+            topo = self._topo_vect_after(act)
+            for pos in np.where(topo != self.topo_vect)[0]:
+                new_bus = topo[pos]
+                id_el_backend, type_obj = self._convert_id_topo(pos)
+                if type_obj == "load":
+                    type_code = 0
+                    init_bus = self._init_bus_load[id_el_backend]
+                elif type_obj == "gen":
+                    type_code = 1
+                    init_bus = self._init_bus_gen[id_el_backend]
+                elif type_obj == "lineor":
+                    type_code = 2
+                    init_bus = self._init_bus_lor[id_el_backend]
+                else:
+                    type_code = 3
+                    init_bus = self._init_bus_lex[id_el_backend]
+                if type_code >= 2 and id_el_backend >= self.__nb_powerline:
+                    # it's a trafo
+                    type_code += 2
+                    id_el_backend -= self.__nb_powerline
+                el_type.append(type_code)
+                el_id.append(id_el_backend)
+                el_bus.append(self._klu_bus_from_grid2op_bus(new_bus, init_bus) if new_bus > 0 else -1)
+            action_ptr[act_id + 1] = len(el_type)
+            # only the buses with at least one element connected are active
+            active_bus = np.zeros((self.n_sub, 2), dtype=np.int32)
+            connected = topo > 0
+            active_bus[sub_of_topo[connected], topo[connected] - 1] = 1
+            bus_status[act_id, :self.__nb_bus_before] = active_bus[:, 0]
+            bus_status[act_id, self.__nb_bus_before:(2 * self.__nb_bus_before)] = active_bus[:, 1]
+
+        if self.V is not None:
+            # the buses that are disconnected now might be used by the actions
+            V0 = self._fill_disconnected_bus(1.0 * self.V)
+        else:
+            V0 = np.ones(self.nb_bus_total, dtype=np.complex_) * 1.04
+        converged, res_a, res_p = self._grid.simulate_topologies(V0, action_ptr,
+                                                                 np.array(el_type, dtype=np.int32),
+                                                                 np.array(el_id, dtype=np.int32),
+                                                                 np.array(el_bus, dtype=np.int32),
+                                                                 bus_status, self.max_it, self.tol, nb_thread)
+        rho = 1000. * res_a / self.thermal_limit_a
+        return rho, res_p, converged.astype(dt_bool)
+
+    def _topo_vect_after(self, action):
+        # topology of the grid after the action, following the rules of grid2op: the status of the powerlines is
+        # modified first (a reconnected powerline goes back to its last buses), then the buses of the elements
+        topo = 1 * self.topo_vect
+        or_pos = self.line_or_pos_topo_vect
+        ex_pos = self.line_ex_pos_topo_vect
+
+        switch_status = action._switch_line_status
+        if np.any(switch_status):
+            connected = (topo[or_pos] > 0) | (topo[ex_pos] > 0)
+            to_disc = switch_status & connected
+            to_reco = switch_status & ~connected
+            topo[or_pos[to_disc]] = -1
+            topo[ex_pos[to_disc]] = -1
+            topo[or_pos[to_reco]] = self._last_topo_vect[or_pos[to_reco]]
+            topo[ex_pos[to_reco]] = self._last_topo_vect[ex_pos[to_reco]]
+
+        set_status = action._set_line_status
+        if np.any(set_status != 0):
+            to_disc = set_status == -1
+            topo[or_pos[to_disc]] = -1
+            topo[ex_pos[to_disc]] = -1
+            for pos in (or_pos[set_status == 1], ex_pos[set_status == 1]):
+                pos = pos[topo[pos] == -1]
+                topo[pos] = self._last_topo_vect[pos]
+
+        change_bus = action._change_bus_vect & (topo > 0)
+        topo[change_bus] = 3 - topo[change_bus]
+        set_bus = action._set_topo_vect
+        topo[set_bus != 0] = set_bus[set_bus != 0]
+        return topo
+
+    def _ac_pf_from(self, policy, category, V_cache):
+        # run the ac powerflow starting from the initialization "policy" (see InitPolicy), returns an empty vector
+        # if it diverges
+        if policy == InitPolicy.CACHE:
+            V0 = self._fill_disconnected_bus(V_cache)
+        elif policy == InitPolicy.LAST_AC:
+            # the buses that are disconnected now might be used after a topology change
+            V0 = self._fill_disconnected_bus(1.0 * self.V)
+        elif policy == InitPolicy.EXTRAPOLATED:
+            V0 = self.voltage_predictor.predict()
+        elif policy == InitPolicy.DC and self.V is not None:
+            V0 = 1.0 * self.V
+        elif policy == InitPolicy.DC and V_cache is not None:
+            V0 = self._fill_disconnected_bus(V_cache)
+        else:
+            V0 = np.ones(self.nb_bus_total, dtype=np.complex_) * 1.04
+
+        if policy == InitPolicy.DC:
+            V = self._grid.dc_pf(V0, self.max_it, self.tol)
+            if V.shape[0] == 0:
+                self.init_policy.update(category, policy, 0, False)
+                self._check_islands()
+                raise DivergingPowerFlow("divergence of powerflow (non connected grid)")
+            V0[:] = V
+
+        V = self._grid.ac_pf(V0, self.max_it, self.tol)
+        self.init_policy.update(category, policy, self._grid.get_nb_iter(), V.shape[0] > 0)
+        return V
+
+    def _check_islands(self):
+        # the islanding check of the last powerflow tells if the grid could not be solved because it is split
+        status = self._grid.get_island_status()
+        if status == 1 and not self._grid.get_solve_islands():
+            raise DivergingPowerFlow("divergence of powerflow: the grid is split in {} connected components (set "
+                                     "\"solve_islands\" to solve each of them separately)"
+                                     "".format(self._grid.get_nb_components()))
+        if status == 2:
+            raise DivergingPowerFlow("divergence of powerflow: the grid is split in {} connected components, and at "
+                                     "least one of them has no connected generator"
+                                     "".format(self._grid.get_nb_components()))
+
+    def _fill_disconnected_bus(self, V):
+        # the buses that were disconnected when V was computed have a voltage of 0., they start from the voltage of
+        # the other bus of their substation instead (or 1. pu if it was disconnected too)
+        is_zero = V == 0.
+        if np.any(is_zero):
+            nb_bus = V.shape[0]
+            other_bus = (np.arange(nb_bus) + self.__nb_bus_before) % nb_bus
+            V[is_zero] = V[other_bus[is_zero]]
+            V[V == 0.] = 1.
+        return V
+
     def copy(self):
         mygrid = self._grid
         self._grid = None
-        inippbackend = self.init_pp_backend._grid
-        self.init_pp_backend._grid = None
+        inippbackend = None
+        if self.init_pp_backend is not None:
+            inippbackend = self.init_pp_backend._grid
+            self.init_pp_backend._grid = None
         res = copy.deepcopy(self)
-        res._grid = init(inippbackend)
-        #TODO I need a c++ method that would just copy the state of the grid (bus connection, powerlines connected etc.)
-        # TODO this could be done in a "get_action_to_set_me" and use to update obsenv for example!
+        # the GridModel is copied natively, with its full state (topology and injections)
+        res._grid = mygrid.copy()
         self._grid = mygrid
-        self.init_pp_backend._grid = inippbackend
-        # res.apply_action(self.get_action_to_set())
-
-        _action_to_set_act = self.get_action_to_set()
-        _action_to_set = self._backend_action_class()
-        _action_to_set += _action_to_set_act
-        res.apply_action(_action_to_set)
+        if inippbackend is not None:
+            self.init_pp_backend._grid = inippbackend
+            res.init_pp_backend._grid = copy.deepcopy(inippbackend)
         return res
 
     def get_line_status(self):
@@ -497,6 +797,7 @@ class LightSimBackend(Backend):
     def _disconnect_line(self, id_):
         self.topo_vect[self.line_ex_pos_topo_vect[id_]] = -1
         self.topo_vect[self.line_or_pos_topo_vect[id_]] = -1
+        self._dirty = InitPolicy.TOPOLOGY
         if id_ < self.__nb_powerline:
             self._grid.deactivate_powerline(id_)
         else:
@@ -504,6 +805,7 @@ class LightSimBackend(Backend):
 
     def reset(self, grid_path, grid_filename=None):
         self.V = None
+        self._dirty = InitPolicy.TOPOLOGY
         self._init_action_to_set.all_changed()
         self.apply_action(self._init_action_to_set)
         self._init_action_to_set.reset()
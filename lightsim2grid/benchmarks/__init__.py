@@ -0,0 +1,18 @@
+# Copyright (c) 2020, RTE (https://www.rte-france.com)
+# See AUTHORS.txt
+# This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+# If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+# you can obtain one at http://mozilla.org/MPL/2.0/.
+# SPDX-License-Identifier: MPL-2.0
+# This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+"""
+Benchmarks of lightsim2grid that do not need grid2op, on the cases used by the tests.
+
+- :mod:`lightsim2grid.benchmarks.suite` measures the main operations on each case and writes the results in a json
+  file: ``python -m lightsim2grid.benchmarks.suite --output res.json``
+- :mod:`lightsim2grid.benchmarks.compare` compares two of these files, and fails if the second one is slower:
+  ``python -m lightsim2grid.benchmarks.compare base.json res.json --threshold 0.1``
+"""
+
+__all__ = ["suite", "compare"]
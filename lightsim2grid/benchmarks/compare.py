@@ -0,0 +1,165 @@
+# Copyright (c) 2020, RTE (https://www.rte-france.com)
+# See AUTHORS.txt
+# This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+# If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+# you can obtain one at http://mozilla.org/MPL/2.0/.
+# SPDX-License-Identifier: MPL-2.0
+# This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+"""
+Compares two results of :mod:`lightsim2grid.benchmarks.suite` (a "base" one and a "new" one).
+
+For each case and each metric present in both, the ratio of the medians of the samples (new / base, so above 1 when
+the new version is slower) is given with a confidence interval, computed by bootstrap (the samples of both files
+are drawn again, with replacement, many times).
+
+A metric is a "regression" if the lower bound of its confidence interval is above ``1 + threshold``, that is if the
+new version is slower than the base one by more than the threshold, taking into account the noise of the measures.
+In that case the exit code is 1, as when a case or a metric of the base results is missing in the new ones (it
+could hide a regression). So it can be used to check a new version before deploying it:
+
+.. code-block:: bash
+
+    python -m lightsim2grid.benchmarks.suite --output base.json
+    # ... install the new version ...
+    python -m lightsim2grid.benchmarks.suite --output new.json
+    python -m lightsim2grid.benchmarks.compare base.json new.json --threshold 0.1
+
+"""
+
+import sys
+import json
+import numpy as np
+
+from lightsim2grid.benchmarks import suite
+
+THRESHOLD = 0.1
+CONFIDENCE = 0.95
+NB_BOOTSTRAP = 2000
+SEED = 0
+
+REGRESSION = "regression"
+IMPROVEMENT = "improvement"
+SIMILAR = "ok"
+
+
+def ratio_ci(samples_base, samples_new, confidence=CONFIDENCE, nb_bootstrap=NB_BOOTSTRAP, seed=SEED):
+    """
+    Ratio of the medians (new / base) of the samples, and its confidence interval (low, high) computed by bootstrap
+    """
+    samples_base = np.asarray(samples_base, dtype=float)
+    samples_new = np.asarray(samples_new, dtype=float)
+    if samples_base.shape[0] == 0 or samples_new.shape[0] == 0:
+        raise RuntimeError("Impossible to compare metrics without samples")
+    rng = np.random.RandomState(seed)
+    med_base = np.median(samples_base[rng.randint(0, samples_base.shape[0], (nb_bootstrap, samples_base.shape[0]))],
+                         axis=1)
+    med_new = np.median(samples_new[rng.randint(0, samples_new.shape[0], (nb_bootstrap, samples_new.shape[0]))],
+                        axis=1)
+    ratios = med_new / med_base
+    alpha = 100. * (1. - confidence) / 2.
+    ratio = np.median(samples_new) / np.median(samples_base)
+    return float(ratio), float(np.percentile(ratios, alpha)), float(np.percentile(ratios, 100. - alpha))
+
+
+def compare(res_base, res_new, threshold=THRESHOLD, confidence=CONFIDENCE, nb_bootstrap=NB_BOOTSTRAP, seed=SEED):
+    """
+    Compares all the metrics of all the cases present in both results (as returned by
+    :func:`lightsim2grid.benchmarks.suite.run_benchmarks` or read with :func:`lightsim2grid.benchmarks.suite.load`).
+
+    Returns the list of the comparisons (one dictionary per case and metric) and the list of the (case, metric) that
+    are only in one of the results (they are not compared).
+    """
+    res = []
+    missing = []
+    cases_base = res_base["cases"]
+    cases_new = res_new["cases"]
+    for case_name in sorted(set(cases_base.keys()) | set(cases_new.keys())):
+        metrics_base = cases_base[case_name]["metrics"] if case_name in cases_base else {}
+        metrics_new = cases_new[case_name]["metrics"] if case_name in cases_new else {}
+        for metric in sorted(set(metrics_base.keys()) | set(metrics_new.keys())):
+            if metric not in metrics_base or metric not in metrics_new:
+                missing.append((case_name, metric))
+                continue
+            samples_base = metrics_base[metric]["samples"]
+            samples_new = metrics_new[metric]["samples"]
+            ratio, ci_low, ci_high = ratio_ci(samples_base, samples_new, confidence, nb_bootstrap, seed)
+            if ci_low > 1. + threshold:
+                status = REGRESSION
+            elif ci_high < 1. - threshold:
+                status = IMPROVEMENT
+            else:
+                status = SIMILAR
+            res.append({"case": case_name,
+                        "metric": metric,
+                        "base": float(np.median(samples_base)),
+                        "new": float(np.median(samples_new)),
+                        "ratio": ratio,
+                        "ci_low": ci_low,
+                        "ci_high": ci_high,
+                        "status": status})
+    return res, missing
+
+
+def print_comparison(comparison, missing, confidence=CONFIDENCE):
+    print("{:>10} {:>10} {:>12} {:>12} {:>8} {:>17} {:>12}".format("case", "metric", "base (ms)", "new (ms)",
+                                                                     "ratio",
+                                                                     "{:.0f}% ci".format(100. * confidence),
+                                                                     "status"))
+    for el in comparison:
+        print("{:>10} {:>10} {:>12.4f} {:>12.4f} {:>8.3f} {:>8.3f} - {:>6.3f} {:>12}".format(
+            el["case"], el["metric"], 1000. * el["base"], 1000. * el["new"], el["ratio"], el["ci_low"],
+            el["ci_high"], el["status"]))
+    for case_name, metric in missing:
+        print("{:>10} {:>10} only in one of the results, not compared".format(case_name, metric))
+
+
+def main(args=None):
+    """
+    Compares the two files given on the command line, returns the exit code (1 if there are regressions or if
+    some metrics of the base results are not in the new ones, 0 otherwise).
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='Compares two results of lightsim2grid.benchmarks.suite and fails '
+                                                 '(exit code 1) if the new one is slower than the base one.')
+    parser.add_argument('base', type=str, help='Json file of the reference results.')
+    parser.add_argument('new', type=str, help='Json file of the results to check.')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='Relative slow down above which a metric is a regression (0.1 for 10%%).')
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE,
+                        help='Level of the confidence intervals of the ratios.')
+    parser.add_argument('--bootstrap', type=int, default=NB_BOOTSTRAP,
+                        help='Number of bootstrap samples used to compute the confidence intervals.')
+    parser.add_argument('--seed', type=int, default=SEED,
+                        help='Seed of the bootstrap.')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Json file where the comparison is saved (not saved by default).')
+    args = parser.parse_args(args)
+
+    res_base = suite.load(args.base)
+    comparison, missing = compare(res_base, suite.load(args.new), args.threshold, args.confidence, args.bootstrap,
+                                  args.seed)
+    print_comparison(comparison, missing, args.confidence)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"threshold": args.threshold,
+                       "confidence": args.confidence,
+                       "comparison": comparison,
+                       "missing": missing}, f, indent=1)
+
+    res = 0
+    regressions = [el for el in comparison if el["status"] == REGRESSION]
+    if regressions:
+        print("{} regression(s) above {:.1f}%".format(len(regressions), 100. * args.threshold))
+        res = 1
+    # the new metrics cannot be compared to anything, but the ones that disappeared might hide a regression
+    missing_new = [(case_name, metric) for case_name, metric in missing
+                   if metric in res_base["cases"].get(case_name, {}).get("metrics", {})]
+    if missing_new:
+        print("{} metric(s) of the base results missing in the new ones".format(len(missing_new)))
+        res = 1
+    return res
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+# Copyright (c) 2020, RTE (https://www.rte-france.com)
+# See AUTHORS.txt
+# This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+# If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+# you can obtain one at http://mozilla.org/MPL/2.0/.
+# SPDX-License-Identifier: MPL-2.0
+# This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+"""
+Benchmark of the main operations of lightsim2grid on the cases used by the tests (``case14.zip`` to ``case1888.zip``),
+without grid2op.
+
+For each case, the following "metrics" are measured (times in s):
+
+- ``newton``: newton raphson of the KLUSolver, on the Ybus / Sbus stored in the zip file
+- ``ac_pf``: first ac powerflow (from a flat start) of a GridModel that has never been solved, everything is built
+  (Ybus, Sbus, pv / pq buses, symbolic analysis...)
+- ``dc_pf``: dc powerflow of the GridModel
+- ``ybus``: building of Ybus (from scratch) during the ac powerflow above, measured with the profiling of the
+  GridModel
+- ``ybus_update``: update in place of Ybus after the disconnection or the reconnection of a powerline, measured
+  the same way
+- ``injection``: ac powerflow (from the last solution) after a change of the active value of a load
+- ``topology``: ac powerflow (from the last solution) after the disconnection or the reconnection of a powerline
+- ``results``: retrieving all the results of the GridModel in python
+
+The GridModel is built from the pandapower grid each case comes from. The zip files of the cases are shipped with
+lightsim2grid, another directory can be given with ``--cases_dir``. Each metric is measured a few times to "warm
+up" (not kept) and then a given number of times. The results, with all the samples, can be saved in a json file,
+see :func:`run_benchmarks` and :func:`save`.
+"""
+
+import os
+import json
+import time
+import zipfile
+import datetime
+import platform
+import warnings
+import numpy as np
+from scipy import sparse
+
+from lightsim2grid_cpp import KLUSolver
+from lightsim2grid.initGridModel import init
+
+FORMAT_VERSION = 2
+NB_RUN = 50
+NB_WARMUP = 5
+MAX_IT = 10
+TOL = 1e-8
+PERCENTILES = [5, 25, 50, 75, 95]
+CASES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests")
+# name of the zip file: name of the pandapower grid it comes from
+CASES = {"case14": "case14", "case30": "case30", "case118": "case118", "case300": "case300",
+         "case1888": "case1888rte"}
+METRICS = ["newton", "ac_pf", "dc_pf", "ybus", "ybus_update", "injection", "topology", "results"]
+
+
+def load_case(path):
+    res = {}
+    with zipfile.ZipFile(path) as myzip:
+        for nm in ["V0", "pq", "pv", "Sbus", "Ybus"]:
+            with myzip.open("{}.npy".format(nm)) as f:
+                res[nm] = np.load(f)
+    res["Ybus"] = sparse.csc_matrix(res["Ybus"])
+    return res
+
+
+def load_grid(case_name):
+    import pandapower.networks as pn
+    with warnings.catch_warnings():
+        # pandapower warns a lot when it creates a grid
+        warnings.simplefilter("ignore")
+        return getattr(pn, CASES[case_name])()
+
+
+def summarize(samples):
+    """
+    Statistics (mean, standard deviation, min, max and percentiles) of the samples of a metric, the samples are
+    kept too.
+    """
+    samples = np.asarray(samples, dtype=float)
+    res = {"nb_sample": int(samples.shape[0]),
+           "mean": float(np.mean(samples)),
+           "std": float(np.std(samples)),
+           "min": float(np.min(samples)),
+           "max": float(np.max(samples)),
+           "percentiles": {"p{}".format(q): float(np.percentile(samples, q)) for q in PERCENTILES},
+           "samples": samples.tolist()}
+    return res
+
+
+def time_it(fun, nb_run, nb_warmup, setup=None):
+    """
+    Time (in s) of the last `nb_run` calls to `fun`, after `nb_warmup` calls that are not kept. If given, `setup` is
+    called (and not timed) before each call. `fun` should return False if what it computes failed.
+    """
+    res = np.zeros(nb_run)
+    for run_id in range(-nb_warmup, nb_run):
+        if setup is not None:
+            setup()
+        beg_ = time.perf_counter()
+        ok = fun()
+        end_ = time.perf_counter()
+        if not ok:
+            raise RuntimeError("The benchmarked function failed (eg a powerflow diverged)")
+        if run_id >= 0:
+            res[run_id] = end_ - beg_
+    return res
+
+
+def _find_line(model, V):
+    # a powerline that can be disconnected without making the powerflow diverge
+    nb_line = len(model.get_lines_status())
+    for line_id in range(nb_line):
+        model.deactivate_powerline(line_id)
+        V_tmp = model.ac_pf(V, MAX_IT, TOL)
+        model.reactivate_powerline(line_id)
+        if V_tmp.shape[0] and model.get_island_status() == 0:
+            return line_id
+    raise RuntimeError("No powerline can be disconnected on this grid")
+
+
+def bench_case(case_name, nb_run=NB_RUN, nb_warmup=NB_WARMUP, cases_dir=CASES_DIR):
+    """
+    All the metrics of one case, see the documentation of the module.
+    """
+    samples = {}
+
+    # newton raphson only
+    path_case = os.path.join(cases_dir, "{}.zip".format(case_name))
+    if not os.path.exists(path_case):
+        raise RuntimeError("The case \"{}\" is not in \"{}\", the directory of the cases can be given with "
+                           "\"--cases_dir\"".format(case_name, cases_dir))
+    case = load_case(path_case)
+    solver = KLUSolver()
+    samples["newton"] = time_it(lambda: solver.do_newton(case["Ybus"], case["V0"], case["Sbus"], case["pv"],
+                                                         case["pq"], MAX_IT, TOL),
+                                nb_run, nb_warmup, setup=solver.reset)
+
+    # GridModel
+    net = load_grid(case_name)
+    model_init = init(net)  # never solved: its copies build everything at their first powerflow
+    model = model_init.copy()
+    nb_bus = net.bus.shape[0]
+    V_flat = np.ones(nb_bus, dtype=complex)
+    V = model.ac_pf(V_flat, MAX_IT, TOL)
+    if V.shape[0] == 0:
+        raise RuntimeError("The powerflow diverged for {}".format(case_name))
+    nb_iter = model.get_nb_iter()
+    line_id = _find_line(model, V)
+
+    state = {"model": model, "V": V, "run_id": 0}
+
+    def new_model():
+        state["model"] = model_init.copy()
+
+    def change_line_status(model_):
+        # the powerline is alternatively disconnected and reconnected, to always have something to compute
+        state["run_id"] += 1
+        if state["run_id"] % 2:
+            model_.deactivate_powerline(line_id)
+        else:
+            model_.reactivate_powerline(line_id)
+    samples["ac_pf"] = time_it(lambda: state["model"].ac_pf(V_flat, MAX_IT, TOL).shape[0] > 0, nb_run, nb_warmup,
+                               setup=new_model)
+    samples["dc_pf"] = time_it(lambda: model.dc_pf(V_flat, MAX_IT, TOL).shape[0] > 0, nb_run, nb_warmup)
+
+    # Ybus, measured by the GridModel itself during the ac powerflow
+    model_init.set_profiling(True)
+    ybus = np.zeros(nb_warmup + nb_run)
+    for run_id in range(nb_warmup + nb_run):
+        new_model()
+        state["model"].ac_pf(V_flat, MAX_IT, TOL)
+        ybus[run_id] = state["model"].get_profile()["ybus"][0]
+    ybus_update = np.zeros(nb_warmup + nb_run)
+    for run_id in range(nb_warmup + nb_run):
+        change_line_status(state["model"])
+        state["model"].reset_profile()
+        state["model"].ac_pf(V, MAX_IT, TOL)
+        ybus_update[run_id] = state["model"].get_profile()["ybus"][0]
+    samples["ybus"] = ybus[nb_warmup:]
+    samples["ybus_update"] = ybus_update[nb_warmup:]
+    model_init.set_profiling(False)
+
+    # powerflows starting from the last solution
+    load_p = 1. * net.load["p_mw"].values[0]
+
+    def resolve():
+        V_tmp = model.ac_pf(state["V"], MAX_IT, TOL)
+        if V_tmp.shape[0] == 0:
+            return False
+        state["V"] = V_tmp
+        return True
+
+    def change_injection():
+        state["run_id"] += 1
+        model.change_p_load(0, load_p * (1. + 0.01 * (state["run_id"] % 2)))
+    samples["injection"] = time_it(resolve, nb_run, nb_warmup, setup=change_injection)
+    model.change_p_load(0, load_p)
+
+    state["run_id"] = 0
+    samples["topology"] = time_it(resolve, nb_run, nb_warmup, setup=lambda: change_line_status(model))
+    model.reactivate_powerline(line_id)
+    resolve()
+
+    def get_results():
+        model.get_lineor_res()
+        model.get_lineex_res()
+        model.get_trafohv_res()
+        model.get_trafolv_res()
+        model.get_loads_res()
+        model.get_gen_res()
+        model.get_shunts_res()
+        return True
+    samples["results"] = time_it(get_results, nb_run, nb_warmup)
+
+    res = {"nb_bus": nb_bus,
+           "nb_line": int(net.line.shape[0]),
+           "nb_trafo": int(net.trafo.shape[0]),
+           "nb_iter": nb_iter,
+           "metrics": {metric: summarize(samples[metric]) for metric in METRICS}}
+    return res
+
+
+def _get_version():
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution("LightSim2Grid").version
+    except Exception:
+        return None
+
+
+def run_benchmarks(cases=None, nb_run=NB_RUN, nb_warmup=NB_WARMUP, cases_dir=CASES_DIR, verbose=False):
+    """
+    Runs the benchmark on the given cases (all of them by default), the result can be saved with :func:`save`.
+    """
+    if cases is None:
+        cases = list(CASES.keys())
+    res = {"format_version": FORMAT_VERSION,
+           "info": {"date": datetime.datetime.now().isoformat(),
+                    "lightsim2grid": _get_version(),
+                    "numpy": np.__version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "processor": platform.processor()},
+           "config": {"nb_run": nb_run,
+                      "nb_warmup": nb_warmup,
+                      "max_iter": MAX_IT,
+                      "tol": TOL,
+                      "unit": "s"},
+           "cases": {}}
+    for case_name in cases:
+        if case_name not in CASES:
+            raise RuntimeError("Unknown case \"{}\", available cases are {}".format(case_name, sorted(CASES.keys())))
+        res["cases"][case_name] = bench_case(case_name, nb_run, nb_warmup, cases_dir)
+        if verbose:
+            print_case(case_name, res["cases"][case_name])
+    return res
+
+
+def save(res, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=1)
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        res = json.load(f)
+    if res.get("format_version") != FORMAT_VERSION:
+        raise RuntimeError("The file \"{}\" has not been written by this version of the benchmark suite".format(path))
+    return res
+
+
+def print_case(case_name, res_case):
+    print("{} ({} buses)".format(case_name, res_case["nb_bus"]))
+    print("{:>12} {:>10} {:>10} {:>10}".format("metric", "p5 (ms)", "p50 (ms)", "p95 (ms)"))
+    for metric in METRICS:
+        percentiles = res_case["metrics"][metric]["percentiles"]
+        print("{:>12} {:>10.4f} {:>10.4f} {:>10.4f}".format(metric, 1000. * percentiles["p5"],
+                                                             1000. * percentiles["p50"], 1000. * percentiles["p95"]))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark lightsim2grid (without grid2op) on the cases used by the '
+                                                 'tests, and save the results in a json file')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Json file where the results are saved (not saved by default).')
+    parser.add_argument('--number', type=int, default=NB_RUN,
+                        help='Number of times each metric is measured.')
+    parser.add_argument('--warmup', type=int, default=NB_WARMUP,
+                        help='Number of runs (not kept) before the measures.')
+    parser.add_argument('--cases', nargs="+", default=list(CASES.keys()), choices=list(CASES.keys()),
+                        help='Cases to benchmark.')
+    parser.add_argument('--cases_dir', type=str, default=CASES_DIR,
+                        help='Directory of the zip files of the cases.')
+
+    args = parser.parse_args()
+    res = run_benchmarks(args.cases, int(args.number), int(args.warmup), args.cases_dir, verbose=True)
+    if args.output is not None:
+        save(res, args.output)
@@ -280,7 +280,8 @@ class KLU4Pandapower():
         J = self.solver.get_J()
         success = self.solver.converged()
         iterations = self.solver.get_nb_iter()
-        # timer_Fx_, timer_solve_, timer_initialize_, timer_check_, timer_dSbus_, timer_fillJ_, timer_total_nr_
+        # timer_Fx_, timer_solve_, timer_initialize_, timer_check_, timer_dSbus_, timer_fillJ_, timer_total_nr_,
+        # nb_refactor, nb_solve_only
         timers = self.solver.get_timers()
         et_ = time() - t0_
         # ---------------------- pp.pypower.newtonpf ---------------------
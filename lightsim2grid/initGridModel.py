@@ -8,6 +8,8 @@
 
 """
 Use the pandapower converter to properly initialized a GridModel c++ object.
+
+Matpower / pypower cases ("ppc") can also be used directly, without pandapower, with :func:`init_from_ppc`.
 """
 
 import numpy as np
@@ -47,95 +49,150 @@ def init(pp_net):
         The initialize gridmodel
 
     """
+    # gather once all the data needed, as contiguous numpy arrays (no pandas indexing afterwards)
+    bus_index = pp_net.bus.index.values
+    tmp_bus_ind = np.argsort(bus_index)
+    bus_vn_kv = np.ascontiguousarray(pp_net.bus["vn_kv"].values[tmp_bus_ind], dtype=np.float64)
+    # buses of the GridModel are the pandapower buses sorted by index: bus_lookup[pp_bus_id] is the model bus id
+    bus_lookup = np.full(np.max(bus_index) + 1, fill_value=-1, dtype=np.int)
+    bus_lookup[bus_index[tmp_bus_ind]] = np.arange(bus_index.shape[0])
+
+    line = pp_net.line
+    line_length = line["length_km"].values
+    line_from = bus_lookup[line["from_bus"].values]
+    line_to = bus_lookup[line["to_bus"].values]
+
+    trafo = pp_net.trafo
+    trafo_hv = bus_lookup[trafo["hv_bus"].values]
+    trafo_lv = bus_lookup[trafo["lv_bus"].values]
+
     # initialize and use converters
     converter = PandaPowerConverter()
     converter.set_sn_mva(pp_net.sn_mva)  # TODO raise an error if not set !
     converter.set_f_hz(pp_net.f_hz)
     line_r, line_x, line_h = \
         converter.get_line_param(
-            pp_net.line["r_ohm_per_km"].values * pp_net.line["length_km"].values,
-            pp_net.line["x_ohm_per_km"].values * pp_net.line["length_km"].values,
-            pp_net.line["c_nf_per_km"].values * pp_net.line["length_km"].values,
-            pp_net.line["g_us_per_km"].values * pp_net.line["length_km"].values,
-            pp_net.bus.loc[pp_net.line["from_bus"]]["vn_kv"],
-            pp_net.bus.loc[pp_net.line["to_bus"]]["vn_kv"]
+            line["r_ohm_per_km"].values * line_length,
+            line["x_ohm_per_km"].values * line_length,
+            line["c_nf_per_km"].values * line_length,
+            line["g_us_per_km"].values * line_length,
+            bus_vn_kv[line_from],
+            bus_vn_kv[line_to]
         )
     trafo_r, trafo_x, trafo_b = \
-        converter.get_trafo_param(pp_net.trafo["vn_hv_kv"].values,
-                                  pp_net.trafo["vn_lv_kv"].values,
-                                  pp_net.trafo["vk_percent"].values,
-                                  pp_net.trafo["vkr_percent"].values,
-                                  pp_net.trafo["sn_mva"].values,
-                                  pp_net.trafo["pfe_kw"].values,
-                                  pp_net.trafo["i0_percent"].values,
-                                  pp_net.bus.loc[pp_net.trafo["lv_bus"]]["vn_kv"]
-                                       )
+        converter.get_trafo_param(trafo["vn_hv_kv"].values,
+                                  trafo["vn_lv_kv"].values,
+                                  trafo["vk_percent"].values,
+                                  trafo["vkr_percent"].values,
+                                  trafo["sn_mva"].values,
+                                  trafo["pfe_kw"].values,
+                                  trafo["i0_percent"].values,
+                                  bus_vn_kv[trafo_lv]
+                                  )
 
     # set up the data model accordingly
     model = GridModel()
-    tmp_bus_ind = np.argsort(pp_net.bus.index)
-    model.init_bus(pp_net.bus.iloc[tmp_bus_ind]["vn_kv"].values,
-                   pp_net.line.shape[0],
-                   pp_net.trafo.shape[0])
+    model.init_bus(bus_vn_kv,
+                   line.shape[0],
+                   trafo.shape[0])
 
     model.init_powerlines(line_r, line_x, line_h,
-                          pp_net.line["from_bus"].values,
-                          pp_net.line["to_bus"].values
-                               )
+                          line_from,
+                          line_to
+                          )
 
     # init the shunts
     model.init_shunt(pp_net.shunt["p_mw"].values,
                      pp_net.shunt["q_mvar"].values,
-                     pp_net.shunt["bus"].values
-                          )
+                     bus_lookup[pp_net.shunt["bus"].values]
+                     )
 
-    tap_step_pct = pp_net.trafo["tap_step_percent"].values
+    # copies are made here not to modify the pandapower grid
+    tap_step_pct = np.array(trafo["tap_step_percent"].values, dtype=np.float64)
     tap_step_pct[~np.isfinite(tap_step_pct)] = 0.
 
-    tap_pos = pp_net.trafo["tap_pos"].values
+    tap_pos = np.array(trafo["tap_pos"].values, dtype=np.float64)
+    is_tap_hv_side = trafo["tap_side"].values == "hv"
+    is_tap_hv_side[~np.isfinite(tap_pos)] = True
     tap_pos[~np.isfinite(tap_pos)] = 0.
 
-    is_tap_hv_side = pp_net.trafo["tap_side"].values == "hv"
-    is_tap_hv_side[~np.isfinite(tap_pos)] = True
     model.init_trafo(trafo_r,
                      trafo_x,
                      trafo_b,
                      tap_step_pct,
                      tap_pos,
                      is_tap_hv_side,
-                     pp_net.trafo["hv_bus"].values,
-                     pp_net.trafo["lv_bus"].values)
+                     trafo_hv,
+                     trafo_lv)
 
+    load_bus = bus_lookup[pp_net.load["bus"].values]
     model.init_loads(pp_net.load["p_mw"].values,
                      pp_net.load["q_mvar"].values,
-                     pp_net.load["bus"].values
-                          )
-    model.init_generators(pp_net.gen["p_mw"].values,
-                          pp_net.gen["vm_pu"].values,
-                          pp_net.gen["min_q_mvar"].values,
-                          pp_net.gen["max_q_mvar"].values,
-                          pp_net.gen["bus"].values
+                     load_bus
+                     )
+    gen_p = pp_net.gen["p_mw"].values
+    gen_v = pp_net.gen["vm_pu"].values
+    gen_min_q = pp_net.gen["min_q_mvar"].values
+    gen_max_q = pp_net.gen["max_q_mvar"].values
+    gen_bus = bus_lookup[pp_net.gen["bus"].values]
+    model.init_generators(gen_p,
+                          gen_v,
+                          gen_min_q,
+                          gen_max_q,
+                          gen_bus
                           )
 
     # TODO handle that better maybe, and warn only one slack bus is implemented
-    if np.any(pp_net.gen["slack"].values):
-        slack_gen_id = np.where(pp_net.gen["slack"].values)[0]
+    gen_slack = pp_net.gen["slack"].values
+    if np.any(gen_slack):
+        slack_gen_id = np.where(gen_slack)[0]
     else:
         # there is no slack bus in the generator of the pp grid
 
         # first i try to see if a generator is connected to a slack bus
-        slack_bus_id = pp_net.ext_grid["bus"].values[0]
-        if np.any(pp_net.gen["bus"].values == slack_bus_id):
-            slack_gen_id = np.where(pp_net.gen["bus"].values == slack_bus_id)[0]
+        slack_bus_id = bus_lookup[pp_net.ext_grid["bus"].values[0]]
+        if np.any(gen_bus == slack_bus_id):
+            slack_gen_id = np.where(gen_bus == slack_bus_id)[0]
         else:
             # no gen is connected to a slack bus, so i create one.
-            gen_p = np.concatenate((pp_net.gen["p_mw"].values, [np.sum(pp_net.load["p_mw"]) - np.sum(pp_net.gen["p_mw"])]))
-            gen_v = np.concatenate((pp_net.gen["vm_pu"].values, [pp_net.ext_grid["vm_pu"].values[0]]))
-            gen_bus = np.concatenate((pp_net.gen["bus"].values, [slack_bus_id]))
-            gen_min_q = np.concatenate((pp_net.gen["min_q_mvar"].values, [-999999.]))
-            gen_max_q = np.concatenate((pp_net.gen["max_q_mvar"].values, [+99999.]))
+            gen_p = np.concatenate((gen_p, [np.sum(pp_net.load["p_mw"].values) - np.sum(gen_p)]))
+            gen_v = np.concatenate((gen_v, [pp_net.ext_grid["vm_pu"].values[0]]))
+            gen_bus = np.concatenate((gen_bus, [slack_bus_id]))
+            gen_min_q = np.concatenate((gen_min_q, [-999999.]))
+            gen_max_q = np.concatenate((gen_max_q, [+99999.]))
             model.init_generators(gen_p, gen_v, gen_min_q, gen_max_q, gen_bus)
-            slack_gen_id = pp_net.gen["bus"].shape[0]
+            slack_gen_id = gen_slack.shape[0]
 
     model.add_gen_slackbus(slack_gen_id)
-    return model
\ No newline at end of file
+    return model
+
+def init_from_ppc(ppc):
+    """
+    Convert a matpower / pypower case ("ppc") into a GridModel, without using pandapower.
+
+    The conversion itself is done in c++ (see `GridModel.init_from_ppc`), columns of the matrices follow the
+    matpower convention: powers are in MW / MVAr and branch parameters are pair unit on the "baseMVA" base.
+
+    Cases for which conversion is not possible include, but are not limited to:
+
+    - some transformers are phase shifters (non zero "SHIFT")
+    - no generator in service is connected to the reference bus (type 3)
+    - some `GS` for some buses are not zero (same limitation as `p_mw` of shunts in :func:`init`)
+
+    Parameters
+    ----------
+    ppc: ``dict``
+        The case, with at least the keys "baseMVA", "bus", "branch" and "gen"
+
+    Returns
+    -------
+    model: :class:`GridModel`
+        The initialize gridmodel
+
+    """
+    model = GridModel()
+    model.init_from_ppc(float(ppc["baseMVA"]),
+                        np.ascontiguousarray(np.real(ppc["bus"]), dtype=np.float64),
+                        np.ascontiguousarray(np.real(ppc["branch"]), dtype=np.float64),
+                        np.ascontiguousarray(np.real(ppc["gen"]), dtype=np.float64))
+    return model
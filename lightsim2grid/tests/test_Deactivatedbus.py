@@ -27,6 +27,11 @@ class MakeACTestsDisco(BaseTests, unittest.TestCase):
         self.tol = 1e-8  # tolerance for the solver
         self.tol_test = 1e-5  # tolerance for the test (2 matrices are equal if the l_1 of their difference is less than this)
 
+    def make_model(self):
+        model = init(self.net_datamodel)
+        model.deactivate_bus(self.last_real_bus)
+        return model
+
     def run_me_pf(self, V0):
         return self.model.ac_pf(V0, self.max_it, self.tol)
 
@@ -53,6 +58,11 @@ class MakeDCTestsDisco(BaseTests, unittest.TestCase):
         self.tol = 1e-8  # tolerance for the solver
         self.tol_test = 1e-5  # tolerance for the test (2 matrices are equal if the l_1 of their difference is less than this)
 
+    def make_model(self):
+        model = init(self.net_datamodel)
+        model.deactivate_bus(self.last_real_bus)
+        return model
+
     def run_me_pf(self, V0):
         return self.model.dc_pf(V0, self.max_it, self.tol)
 
@@ -4,6 +4,7 @@ import pandapower.networks as pn
 import pandapower as pp
 
 from lightsim2grid.initGridModel import init
+from lightsim2grid_cpp import LinearSolverType
 import pdb
 
 
@@ -84,6 +85,10 @@ class BaseTests:
             1j * net.ext_grid["va_degree"].values / 360. * 2 * np.pi)
         return V0
 
+    def make_model(self):
+        # model in the same state as self.model after setUp
+        return init(self.net_datamodel)
+
     def run_me_pf(self, V0):
         return self.model.compute_newton(V0, self.max_it, self.tol)
 
@@ -184,6 +189,53 @@ class BaseTests:
         Vfinal = self._run_both_pf(self.net_ref)
         self.check_res(Vfinal, self.net_ref)
 
+    def test_pf_linear_solver(self):
+        # same results with all the linear solvers
+        self.do_i_skip("test_pf_linear_solver")
+        for solver_type in [LinearSolverType.SparseLU, LinearSolverType.DenseLU]:
+            self.model = self.make_model()
+            self.model.set_linear_solver(solver_type)
+            assert self.model.get_linear_solver() == solver_type
+            Vfinal = self._run_both_pf(self.net_ref)
+            self.check_res(Vfinal, self.net_ref)
+
+    def test_pf_small_grid(self):
+        # dense matrices below the threshold, only if the linear solver is KLU
+        self.do_i_skip("test_pf_small_grid")
+        # it is opt-in
+        assert self.model.get_small_grid_threshold() == 0
+        with self.assertRaises(RuntimeError):
+            self.model.set_small_grid_threshold(-1)
+        self.model.set_small_grid_threshold(1000)
+        assert self.model.get_small_grid_threshold() == 1000
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+        assert self.model.get_linear_solver_used() == LinearSolverType.DenseLU
+
+        self.model.set_linear_solver(LinearSolverType.SparseLU)
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+        assert self.model.get_linear_solver_used() == LinearSolverType.SparseLU
+
+        self.model = self.make_model()
+        self.model.set_small_grid_threshold(0)
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+        assert self.model.get_linear_solver_used() == LinearSolverType.KLU
+
+    def test_pf_nb_thread(self):
+        # same results when the powerflow is split between threads
+        self.do_i_skip("test_pf_nb_thread")
+        self.model.set_nb_thread(3, 0)
+        assert self.model.get_nb_thread() == (3, 0)
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+        # also when the jacobian matrix is updated in place
+        self.model.change_p_load(0, 1.01 * self.net_ref.load["p_mw"].values[0])
+        self.net_ref.load["p_mw"].values[0] *= 1.01
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+
     def test_pf_disco_gen(self):
         self.do_i_skip("test_pf_disco_gen")
         self.net_ref.gen["in_service"][0] = False
@@ -219,6 +271,39 @@ class BaseTests:
         Vfinal = self._run_both_pf(self.net_ref)
         self.check_res(Vfinal, self.net_ref)
 
+    def _get_line_id(self, from_bus, to_bus):
+        line = self.net_ref.line
+        return np.where((line["from_bus"].values == from_bus) & (line["to_bus"].values == to_bus))[0][0]
+
+    def test_pf_islands(self):
+        # the buses 85 and 86 (with a generator) are only connected to the rest of the grid by this line
+        self.do_i_skip("test_pf_islands")
+        line_id = self._get_line_id(84, 85)
+        self.model.deactivate_powerline(line_id)
+        V0 = self.make_v0(self.net_ref)
+        V = self.run_me_pf(V0)
+        assert V.shape[0] == 0
+        assert self.model.get_island_status() == 1
+        assert self.model.get_nb_components() == 2
+        assert np.sum(self.model.get_bus_components() == 1) == 2
+
+        # each component is solved with its own reference bus (a slack generator in pandapower)
+        self.model.set_solve_islands(True)
+        self.net_ref.line["in_service"].values[line_id] = False
+        self.net_ref.gen.loc[self.net_ref.gen["bus"] == 86, "slack"] = True
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+
+    def test_pf_island_no_gen(self):
+        # the bus 116 (with only a load) is only connected to the rest of the grid by this line
+        self.do_i_skip("test_pf_island_no_gen")
+        self.model.set_solve_islands(True)
+        self.model.deactivate_powerline(self._get_line_id(11, 116))
+        V = self.run_me_pf(self.make_v0(self.net_ref))
+        assert V.shape[0] == 0
+        assert self.model.get_island_status() == 2
+        assert self.model.get_nb_components() == 2
+
     def test_reactivate(self):
         # i deactivate everything, run a powerflow, and check that reactivating everything and supposes that the results
         # is the same
@@ -255,6 +340,74 @@ class BaseTests:
         Vfinal = self.run_me_pf(V0)
         self.check_res(Vfinal, self.net_ref)
 
+    def test_copy(self):
+        # the copy keeps the state of the grid, and is independant of the original one
+        self.do_i_skip("test_copy")
+        self.net_ref.line["in_service"][0] = False
+        self.model.deactivate_powerline(0)
+        model_cpy = self.model.copy()
+        self.model.reactivate_powerline(0)
+        self.model.deactivate_load(0)
+
+        self.model = model_cpy
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+
+    def _check_against_rebuild(self, modifs, getter):
+        # the modifications are applied one after the other to self.model, with a powerflow after each of them. The
+        # results (and "getter(model)") should be the same as with a model built from scratch with the same
+        # modifications.
+        V0 = self.make_v0(self.net_ref)
+        Vfinal = self.run_me_pf(V0)
+        assert Vfinal.shape[0] > 0, "powerflow diverged !"
+        for modif_id in range(len(modifs)):
+            modifs[modif_id](self.model)
+            Vfinal = self.run_me_pf(V0)
+            assert Vfinal.shape[0] > 0, "powerflow diverged !"
+
+            model_ref = self.make_model()
+            for modif in modifs[:(modif_id + 1)]:
+                modif(model_ref)
+            self.model, model_me = model_ref, self.model
+            Vref = self.run_me_pf(V0)
+            self.model = model_me
+            self.assert_equal(Vfinal, Vref)
+            res_ref = getter(model_ref)
+            if res_ref.shape[0]:
+                # some quantities are only computed (or stored) for the ac powerflow
+                self.assert_equal(getter(self.model), res_ref)
+
+    def test_ybus_update(self):
+        # Ybus is updated in place when the topology changes
+        self.do_i_skip("test_ybus_update")
+        modifs = [lambda model: model.deactivate_powerline(0),
+                  lambda model: model.reactivate_powerline(0),
+                  lambda model: model.deactivate_trafo(0),
+                  lambda model: model.change_bus_powerline_or(0, 2),
+                  lambda model: model.change_bus_trafo_lv(0, 5),
+                  lambda model: model.reactivate_trafo(0),
+                  lambda model: model.change_q_shunt(0, 10),
+                  lambda model: model.deactivate_shunt(0),
+                  lambda model: model.change_bus_powerline_or(0, 0),
+                  ]
+        self._check_against_rebuild(modifs, lambda model: model.get_Ybus().toarray())
+
+    def test_sbus_update(self):
+        # Sbus is updated only at the buses where the injections changed
+        self.do_i_skip("test_sbus_update")
+        modifs = [lambda model: model.change_p_load(0, 50.),
+                  lambda model: model.change_q_load(1, 20.),
+                  lambda model: model.change_p_gen(0, 50.),
+                  lambda model: model.change_p_load(0, 10.),
+                  ]
+        self._check_against_rebuild(modifs, lambda model: model.get_Sbus())
+
+    def test_slack_update(self):
+        # the slack bus is changed after a powerflow
+        self.do_i_skip("test_slack_update")
+        modifs = [lambda model: model.add_gen_slackbus(1)]
+        self._check_against_rebuild(modifs, lambda model: model.get_gen_res()[0])
+
     def test_pf_changebus_gen(self):
         self.do_i_skip("test_pf_changebus_gen")
         self.net_ref.gen["bus"][0] = 2
@@ -380,6 +533,124 @@ class MakeACTests(BaseTests, unittest.TestCase):
     def run_ref_pf(self, net):
         pp.runpp(net, init="flat")
 
+    def test_sensitivities(self):
+        # compare with the finite differences, for a load at a bus without generator
+        self.do_i_skip("test_sensitivities")
+        eps = 0.1
+        V0 = self.make_v0(self.net_ref)
+        V = self.run_me_pf(V0)
+        assert V.shape[0] > 0, "powerflow diverged !"
+        has_gen = np.isin(self.net_ref.load["bus"].values, self.net_ref.gen["bus"].values)
+        load_id = np.where(~has_gen)[0][0]
+        bus_id = self.net_ref.load["bus"].values[load_id]
+        load_p = self.net_ref.load["p_mw"].values[load_id]
+        load_q = self.net_ref.load["q_mvar"].values[load_id]
+        flow_ref = np.concatenate((self.model.get_lineor_res()[0], self.model.get_trafohv_res()[0]))
+        dV_dP, dV_dQ, dP_dP = self.model.get_sensitivities(np.array([bus_id, 0]))
+        assert dV_dP.shape == (self.net_ref.bus.shape[0], 2)
+        assert dP_dP.shape == (self.net_ref.line.shape[0] + self.net_ref.trafo.shape[0], 2)
+        assert np.max(np.abs(dV_dQ[:, 0])) > 0.
+
+        # an injection of eps MW is a decrease of the load
+        self.model.change_p_load(load_id, load_p - eps)
+        V_p = self.run_me_pf(V)
+        flow_p = np.concatenate((self.model.get_lineor_res()[0], self.model.get_trafohv_res()[0]))
+        self.assert_equal((V_p - V) / eps, dV_dP[:, 0])
+        assert np.max(np.abs((flow_p - flow_ref) / eps - dP_dP[:, 0])) <= 1e-3
+
+        self.model.change_p_load(load_id, load_p)
+        self.model.change_q_load(load_id, load_q - eps)
+        V_q = self.run_me_pf(V)
+        self.assert_equal((V_q - V) / eps, dV_dQ[:, 0])
+
+    def test_autotune_klu(self):
+        self.model.set_small_grid_threshold(0)
+        V0 = self.make_v0(self.net_ref)
+        with self.assertRaises(RuntimeError):
+            # no converged powerflow yet
+            self.model.autotune_klu()
+        Vref = self.model.ac_pf(V0, self.max_it, self.tol)
+        assert Vref.shape[0] > 0, "powerflow diverged !"
+        options = self.model.autotune_klu(nb_run=2)
+        assert options == self.model.get_klu_options()
+        # the choice is kept by the copies
+        model_cpy = self.model.copy()
+        assert model_cpy.get_klu_options() == options
+        for model in [self.model, model_cpy]:
+            V = model.ac_pf(V0, self.max_it, self.tol)
+            assert V.shape[0] > 0, "powerflow diverged !"
+            self.assert_equal(V, Vref)
+
+    def test_sensitivities_no_pf(self):
+        self.do_i_skip("test_sensitivities_no_pf")
+        with self.assertRaises(RuntimeError):
+            self.model.get_sensitivities(np.array([0]))
+        V = self.run_me_pf(self.make_v0(self.net_ref))
+        with self.assertRaises(IndexError):
+            self.model.get_sensitivities(np.array([self.net_ref.bus.shape[0]]))
+
+    def test_profiling(self):
+        self.do_i_skip("test_profiling")
+        V0 = self.make_v0(self.net_ref)
+        Vfinal = self.run_me_pf(V0)
+        assert Vfinal.shape[0] > 0, "powerflow diverged !"
+        assert not self.model.get_profiling()
+        assert all(nb_call == 0 for _, nb_call in self.model.get_profile().values())
+
+        self.model.set_profiling(True)
+        self.model.deactivate_powerline(0)  # the topology changed: Ybus, Sbus etc. are computed again
+        Vfinal = self.run_me_pf(V0)
+        assert Vfinal.shape[0] > 0, "powerflow diverged !"
+        self.model.change_p_load(0, 1.01 * self.net_ref.load["p_mw"].values[0])  # only Sbus changed
+        Vfinal = self.run_me_pf(Vfinal)
+        assert Vfinal.shape[0] > 0, "powerflow diverged !"
+        profile = self.model.get_profile()
+        for phase in ["ybus", "sbus", "pv_pq", "analyze", "factor", "solve", "jacobian", "mismatch", "newton",
+                      "results_init", "results", "ac_pf", "dc_pf"]:
+            assert phase in profile
+        assert profile["ac_pf"][1] == 2
+        assert profile["newton"][1] == 2
+        assert profile["ybus"][1] == 1
+        assert profile["pv_pq"][1] == 1
+        assert profile["results_init"][1] == 1  # only when the topology changed
+        assert profile["results"][1] == 2
+        assert profile["dc_pf"][1] == 0
+        assert profile["ac_pf"][0] >= profile["newton"][0] + profile["ybus"][0]
+        self.model.reset_profile()
+        assert all(nb_call == 0 for _, nb_call in self.model.get_profile().values())
+
+    def test_res_disconnected(self):
+        # the results are updated in place, those of the disconnected elements are 0.
+        self.do_i_skip("test_res_disconnected")
+        V0 = self.make_v0(self.net_ref)
+        nb_line = self.net_ref.line.shape[0]
+        nb_load = self.net_ref.load.shape[0]
+        self.model.deactivate_powerline(0)
+        self.model.deactivate_load(0)
+        Vfinal = self.run_me_pf(V0)
+        assert Vfinal.shape[0] > 0, "powerflow diverged !"
+        por, qor, vor, aor = self.model.get_lineor_res()
+        assert por.shape[0] == nb_line
+        assert por[0] == 0. and qor[0] == 0. and vor[0] == 0. and aor[0] == 0.
+        assert np.all(vor[1:] > 0.)
+        load_v = self.model.get_loads_res()[2]
+        assert load_v.shape[0] == nb_load
+        assert load_v[0] == 0.
+        assert np.all(load_v[1:] > 0.)
+
+        # the results of the elements reconnected are computed again
+        self.model.reactivate_powerline(0)
+        self.model.reactivate_load(0)
+        Vfinal = self._run_both_pf(self.net_ref)
+        self.check_res(Vfinal, self.net_ref)
+
+        # after a diverging powerflow, the results are 0. (and keep their size)
+        Vfinal = self.model.ac_pf(V0, 0, self.tol)
+        assert Vfinal.shape[0] == 0
+        por = self.model.get_lineor_res()[0]
+        assert por.shape[0] == nb_line
+        assert np.all(por == 0.)
+
     def do_i_skip(self, test_nm):
         pass
         # if test_nm == "test_pf":
@@ -3,7 +3,7 @@ import unittest
 import numpy as np
 import pdb
 import zipfile
-from lightsim2grid_cpp import KLUSolver
+from lightsim2grid_cpp import KLUSolver, LinearSolverType
 from scipy import sparse
 
 
@@ -101,6 +101,295 @@ class MakeTests(unittest.TestCase):
                     nb_tested += 1
         assert nb_tested == 5, "incorrect number of test cases found, found {} while there should be 5".format(nb_tested)
 
+    def chord_aux(self):
+        self.solver.reset()
+        self.solver.set_chord(False)
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it, self.tol)
+        assert has_conv, "the load flow has diverged for {}".format(self.path)
+        nb_refactor, nb_solve_only = self.solver.get_timers()[-2:]
+        assert nb_refactor == self.solver.get_nb_iter()
+        assert nb_solve_only == 0
+        Va_ref = 1. * self.solver.get_Va()
+        Vm_ref = 1. * self.solver.get_Vm()
+
+        self.solver.reset()
+        self.solver.set_chord(True)
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, 5 * self.max_it,
+                                         self.tol)
+        assert has_conv, "the load flow has diverged for {} (chord method)".format(self.path)
+        nb_refactor, nb_solve_only = self.solver.get_timers()[-2:]
+        assert nb_refactor + nb_solve_only == self.solver.get_nb_iter()
+        assert nb_refactor >= 1
+        assert np.sum(np.abs(self.solver.get_Va() - Va_ref)) <= self.tol_test, "voltages angles are not the same"
+        assert np.sum(np.abs(self.solver.get_Vm() - Vm_ref)) <= self.tol_test, "voltages magnitude are not the same"
+
+        # the factorization is reused for the next call
+        V = self.solver.get_Vm() * np.exp(1j * self.solver.get_Va())
+        has_conv = self.solver.do_newton(self.Ybus, V, 1.001 * self.Sbus, self.pv, self.pq, 5 * self.max_it,
+                                         self.tol)
+        assert has_conv, "the load flow has diverged for {} (chord method)".format(self.path)
+        nb_refactor, nb_solve_only = self.solver.get_timers()[-2:]
+        assert nb_solve_only >= 1
+        self.solver.set_chord(False)
+
+    def divergence_aux(self):
+        # the injections are far too high, the powerflow cannot converge
+        max_it = 20
+        self.solver.reset()
+        self.solver.set_divergence_detection(0, -1e10, 1e10)
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, 10. * self.Sbus, self.pv, self.pq, max_it, self.tol)
+        assert not has_conv
+        assert self.solver.get_error() == 4
+        assert self.solver.get_nb_iter() == max_it
+
+        self.solver.reset()
+        self.solver.set_divergence_detection()
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, 10. * self.Sbus, self.pv, self.pq, max_it, self.tol)
+        assert not has_conv
+        assert self.solver.get_error() == 5
+        assert self.solver.get_nb_iter() < max_it
+
+        # it does not prevent the convergence
+        self.solver.reset()
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it, self.tol)
+        assert has_conv, "the load flow has diverged for {}".format(self.path)
+
+    def test_divergence(self):
+        nb_tested = 0
+        for path in os.listdir("."):
+            _, ext = os.path.splitext(path)
+            if ext == ".zip":
+                path_ok = self.load_path(path)
+                if path_ok:
+                    self.divergence_aux()
+                    nb_tested += 1
+        assert nb_tested == 5, "incorrect number of test cases found, found {} while there should be 5".format(nb_tested)
+        with self.assertRaises(RuntimeError):
+            self.solver.set_divergence_detection(2, 1., 0.5)
+
+    def line_search_aux(self):
+        self.solver.reset()
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it, self.tol)
+        assert has_conv, "the load flow has diverged for {}".format(self.path)
+        assert self.solver.get_nb_backtrack() == 0
+        nb_iter_ref = self.solver.get_nb_iter()
+        Va_ref = 1. * self.solver.get_Va()
+        Vm_ref = 1. * self.solver.get_Vm()
+
+        self.solver.reset()
+        self.solver.set_line_search(True)
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it, self.tol)
+        assert has_conv, "the load flow has diverged for {} (line search)".format(self.path)
+        assert self.solver.get_nb_iter() <= nb_iter_ref
+        assert np.sum(np.abs(self.solver.get_Va() - Va_ref)) <= self.tol_test, "voltages angles are not the same"
+        assert np.sum(np.abs(self.solver.get_Vm() - Vm_ref)) <= self.tol_test, "voltages magnitude are not the same"
+        self.solver.set_line_search(False)
+
+    def test_line_search(self):
+        nb_tested = 0
+        for path in os.listdir("."):
+            _, ext = os.path.splitext(path)
+            if ext == ".zip":
+                path_ok = self.load_path(path)
+                if path_ok:
+                    self.line_search_aux()
+                    nb_tested += 1
+        assert nb_tested == 5, "incorrect number of test cases found, found {} while there should be 5".format(nb_tested)
+        with self.assertRaises(RuntimeError):
+            self.solver.set_line_search(True, -1)
+        assert not self.solver.get_line_search()
+
+    def linear_solver_aux(self):
+        self.solver.reset()
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it, self.tol)
+        assert has_conv, "the load flow has diverged for {}".format(self.path)
+        nb_iter_ref = self.solver.get_nb_iter()
+        Va_ref = 1. * self.solver.get_Va()
+        Vm_ref = 1. * self.solver.get_Vm()
+        J_ref = self.solver.get_J()
+
+        for solver_type in [LinearSolverType.SparseLU, LinearSolverType.DenseLU]:
+            self.solver.set_linear_solver(solver_type)
+            assert self.solver.get_linear_solver() == solver_type
+            has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it,
+                                             self.tol)
+            assert has_conv, "the load flow has diverged for {} ({})".format(self.path, solver_type)
+            assert self.solver.get_nb_iter() == nb_iter_ref
+            assert np.sum(np.abs(self.solver.get_Va() - Va_ref)) <= self.tol_test, "voltages angles are not the same"
+            assert np.sum(np.abs(self.solver.get_Vm() - Vm_ref)) <= self.tol_test, "voltages magnitude are not the same"
+            # the dense solver fills the jacobian matrix directly as a dense matrix
+            assert np.sum(np.abs(self.solver.get_J() - J_ref)) <= self.tol_test, "jacobian matrices are not the same"
+        self.solver.set_linear_solver(LinearSolverType.KLU)
+
+    def test_linear_solver(self):
+        nb_tested = 0
+        for path in os.listdir("."):
+            _, ext = os.path.splitext(path)
+            if ext == ".zip":
+                path_ok = self.load_path(path)
+                if path_ok:
+                    self.linear_solver_aux()
+                    nb_tested += 1
+        assert nb_tested == 5, "incorrect number of test cases found, found {} while there should be 5".format(nb_tested)
+        assert self.solver.get_linear_solver() == LinearSolverType.KLU
+
+    def klu_options_aux(self):
+        self.solver.reset()
+        with self.assertRaises(RuntimeError):
+            # no jacobian matrix yet
+            self.solver.autotune_klu()
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it, self.tol)
+        assert has_conv, "the load flow has diverged for {}".format(self.path)
+        Va_ref = 1. * self.solver.get_Va()
+        Vm_ref = 1. * self.solver.get_Vm()
+        options = self.solver.autotune_klu(nb_run=2)
+        assert options == self.solver.get_klu_options()
+
+        for options in [(1, 0, 0), (0, 1, 1), (1, 1, 2)]:
+            self.solver.set_klu_options(*options)
+            assert self.solver.get_klu_options() == options
+            has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it,
+                                             self.tol)
+            assert has_conv, "the load flow has diverged for {} ({})".format(self.path, options)
+            assert np.sum(np.abs(self.solver.get_Va() - Va_ref)) <= self.tol_test, "voltages angles are not the same"
+            assert np.sum(np.abs(self.solver.get_Vm() - Vm_ref)) <= self.tol_test, "voltages magnitude are not the same"
+        self.solver.set_klu_options()
+
+    def test_klu_options(self):
+        nb_tested = 0
+        for path in os.listdir("."):
+            _, ext = os.path.splitext(path)
+            if ext == ".zip":
+                path_ok = self.load_path(path)
+                if path_ok:
+                    self.klu_options_aux()
+                    nb_tested += 1
+        assert nb_tested == 5, "incorrect number of test cases found, found {} while there should be 5".format(nb_tested)
+        assert self.solver.get_klu_options() == (0, 1, 2)
+        with self.assertRaises(RuntimeError):
+            self.solver.set_klu_options(2, 1, 2)
+        with self.assertRaises(RuntimeError):
+            self.solver.set_klu_options(0, 2, 2)
+        with self.assertRaises(RuntimeError):
+            self.solver.set_klu_options(0, 1, 3)
+
+    def nb_thread_aux(self):
+        self.solver.reset()
+        has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it, self.tol)
+        assert has_conv, "the load flow has diverged for {}".format(self.path)
+        J_ref = self.solver.get_J()
+        Va_ref = 1. * self.solver.get_Va()
+        Vm_ref = 1. * self.solver.get_Vm()
+
+        self.solver.set_nb_thread(3, 0)
+        for _ in range(2):
+            # the second time, the jacobian matrix is filled in parallel (its sparsity pattern is known)
+            has_conv = self.solver.do_newton(self.Ybus, self.V_init, self.Sbus, self.pv, self.pq, self.max_it,
+                                             self.tol)
+            assert has_conv, "the load flow has diverged for {} (3 threads)".format(self.path)
+            assert np.sum(np.abs(self.solver.get_J() - J_ref)) <= self.tol_test, "jacobian matrices are not the same"
+            assert np.sum(np.abs(self.solver.get_Va() - Va_ref)) <= self.tol_test, "voltages angles are not the same"
+            assert np.sum(np.abs(self.solver.get_Vm() - Vm_ref)) <= self.tol_test, "voltages magnitude are not the same"
+        self.solver.set_nb_thread(1)
+
+    def test_nb_thread(self):
+        nb_tested = 0
+        for path in os.listdir("."):
+            _, ext = os.path.splitext(path)
+            if ext == ".zip":
+                path_ok = self.load_path(path)
+                if path_ok:
+                    self.nb_thread_aux()
+                    nb_tested += 1
+        assert nb_tested == 5, "incorrect number of test cases found, found {} while there should be 5".format(nb_tested)
+        assert self.solver.get_nb_thread() == (1, 5000)
+        with self.assertRaises(RuntimeError):
+            self.solver.set_nb_thread(0)
+        with self.assertRaises(RuntimeError):
+            self.solver.set_nb_thread(2, -1)
+
+    def test_profiling(self):
+        path_ok = self.load_path("case118.zip")
+        assert path_ok
+        # nothing is recorded by default
+        self.solver_aux()
+        assert not self.solver.get_profiling()
+        assert all(nb_call == 0 for _, nb_call in self.solver.get_profile().values())
+        # the timers of the last newton raphson
+        time_Fx, time_solve, time_initialize, time_check, time_dSbus, time_fillJ, time_total = \
+            self.solver.get_timers()[:7]
+        assert time_initialize > 0.
+        assert time_check > 0.
+        assert time_total >= time_Fx + time_solve + time_initialize
+
+        self.solver.set_profiling(True)
+        self.solver_aux()
+        self.solver_aux()
+        profile = self.solver.get_profile()
+        nb_iter = self.solver.get_nb_iter()
+        assert profile["newton"][1] == 2
+        assert profile["analyze"][1] == 2
+        assert profile["factor"][1] == 2
+        assert profile["refactor"][1] == 2 * (nb_iter - 1)
+        assert profile["solve"][1] == 2 * nb_iter
+        assert profile["jacobian"][1] == 2 * nb_iter
+        assert profile["newton"][0] >= profile["solve"][0] + profile["jacobian"][0]
+        self.solver.reset_profile()
+        assert all(nb_call == 0 for _, nb_call in self.solver.get_profile().values())
+
+    def test_trace(self):
+        path_ok = self.load_path("case118.zip")
+        assert path_ok
+        # nothing is recorded by default
+        self.solver_aux()
+        assert not self.solver.get_trace_enabled()
+        assert self.solver.get_trace().shape == (0,)
+
+        self.solver.set_trace(True)
+        self.solver_aux()
+        trace = self.solver.get_trace()
+        nb_iter = self.solver.get_nb_iter()
+        assert trace.dtype.names == ("iter", "mismatch", "step", "factorization", "time")
+        assert trace.shape == (nb_iter + 1,)
+        assert np.all(trace["iter"] == np.arange(nb_iter + 1))
+        assert trace["mismatch"][-1] < self.tol
+        assert trace["step"][0] == 0.
+        assert np.all(trace["step"][1:] > 0.)
+        # the jacobian matrix is factorized at the first iteration, and refactorized at the next ones
+        assert np.all(trace["factorization"] == [0, 1] + [2] * (nb_iter - 1))
+        assert np.all(np.diff(trace["time"]) >= 0.)
+
+        # with the chord method, the factorization of the previous call is reused
+        self.solver.set_chord(True)
+        V = self.solver.get_Vm() * np.exp(1j * self.solver.get_Va())
+        has_conv = self.solver.do_newton(self.Ybus, V, 1.001 * self.Sbus, self.pv, self.pq, 5 * self.max_it,
+                                         self.tol)
+        assert has_conv
+        trace = self.solver.get_trace()
+        assert trace.shape == (self.solver.get_nb_iter() + 1,)
+        assert np.all(trace["factorization"][1:] != 1)
+        self.solver.set_chord(False)
+
+        self.solver.set_trace(False)
+        self.solver_aux()
+        assert self.solver.get_trace().shape == (0,)
+
+    def test_chord(self):
+        nb_tested = 0
+        for path in os.listdir("."):
+            _, ext = os.path.splitext(path)
+            if ext == ".zip":
+                path_ok = self.load_path(path)
+                if path_ok:
+                    self.chord_aux()
+                    nb_tested += 1
+        assert nb_tested == 5, "incorrect number of test cases found, found {} while there should be 5".format(nb_tested)
+
+    def test_chord_threshold(self):
+        with self.assertRaises(RuntimeError):
+            self.solver.set_chord(True, 1.5)
+        assert not self.solver.get_chord()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,239 @@
+import unittest
+import warnings
+import numpy as np
+from grid2op import make
+from grid2op.Parameters import Parameters
+from grid2op.Exceptions import DivergingPowerFlow
+
+from lightsim2grid.LightSimBackend import LightSimBackend
+from lightsim2grid_cpp import LinearSolverType
+import pdb
+
+
+class BaseBackendTests:
+    def setUp(self):
+        self.param = Parameters()
+        self.param.init_from_dict({"NO_OVERFLOW_DISCONNECTION": True})
+        self.env_name = "rte_case14_realistic"
+        self.tol = 1e-5
+
+    def make_env(self, backend):
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            env = make(self.env_name, param=self.param, backend=backend, test=True)
+        return env
+
+
+class TestPPBackendReleased(BaseBackendTests, unittest.TestCase):
+    def test_released(self):
+        env = self.make_env(LightSimBackend())
+        assert env.backend.init_pp_backend is None
+
+        # the backend still works without it
+        obs, reward, done, info = env.step(env.action_space())
+        assert not done
+        backend_cpy = env.backend.copy()
+        assert backend_cpy.init_pp_backend is None
+        assert backend_cpy.runpf()
+        assert np.max(np.abs(backend_cpy.get_line_flow() - env.backend.get_line_flow())) <= self.tol
+        obs = env.reset()
+        obs, reward, done, info = env.step(env.action_space())
+        assert not done
+        env.close()
+
+    def test_kept(self):
+        backend = LightSimBackend()
+        backend.keep_pp_backend = True
+        env = self.make_env(backend)
+        assert env.backend.init_pp_backend is not None
+        backend_cpy = env.backend.copy()
+        assert backend_cpy.init_pp_backend is not None
+        # the pandapower grid is copied, not shared
+        assert backend_cpy.init_pp_backend._grid is not env.backend.init_pp_backend._grid
+        env.close()
+
+
+class TestIslands(BaseBackendTests, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        # the substations 5, 11, 12 and 13 (with the generator of the substation 5) are separated from the rest of
+        # the grid
+        self.lines_cut = [7, 11, 17]
+        self.param.MAX_LINE_STATUS_CHANGED = len(self.lines_cut)
+
+    def split(self, env):
+        act = env.action_space({"set_line_status": [(l_id, -1) for l_id in self.lines_cut]})
+        return env.step(act)
+
+    def solve_component(self, grid, component, V):
+        # solve the component alone: everything in the other components is disconnected, and its reference bus is the
+        # one of its first connected generator (as with "solve_islands")
+        bus_components = grid.get_bus_components()
+        in_comp = lambda bus_id: bus_components[bus_id] == component
+        for line_id, status in enumerate(grid.get_lines_status()):
+            if status and not in_comp(grid.get_bus_powerline_or(line_id)):
+                grid.deactivate_powerline(line_id)
+        for trafo_id, status in enumerate(grid.get_trafo_status()):
+            if status and not in_comp(grid.get_bus_trafo_hv(trafo_id)):
+                grid.deactivate_trafo(trafo_id)
+        for load_id in range(len(grid.get_loads_status())):
+            if not in_comp(grid.get_bus_load(load_id)):
+                grid.deactivate_load(load_id)
+        for shunt_id in range(len(grid.get_shunts_status())):
+            if not in_comp(grid.get_bus_shunt(shunt_id)):
+                grid.deactivate_shunt(shunt_id)
+        slack_id = None
+        for gen_id, status in enumerate(grid.get_gen_status()):
+            if not in_comp(grid.get_bus_gen(gen_id)):
+                grid.deactivate_gen(gen_id)
+            elif status and slack_id is None:
+                slack_id = gen_id
+        for bus_id, comp in enumerate(bus_components):
+            if comp != -1 and comp != component:
+                grid.deactivate_bus(bus_id)
+        if component != 0:
+            grid.add_gen_slackbus(slack_id)
+        V = grid.ac_pf(V, 10, 1e-8)
+        assert V.shape[0] > 0, "powerflow diverged !"
+        por = np.concatenate((grid.get_lineor_res()[0], grid.get_trafohv_res()[0]))
+        return por
+
+    def test_split_fails(self):
+        env = self.make_env(LightSimBackend())
+        obs, reward, done, info = self.split(env)
+        assert done
+        assert isinstance(info["exception"][0], DivergingPowerFlow)
+        # runpf does not raise, the reason of the divergence is kept by the grid
+        assert env.backend._grid.get_island_status() == 1
+        with self.assertRaisesRegex(DivergingPowerFlow, "split in 2 connected components"):
+            env.backend._check_islands()
+        env.close()
+
+    def test_solve_islands(self):
+        backend = LightSimBackend()
+        backend.solve_islands = True
+        env = self.make_env(backend)
+        obs, reward, done, info = self.split(env)
+        assert not done
+        grid = env.backend._grid
+        assert grid.get_island_status() == 1
+        assert grid.get_nb_components() == 2
+
+        bus_components = grid.get_bus_components()
+        line_bus = np.concatenate(([grid.get_bus_powerline_or(l_id) for l_id in range(len(grid.get_lines_status()))],
+                                   [grid.get_bus_trafo_hv(t_id) for t_id in range(len(grid.get_trafo_status()))]))
+        por_ref = np.zeros(env.n_line)
+        for component in range(2):
+            por = self.solve_component(grid.copy(), component, env.backend.V)
+            in_comp = (bus_components[line_bus] == component) & env.backend.get_line_status()
+            assert np.any(in_comp)
+            por_ref[in_comp] = por[in_comp]
+        assert np.all(env.backend.p_or[self.lines_cut] == 0.)
+        assert np.max(np.abs(env.backend.p_or - por_ref)) <= self.tol
+        env.close()
+
+
+class TestKLUOptions(BaseBackendTests, unittest.TestCase):
+    def make_backend(self, small_grid_threshold=0, klu_options=None):
+        backend = LightSimBackend()
+        backend.small_grid_threshold = small_grid_threshold
+        backend.klu_options = klu_options
+        backend.autotune_klu = True
+        return backend
+
+    def check_options(self, backend, klu_options):
+        assert tuple(backend.klu_options) == tuple(klu_options)
+        assert tuple(backend._grid.get_klu_options()) == tuple(klu_options)
+        # the options are kept by the copies
+        backend_cpy = backend.copy()
+        assert tuple(backend_cpy.klu_options) == tuple(klu_options)
+        assert tuple(backend_cpy._grid.get_klu_options()) == tuple(klu_options)
+        assert backend_cpy.runpf()
+        assert tuple(backend_cpy._grid.get_klu_options()) == tuple(klu_options)
+        assert np.max(np.abs(backend_cpy.get_line_flow() - backend.get_line_flow())) <= self.tol
+
+    def test_autotune(self):
+        env = self.make_env(self.make_backend())
+        assert env.backend._grid.get_linear_solver_used() == LinearSolverType.KLU
+        klu_options = env.backend.klu_options
+        assert klu_options is not None
+        obs, reward, done, info = env.step(env.action_space())
+        assert not done
+        self.check_options(env.backend, klu_options)
+        env.close()
+
+    def test_options(self):
+        # options given by the user are not tuned again
+        klu_options = (1, 0, 0)
+        env = self.make_env(self.make_backend(klu_options=klu_options))
+        obs, reward, done, info = env.step(env.action_space())
+        assert not done
+        self.check_options(env.backend, klu_options)
+        env.close()
+
+    def test_dense(self):
+        # nothing to tune if the grid is solved with dense matrices
+        env = self.make_env(self.make_backend(small_grid_threshold=25))
+        obs, reward, done, info = env.step(env.action_space())
+        assert not done
+        assert env.backend._grid.get_linear_solver_used() == LinearSolverType.DenseLU
+        assert env.backend.klu_options is None
+        env.close()
+
+
+class TestProfiling(BaseBackendTests, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.python_phases = ["apply_action.read", "apply_action.bus", "apply_action.injection",
+                              "apply_action.topology", "runpf.results"]
+        self.env = self.make_env(LightSimBackend())
+
+    def tearDown(self):
+        self.env.close()
+
+    def step(self):
+        obs, reward, done, info = self.env.step(self.env.action_space())
+        assert not done
+
+    def test_disabled(self):
+        self.step()
+        assert self.env.backend.get_profile() == {}
+        assert self.env.backend._profile is None
+        assert not self.env.backend._grid.get_profiling()
+        assert all(nb_call == 0 for _, nb_call in self.env.backend._grid.get_profile().values())
+
+    def test_profile(self):
+        backend = self.env.backend
+        backend.set_profiling(True)
+        nb_step = 3
+        for _ in range(nb_step):
+            self.step()
+        profile = backend.get_profile()
+        for phase in self.python_phases:
+            time_, nb_call = profile[phase]
+            assert nb_call == nb_step, "wrong number of calls for {}".format(phase)
+            assert time_ > 0., "wrong time for {}".format(phase)
+        assert profile["ac_pf"][1] == nb_step
+        assert profile["newton"][1] == nb_step
+        assert profile["results"][1] == nb_step
+
+        backend.reset_profile()
+        profile = backend.get_profile()
+        assert all(nb_call == 0 for _, nb_call in profile.values())
+        assert all(phase not in profile for phase in self.python_phases)
+
+        # nothing is measured once disabled, and a new profile is started when enabled again
+        self.step()
+        backend.set_profiling(False)
+        assert backend.get_profile() == {}
+        self.step()
+        assert backend.get_profile() == {}
+        backend.set_profiling(True)
+        assert all(nb_call == 0 for _, nb_call in backend.get_profile().values())
+        self.step()
+        assert backend.get_profile()["runpf.results"][1] == 1
+        assert backend.get_profile()["ac_pf"][1] == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+import copy
+import warnings
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+import pandapower.networks as pn
+from pandapower.converter import to_ppc
+from pandapower.pypower.makeYbus import makeYbus
+from pandapower.pypower.makeSbus import makeSbus
+
+from lightsim2grid.initGridModel import init_from_ppc
+import pdb
+
+
+class BaseTests:
+    def setUp(self):
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            self.ppc = to_ppc(self.get_network(), init="flat")
+        self.max_it = 10
+        self.tol = 1e-8  # tolerance for the solver
+        self.tol_test = 1e-6
+
+    def get_vm_setpoint(self, ppc):
+        # as in matpower: generators of the PQ buses are ignored, the first generator of a bus sets the voltage
+        gen_bus = ppc["gen"][:, 0].astype(np.int)
+        is_pv = ppc["bus"][gen_bus, 1] != 1
+        gen_bus_pv, first_gen = np.unique(gen_bus[is_pv], return_index=True)
+        return gen_bus_pv, ppc["gen"][is_pv, 5][first_gen]
+
+    def make_v0(self, ppc):
+        V0 = np.ones(ppc["bus"].shape[0], dtype=np.complex_)
+        gen_bus, vm = self.get_vm_setpoint(ppc)
+        V0[gen_bus] = vm
+        return V0
+
+    def check_pf(self, ppc, model, V):
+        assert V.shape[0] > 0, "powerflow diverged !"
+        Ybus, _, _ = makeYbus(ppc["baseMVA"], ppc["bus"], ppc["branch"])
+        Sbus = makeSbus(ppc["baseMVA"], ppc["bus"], ppc["gen"])
+        bus_type = ppc["bus"][:, 1]
+        pv = np.where(bus_type == 2)[0]
+        pq = np.where(bus_type == 1)[0]
+        # the model is in MW, matpower in pair unit
+        mis = (V * np.conj(Ybus * V) - Sbus) * ppc["baseMVA"]
+        assert np.max(np.abs(mis[pq])) <= self.tol_test
+        assert np.max(np.abs(mis[pv].real)) <= self.tol_test
+        gen_bus, vm = self.get_vm_setpoint(ppc)
+        assert np.max(np.abs(np.abs(V[gen_bus]) - vm)) <= self.tol_test
+
+    def test_ybus(self):
+        model = init_from_ppc(self.ppc)
+        V = model.ac_pf(self.make_v0(self.ppc), self.max_it, self.tol)
+        assert V.shape[0] > 0, "powerflow diverged !"
+        Ybus, _, _ = makeYbus(self.ppc["baseMVA"], self.ppc["bus"], self.ppc["branch"])
+        # everything is in MW in the model
+        assert np.max(np.abs(model.get_Ybus().toarray() - Ybus.toarray() * self.ppc["baseMVA"])) <= self.tol_test
+
+    def test_pf(self):
+        model = init_from_ppc(self.ppc)
+        V = model.ac_pf(self.make_v0(self.ppc), self.max_it, self.tol)
+        self.check_pf(self.ppc, model, V)
+
+    def test_base_mva(self):
+        # same case expressed on a 100 MVA base
+        ppc = copy.deepcopy(self.ppc)
+        ppc["baseMVA"] = 100.
+        ppc["branch"][:, 2:4] *= 100. / self.ppc["baseMVA"]
+        ppc["branch"][:, 4] /= 100. / self.ppc["baseMVA"]
+        model = init_from_ppc(ppc)
+        V = model.ac_pf(self.make_v0(ppc), self.max_it, self.tol)
+        self.check_pf(ppc, model, V)
+        model_ref = init_from_ppc(self.ppc)
+        V_ref = model_ref.ac_pf(self.make_v0(self.ppc), self.max_it, self.tol)
+        assert np.max(np.abs(V - V_ref)) <= self.tol_test
+
+    def test_branch_status(self):
+        ppc = copy.deepcopy(self.ppc)
+        nb_bus = ppc["bus"].shape[0]
+        f_bus = ppc["branch"][:, 0].astype(np.int)
+        t_bus = ppc["branch"][:, 1].astype(np.int)
+        for br_id in range(ppc["branch"].shape[0]):
+            # disconnect the first branch that does not split the grid
+            is_kept = np.arange(ppc["branch"].shape[0]) != br_id
+            graph = csr_matrix((np.ones(is_kept.sum()), (f_bus[is_kept], t_bus[is_kept])), shape=(nb_bus, nb_bus))
+            if connected_components(graph, directed=False)[0] == 1:
+                break
+        ppc["branch"][br_id, 10] = 0
+        model = init_from_ppc(ppc)
+        assert not np.all(np.concatenate((model.get_lines_status(), model.get_trafo_status())))
+        V = model.ac_pf(self.make_v0(ppc), self.max_it, self.tol)
+        self.check_pf(ppc, model, V)
+
+    def test_ybus_reused(self):
+        model = init_from_ppc(self.ppc)
+        V0 = self.make_v0(self.ppc)
+        V = model.ac_pf(V0, self.max_it, self.tol)
+        Ybus_ref = model.get_Ybus().toarray()
+        V = model.ac_pf(V0, self.max_it, self.tol)
+        assert np.max(np.abs(model.get_Ybus().toarray() - Ybus_ref)) <= self.tol_test
+        self.check_pf(self.ppc, model, V)
+
+        # the pattern of Ybus changes, and then gets back to its original value
+        # (pandapower sets TAP=1 for the lines in the ppc, so they can all be loaded as trafos)
+        if len(model.get_lines_status()):
+            deactivate, reactivate = model.deactivate_powerline, model.reactivate_powerline
+        else:
+            deactivate, reactivate = model.deactivate_trafo, model.reactivate_trafo
+        deactivate(0)
+        V = model.ac_pf(V0, self.max_it, self.tol)
+        assert np.max(np.abs(model.get_Ybus().toarray() - Ybus_ref)) > self.tol_test
+        reactivate(0)
+        V = model.ac_pf(V0, self.max_it, self.tol)
+        assert np.max(np.abs(model.get_Ybus().toarray() - Ybus_ref)) <= self.tol_test
+        self.check_pf(self.ppc, model, V)
+
+    def test_phase_shifter(self):
+        ppc = copy.deepcopy(self.ppc)
+        ppc["branch"][0, 9] = 10.
+        with self.assertRaises(RuntimeError):
+            model = init_from_ppc(ppc)
+
+    def test_no_slack(self):
+        ppc = copy.deepcopy(self.ppc)
+        ppc["bus"][ppc["bus"][:, 1] == 3, 1] = 2
+        with self.assertRaises(RuntimeError):
+            model = init_from_ppc(ppc)
+
+
+class TestCase14(BaseTests, unittest.TestCase):
+    def get_network(self):
+        return pn.case14()
+
+
+class TestCase118(BaseTests, unittest.TestCase):
+    def get_network(self):
+        return pn.case118()
+
+
+class TestCase1888(BaseTests, unittest.TestCase):
+    def get_network(self):
+        return pn.case1888rte()
+
+
+if __name__ == "__main__":
+    unittest.main()
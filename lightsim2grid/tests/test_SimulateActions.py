@@ -0,0 +1,89 @@
+import unittest
+import copy
+import warnings
+import numpy as np
+from grid2op import make
+from grid2op.Parameters import Parameters
+from grid2op.Rules import AlwaysLegal
+
+from lightsim2grid.LightSimBackend import LightSimBackend
+import pdb
+
+
+class TestSimulateActions(unittest.TestCase):
+    def setUp(self):
+        param = Parameters()
+        param.init_from_dict({"NO_OVERFLOW_DISCONNECTION": True})
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            self.env = make("rte_case14_realistic", param=param, backend=LightSimBackend(),
+                            gamerules_class=AlwaysLegal, test=True)
+        self.tol = 1e-5
+
+    def tearDown(self):
+        self.env.close()
+
+    def get_actions(self):
+        action_space = self.env.action_space
+        actions = [action_space(),
+                   action_space({"set_bus": {"substations_id": [(1, np.array([1, 2, 2, 1, 1, 1]))]}}),
+                   action_space({"set_bus": {"substations_id": [(3, np.array([1, 2, 2, 1, 1, 1]))]}}),
+                   action_space({"set_line_status": [(0, -1)]}),
+                   action_space({"set_line_status": [(5, -1)]}),
+                   action_space({"change_line_status": [3]}),
+                   ]
+        return actions
+
+    def simulate_ref(self, act):
+        # same as what the environment does, on a copy of the backend
+        backend_action = copy.deepcopy(self.env._backend_action)
+        backend_action += act
+        backend = self.env.backend.copy()
+        backend.apply_action(backend_action)
+        conv = backend.runpf()
+        return backend.get_relative_flow(), backend.p_or, conv
+
+    def check(self, nb_thread):
+        actions = self.get_actions()
+        backend = self.env.backend
+        topo_before = 1 * backend.topo_vect
+        rho, p_or, converged = backend.simulate_actions(actions, nb_thread=nb_thread)
+        assert rho.shape == (len(actions), self.env.n_line)
+        assert p_or.shape == (len(actions), self.env.n_line)
+        assert np.all(backend.topo_vect == topo_before)
+        for act_id, act in enumerate(actions):
+            rho_ref, p_or_ref, conv_ref = self.simulate_ref(act)
+            assert converged[act_id] == conv_ref
+            if conv_ref:
+                assert np.max(np.abs(rho[act_id] - rho_ref)) <= self.tol
+                assert np.max(np.abs(p_or[act_id] - p_or_ref)) <= self.tol
+            else:
+                assert np.all(np.isnan(rho[act_id]))
+
+        # the state of the backend is not modified
+        obs, reward, done, info = self.env.step(self.env.action_space())
+        assert not done
+
+    def test_simulate(self):
+        self.check(nb_thread=1)
+
+    def test_simulate_threads(self):
+        self.check(nb_thread=3)
+
+    def test_after_steps(self):
+        # from a state with a modified topology and a disconnected powerline
+        obs, reward, done, info = self.env.step(self.env.action_space({"set_line_status": [(3, -1)]}))
+        assert not done
+        obs, reward, done, info = self.env.step(
+            self.env.action_space({"set_bus": {"substations_id": [(1, np.array([1, 2, 2, 1, 1, 1]))]}}))
+        assert not done
+        self.check(nb_thread=2)
+
+    def test_no_action(self):
+        rho, p_or, converged = self.env.backend.simulate_actions([])
+        assert rho.shape == (0, self.env.n_line)
+        assert converged.shape == (0,)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+import unittest
+import warnings
+import numpy as np
+from grid2op import make
+from grid2op.Parameters import Parameters
+from grid2op.Rules import AlwaysLegal
+
+from lightsim2grid.LightSimBackend import LightSimBackend
+from lightsim2grid.warmStart import VoltageCache, InitPolicy, VoltagePredictor
+import pdb
+
+
+class TestVoltageCache(unittest.TestCase):
+    def test_exact(self):
+        cache = VoltageCache(max_size=2)
+        topo = np.array([1, 1, 2, -1])
+        V = np.array([1., 1.01j, 0.99])
+        cache.add(topo, V)
+        V_res, same_topo = cache.get(topo)
+        assert same_topo
+        assert np.all(V_res == V)
+        # a copy is returned
+        V_res[0] = 0.
+        assert cache.get(topo)[0][0] == 1.
+
+    def test_closest(self):
+        cache = VoltageCache(max_size=2)
+        assert cache.get(np.array([1, 1]))[0] is None
+        cache.add(np.array([1, 1, 1, 1]), np.full(3, 1.))
+        cache.add(np.array([2, 2, 2, 1]), np.full(3, 2.))
+        V_res, same_topo = cache.get(np.array([1, 2, 1, 1]))
+        assert not same_topo
+        assert np.all(V_res == 1.)
+
+    def test_lru(self):
+        cache = VoltageCache(max_size=2)
+        cache.add(np.array([1, 1]), np.full(3, 1.))
+        cache.add(np.array([1, 2]), np.full(3, 2.))
+        cache.get(np.array([1, 1]))  # [1, 2] is now the least recently used one
+        cache.add(np.array([2, 2]), np.full(3, 3.))
+        assert len(cache) == 2
+        assert not cache.get(np.array([1, 2]))[1]
+        assert cache.get(np.array([1, 1]))[1]
+
+    def test_disabled(self):
+        cache = VoltageCache(max_size=0)
+        cache.add(np.array([1, 1]), np.full(3, 1.))
+        assert len(cache) == 0
+
+
+class TestInitPolicy(unittest.TestCase):
+    def test_choose(self):
+        policy = InitPolicy()
+        assert policy.choose(InitPolicy.TOPOLOGY, False, False, False) == InitPolicy.DC
+        assert policy.choose(InitPolicy.TOPOLOGY, False, False, False, initdc=False) == InitPolicy.FLAT
+        assert policy.choose(InitPolicy.TOPOLOGY, True, True, True) == InitPolicy.CACHE
+        assert policy.choose(InitPolicy.TOPOLOGY, True, True, False) == InitPolicy.LAST_AC
+        assert policy.choose(InitPolicy.TOPOLOGY, False, True, False) == InitPolicy.CACHE
+        assert policy.choose(InitPolicy.INJECTION, True, False, False) == InitPolicy.LAST_AC
+        assert policy.choose(InitPolicy.INJECTION, True, True, True) == InitPolicy.LAST_AC
+
+    def test_adaptive(self):
+        policy = InitPolicy(probe_every=2)
+        policy.update(InitPolicy.TOPOLOGY, InitPolicy.LAST_AC, 0, False)
+        # the fast init diverged: dc is used, except from time to time
+        assert policy.choose(InitPolicy.TOPOLOGY, True, False, False) == InitPolicy.DC
+        assert policy.choose(InitPolicy.TOPOLOGY, True, False, False) == InitPolicy.DC
+        assert policy.choose(InitPolicy.TOPOLOGY, True, False, False) == InitPolicy.LAST_AC
+        # other categories are not impacted
+        assert policy.choose(InitPolicy.INJECTION, True, False, False) == InitPolicy.LAST_AC
+        # unless not allowed
+        assert policy.choose(InitPolicy.TOPOLOGY, True, False, False, initdc=False) == InitPolicy.LAST_AC
+
+        # the fast init needs more iterations than the dc one
+        policy = InitPolicy()
+        for _ in range(policy.window):
+            policy.update(InitPolicy.INJECTION, InitPolicy.LAST_AC, 5, True)
+        assert policy.choose(InitPolicy.INJECTION, True, False, False) == InitPolicy.DC
+        for _ in range(policy.window):
+            policy.update(InitPolicy.INJECTION, InitPolicy.DC, 6, True)
+        assert policy.choose(InitPolicy.INJECTION, True, False, False) == InitPolicy.LAST_AC
+
+    def test_stats(self):
+        policy = InitPolicy()
+        policy.update(InitPolicy.TOPOLOGY, InitPolicy.LAST_AC, 0, False)
+        policy.update(InitPolicy.TOPOLOGY, InitPolicy.DC, 3, True)
+        policy.update(InitPolicy.INJECTION, InitPolicy.DC, 2, True)
+        stats = policy.get_stats()
+        assert stats[InitPolicy.LAST_AC]["nb_call"] == 1
+        assert stats[InitPolicy.LAST_AC]["nb_success"] == 0
+        assert np.isnan(stats[InitPolicy.LAST_AC]["avg_iter"])
+        assert stats[InitPolicy.DC]["nb_call"] == 2
+        assert stats[InitPolicy.DC]["nb_iter"] == 5
+        assert stats[InitPolicy.DC]["avg_iter"] == 2.5
+        policy.reset_stats()
+        assert policy.get_stats()[InitPolicy.DC]["nb_call"] == 0
+
+
+class TestVoltagePredictor(unittest.TestCase):
+    def _V(self, t):
+        # smooth trajectory, quadratic in magnitude and in angle, the last bus is disconnected
+        Vm = np.array([1.0, 1.02, 0.98, 1.]) + 0.01 * t - 0.002 * t ** 2
+        Va = np.array([0., -0.1, 0.05, 0.]) + 0.02 * t + 0.001 * t ** 2
+        return np.array([1., 1., 1., 0.]) * Vm * np.exp(1j * Va)
+
+    def test_linear(self):
+        predictor = VoltagePredictor(order=1)
+        predictor.add(self._V(0))
+        assert not predictor.ready()
+        assert predictor.predict() is None
+        predictor.add(self._V(1))
+        V_pred = predictor.predict()
+        V_ref = 2. * np.abs(self._V(1)) - np.abs(self._V(0))
+        assert np.max(np.abs(np.abs(V_pred[:3]) - V_ref[:3])) <= 1e-8
+        assert V_pred[3] == 0.
+        # better than starting from the last solution
+        assert np.max(np.abs(V_pred - self._V(2))) < np.max(np.abs(self._V(1) - self._V(2)))
+
+    def test_quadratic(self):
+        predictor = VoltagePredictor(order=2)
+        for t in range(3):
+            predictor.add(self._V(t))
+        assert len(predictor) == 3
+        assert np.max(np.abs(predictor.predict() - self._V(3))) <= 1e-8
+        predictor.add(self._V(3))
+        assert len(predictor) == 3
+        assert np.max(np.abs(predictor.predict() - self._V(4))) <= 1e-8
+        predictor.clear()
+        assert not predictor.ready()
+
+    def test_order(self):
+        with self.assertRaises(RuntimeError):
+            VoltagePredictor(order=3)
+
+
+class TestBackendWarmStart(unittest.TestCase):
+    def setUp(self):
+        self.param = Parameters()
+        self.param.init_from_dict({"NO_OVERFLOW_DISCONNECTION": True})
+        self.env_name = "rte_case14_realistic"
+        self.tol = 1e-5
+
+    def _make_env(self, backend):
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore")
+            env = make(self.env_name, param=self.param, backend=backend, gamerules_class=AlwaysLegal, test=True)
+        return env
+
+    def _run(self, backend):
+        env = self._make_env(backend)
+        actions = [env.action_space(),
+                   env.action_space({"set_bus": {"substations_id": [(1, np.array([1, 2, 2, 1, 1, 1]))]}}),
+                   env.action_space({"set_bus": {"substations_id": [(1, np.array([1, 1, 1, 1, 1, 1]))]}}),
+                   env.action_space(),
+                   env.action_space({"set_bus": {"substations_id": [(1, np.array([1, 2, 2, 1, 1, 1]))]}}),
+                   ]
+        aor = []
+        for act in actions:
+            obs, reward, done, info = env.step(act)
+            assert not done
+            aor.append(obs.a_or)
+        env.close()
+        return np.array(aor)
+
+    def test_same_results(self):
+        backend = LightSimBackend()
+        aor = self._run(backend)
+        assert len(backend.voltage_cache) == 2
+
+        backend_ref = LightSimBackend()
+        backend_ref.voltage_cache = VoltageCache(max_size=0)
+        aor_ref = self._run(backend_ref)
+        assert np.max(np.abs(aor - aor_ref)) <= self.tol
+
+    def test_init_policy(self):
+        backend = LightSimBackend()
+        aor = self._run(backend)
+        stats = backend.init_policy.get_stats()
+        nb_call = sum([stats[el]["nb_call"] for el in InitPolicy.POLICIES])
+        nb_success = sum([stats[el]["nb_success"] for el in InitPolicy.POLICIES])
+        assert nb_success >= 6  # at least one powerflow when the env is created, and one per step
+        assert nb_call == nb_success + stats["nb_retry"]
+        # the buses energized by the split start from the voltage of their substation: no divergence
+        assert stats["nb_retry"] == 0
+        assert stats[InitPolicy.CACHE]["nb_success"] >= 1  # the last topology has already been seen
+
+        # the dc approximation is used as soon as a "fast" initialization has been tried, the fast one is then only
+        # kept if it does not need more iterations
+        backend_ref = LightSimBackend()
+        backend_ref.init_policy = InitPolicy(max_iter_fast=-1)
+        backend_ref.voltage_cache = VoltageCache(max_size=0)
+        aor_ref = self._run(backend_ref)
+        stats = backend_ref.init_policy.get_stats()
+        assert stats[InitPolicy.DC]["nb_success"] >= 2
+        assert stats[InitPolicy.LAST_AC]["avg_iter"] <= stats[InitPolicy.DC]["avg_iter"]
+        assert stats["nb_retry"] == 0
+        assert np.max(np.abs(aor - aor_ref)) <= self.tol
+
+    def test_predictor(self):
+        backend_ref = LightSimBackend()
+        aor_ref = self._run(backend_ref)
+        for order in [1, 2]:
+            backend = LightSimBackend()
+            backend.voltage_predictor = VoltagePredictor(order=order)
+            aor = self._run(backend)
+            assert np.max(np.abs(aor - aor_ref)) <= self.tol
+
+    def test_predictor_chronics(self):
+        backend = LightSimBackend()
+        backend.voltage_predictor = VoltagePredictor(order=2)
+        env = self._make_env(backend)
+        for _ in range(10):
+            obs, reward, done, info = env.step(env.action_space())
+            assert not done
+        env.close()
+        stats = backend.init_policy.get_stats()
+        assert stats[InitPolicy.EXTRAPOLATED]["nb_success"] >= 1
+
+    def test_no_initdc(self):
+        backend = LightSimBackend()
+        backend.initdc = False
+        aor = self._run(backend)
+        backend_ref = LightSimBackend()
+        aor_ref = self._run(backend_ref)
+        assert np.max(np.abs(aor - aor_ref)) <= self.tol
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+
+from lightsim2grid.benchmarks import suite, compare
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def setUp(self):
+        self.nb_run = 3
+        self.res = suite.run_benchmarks(["case14"], nb_run=self.nb_run, nb_warmup=1)
+
+    def test_structure(self):
+        assert self.res["format_version"] == suite.FORMAT_VERSION
+        assert self.res["config"]["nb_run"] == self.nb_run
+        assert list(self.res["cases"].keys()) == ["case14"]
+        res_case = self.res["cases"]["case14"]
+        assert res_case["nb_bus"] == 14
+        assert sorted(res_case["metrics"].keys()) == sorted(suite.METRICS)
+        for metric, res_metric in res_case["metrics"].items():
+            assert len(res_metric["samples"]) == self.nb_run, "wrong number of samples for {}".format(metric)
+            assert min(res_metric["samples"]) > 0., "wrong samples for {}".format(metric)
+            percentiles = res_metric["percentiles"]
+            assert res_metric["min"] <= percentiles["p5"] <= percentiles["p50"] <= percentiles["p95"] <= \
+                   res_metric["max"]
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as path:
+            path_json = os.path.join(path, "res.json")
+            suite.save(self.res, path_json)
+            assert suite.load(path_json) == json.loads(json.dumps(self.res))
+
+    def test_unknown_case(self):
+        with self.assertRaises(RuntimeError):
+            suite.run_benchmarks(["case_unknown"], nb_run=1, nb_warmup=0)
+
+    def test_missing_cases_dir(self):
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaises(RuntimeError):
+                suite.run_benchmarks(["case14"], nb_run=1, nb_warmup=0, cases_dir=path)
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.RandomState(42)
+        self.res_base = self.make_res({"ac_pf": 1e-3, "dc_pf": 1e-4})
+
+    def make_res(self, medians, nb_run=30):
+        # fake results of the benchmark suite, with a noise of 2%
+        metrics = {}
+        for metric, median in medians.items():
+            metrics[metric] = suite.summarize(median * (1. + 0.02 * self.rng.randn(nb_run)))
+        return {"format_version": suite.FORMAT_VERSION, "cases": {"case14": {"nb_bus": 14, "metrics": metrics}}}
+
+    def get_status(self, comparison):
+        return {el["metric"]: el["status"] for el in comparison}
+
+    def test_ratio_ci(self):
+        ratio, ci_low, ci_high = compare.ratio_ci([1., 1.1, 0.9, 1.05], [2., 2.2, 1.8, 2.1])
+        assert abs(ratio - 2.) <= 1e-7
+        assert ci_low <= ratio <= ci_high
+
+    def test_compare(self):
+        res_new = self.make_res({"ac_pf": 1.5e-3, "dc_pf": 1e-4})
+        comparison, missing = compare.compare(self.res_base, res_new, threshold=0.1)
+        assert not missing
+        status = self.get_status(comparison)
+        assert status["ac_pf"] == compare.REGRESSION
+        assert status["dc_pf"] == compare.SIMILAR
+        # a larger threshold accepts the slow down
+        comparison, missing = compare.compare(self.res_base, res_new, threshold=0.8)
+        assert self.get_status(comparison)["ac_pf"] == compare.SIMILAR
+        # the other way around, it is faster
+        comparison, missing = compare.compare(res_new, self.res_base, threshold=0.1)
+        assert self.get_status(comparison)["ac_pf"] == compare.IMPROVEMENT
+
+    def test_missing(self):
+        res_new = self.make_res({"ac_pf": 1e-3, "newton": 1e-3})
+        comparison, missing = compare.compare(self.res_base, res_new)
+        assert [el["metric"] for el in comparison] == ["ac_pf"]
+        assert sorted(missing) == [("case14", "dc_pf"), ("case14", "newton")]
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as path:
+            path_base = os.path.join(path, "base.json")
+            path_new = os.path.join(path, "new.json")
+            suite.save(self.res_base, path_base)
+            suite.save(self.make_res({"ac_pf": 1.5e-3, "dc_pf": 1e-4}), path_new)
+            assert compare.main([path_base, path_base]) == 0
+            assert compare.main([path_base, path_new]) == 1
+            assert compare.main([path_base, path_new, "--threshold", "0.8"]) == 0
+            # a metric of the base results is missing in the new ones
+            suite.save(self.make_res({"ac_pf": 1e-3}), path_new)
+            assert compare.main([path_base, path_new]) == 1
+            # but the new metrics are not a problem
+            suite.save(self.make_res({"ac_pf": 1e-3, "dc_pf": 1e-4, "newton": 1e-3}), path_new)
+            assert compare.main([path_base, path_new]) == 0
+
+
+if __name__ == "__main__":
+    unittest.main()
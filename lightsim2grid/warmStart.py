@@ -0,0 +1,268 @@
+# Copyright (c) 2020, RTE (https://www.rte-france.com)
+# See AUTHORS.txt
+# This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+# If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+# you can obtain one at http://mozilla.org/MPL/2.0/.
+# SPDX-License-Identifier: MPL-2.0
+# This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+"""
+Tools to choose the initial voltages of the Newton Raphson algorithm, used by the LightSimBackend.
+"""
+
+from collections import OrderedDict, deque
+import numpy as np
+
+
+class VoltageCache(object):
+    """
+    Small "least recently used" cache of converged voltage vectors, indexed by the topology of the grid.
+
+    The topology is given as an integer vector (for example the "topo_vect" of grid2op, that tells to which bus each
+    element is connected, -1 meaning disconnected). When a solution for this very topology is not known,
+    :func:`VoltageCache.get` returns the one of the closest topology (the one that differs for the smallest number of
+    elements).
+
+    Setting `max_size` to 0 disables the cache.
+    """
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def topo_key(topo):
+        """key of a topology in the cache"""
+        return np.ascontiguousarray(topo).tobytes()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        self._cache.clear()
+
+    def add(self, topo, V):
+        """store (a copy of) the converged voltages V, computed with the topology `topo`"""
+        if self.max_size <= 0:
+            return
+        key = self.topo_key(topo)
+        self._cache[key] = (np.array(topo), np.array(V))
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def get(self, topo):
+        """
+        Returns a copy of the voltages stored for the topology `topo`, or for the closest one known.
+
+        Returns
+        -------
+        V: ``numpy.ndarray``, complex
+            The voltages (``None`` if the cache is empty)
+
+        same_topo: ``bool``
+            Whether or not `V` has been computed with exactly this topology
+
+        """
+        if not self._cache:
+            return None, False
+        key = self.topo_key(topo)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return 1. * self._cache[key][1], True
+
+        best_key = None
+        best_dist = None
+        for key_cache, (topo_cache, _) in self._cache.items():
+            if topo_cache.shape != topo.shape:
+                continue
+            dist = np.count_nonzero(topo_cache != topo)
+            if best_dist is None or dist < best_dist:
+                best_key = key_cache
+                best_dist = dist
+        if best_key is None:
+            return None, False
+        self._cache.move_to_end(best_key)
+        return 1. * self._cache[best_key][1], False
+
+
+class InitPolicy(object):
+    """
+    Chooses how to initialize the voltages of the Newton Raphson algorithm, before each AC powerflow.
+
+    The candidates are:
+
+    - :attr:`InitPolicy.FLAT`: all voltages at the same magnitude and angle 0.
+    - :attr:`InitPolicy.LAST_AC`: the last converged AC solution
+    - :attr:`InitPolicy.EXTRAPOLATED`: the extrapolation of the last converged AC solutions (see
+      :class:`VoltagePredictor`), used instead of the last AC solution when available
+    - :attr:`InitPolicy.CACHE`: a solution found in a :class:`VoltageCache`
+    - :attr:`InitPolicy.DC`: the solution of a DC approximation (computed from one of the above)
+
+    The choice depends on what has been modified since the last powerflow (see :attr:`InitPolicy.CATEGORIES`) and on
+    the number of iterations recently needed for this kind of modification. A "fast" initialization (cache or last
+    AC solution) is preferred as long as it converges and does not need more iterations than the DC initialization.
+    When it diverges, the powerflow is run again from the DC initialization (if `retry_dc` is ``True``).
+
+    Statistics about each initialization are available with :func:`InitPolicy.get_stats`.
+    """
+    FLAT = "flat"
+    LAST_AC = "last_ac"
+    EXTRAPOLATED = "extrapolated"
+    CACHE = "cache"
+    DC = "dc"
+    POLICIES = (FLAT, LAST_AC, EXTRAPOLATED, CACHE, DC)
+
+    # what has been modified since the last powerflow
+    NONE = "none"
+    INJECTION = "injection"
+    TOPOLOGY = "topology"
+    CATEGORIES = (NONE, INJECTION, TOPOLOGY)
+
+    def __init__(self, window=10, max_iter_fast=4, probe_every=20, retry_dc=True):
+        self.window = window  # number of powerflows remembered for each category
+        self.max_iter_fast = max_iter_fast  # nb of iterations above which a fast init is considered "slow"
+        self.probe_every = probe_every  # a fast init is tried again after this number of dc init
+        self.retry_dc = retry_dc
+        self._recent = {}
+        self._nb_since_probe = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {el: {"nb_call": 0, "nb_success": 0, "nb_iter": 0} for el in self.POLICIES}
+        self.nb_retry = 0
+
+    def get_stats(self):
+        """
+        Returns, for each initialization, the number of powerflows started with it, the number of them that
+        converged, the total and average number of Newton Raphson iterations (of the ones that converged). The
+        number of times the powerflow has been run again from the DC initialization is stored in "nb_retry".
+        """
+        res = {}
+        for el, stat in self.stats.items():
+            res[el] = dict(stat)
+            res[el]["avg_iter"] = stat["nb_iter"] / stat["nb_success"] if stat["nb_success"] else np.NaN
+        res["nb_retry"] = self.nb_retry
+        return res
+
+    def _get_recent(self, category, is_fast):
+        key = (category, is_fast)
+        if key not in self._recent:
+            self._recent[key] = deque(maxlen=self.window)
+        return self._recent[key]
+
+    def _prefer_dc(self, category):
+        fast = self._get_recent(category, True)
+        if not fast:
+            # nothing is known, the fast init is tried first
+            return False
+        if min(fast) < 0:
+            # the fast init diverged recently
+            return True
+        dc = self._get_recent(category, False)
+        threshold = np.mean(dc) if dc else self.max_iter_fast
+        return np.mean(fast) > threshold
+
+    def choose(self, category, has_last_ac, has_cache, same_topo, initdc=True):
+        """
+        Returns the initialization to use for the next powerflow.
+
+        Parameters
+        ----------
+        category: ``str``
+            What has been modified since the last powerflow (one of :attr:`InitPolicy.CATEGORIES`)
+
+        has_last_ac: ``bool``
+            Whether the last AC powerflow converged
+
+        has_cache: ``bool``
+            Whether a solution is available in the cache
+
+        same_topo: ``bool``
+            Whether the solution of the cache has been computed with the current topology
+
+        initdc: ``bool``
+            Whether the DC initialization is allowed as a first attempt
+
+        """
+        if has_last_ac and category != self.TOPOLOGY:
+            # the last solution has been computed with the same topology
+            fast = self.LAST_AC
+        elif has_cache and (same_topo or not has_last_ac):
+            fast = self.CACHE
+        elif has_last_ac:
+            fast = self.LAST_AC
+        else:
+            fast = self.FLAT
+
+        if not initdc or (fast == self.CACHE and same_topo):
+            return fast
+        if fast == self.FLAT:
+            return self.DC
+        if self._prefer_dc(category):
+            nb_since_probe = self._nb_since_probe.get(category, 0)
+            if nb_since_probe < self.probe_every:
+                self._nb_since_probe[category] = nb_since_probe + 1
+                return self.DC
+        self._nb_since_probe[category] = 0
+        return fast
+
+    def update(self, category, policy, nb_iter, converged):
+        """records the outcome of a powerflow started with the initialization `policy`"""
+        stat = self.stats[policy]
+        stat["nb_call"] += 1
+        if converged:
+            stat["nb_success"] += 1
+            stat["nb_iter"] += nb_iter
+        if policy != self.FLAT:
+            self._get_recent(category, policy != self.DC).append(nb_iter if converged else -1)
+
+
+class VoltagePredictor(object):
+    """
+    Extrapolates the next voltages from the last converged ones, when the grid evolves smoothly (for example when
+    the injections follow a time series with a fixed topology).
+
+    The magnitudes and the angles are extrapolated separately, with a polynomial of degree `order` (1: linear,
+    2: quadratic) going through the last `order + 1` solutions. The history must be cleared (see
+    :func:`VoltagePredictor.clear`) when the topology changes.
+    """
+    def __init__(self, order=1):
+        if order not in (1, 2):
+            raise RuntimeError("Only linear (order=1) and quadratic (order=2) extrapolations are available.")
+        self.order = order
+        self._history = deque(maxlen=order + 1)
+
+    def __len__(self):
+        return len(self._history)
+
+    def clear(self):
+        self._history.clear()
+
+    def add(self, V):
+        """store (a copy of) the converged voltages V"""
+        if self._history and self._history[-1].shape != V.shape:
+            self._history.clear()
+        self._history.append(np.array(V))
+
+    def ready(self):
+        """whether enough solutions are known to extrapolate"""
+        return len(self._history) == self.order + 1
+
+    def predict(self):
+        """Returns the extrapolated voltages (``None`` if not enough solutions are known)"""
+        if not self.ready():
+            return None
+        if self.order == 1:
+            coeffs = (-1., 2.)
+        else:
+            coeffs = (1., -3., 3.)
+        Vm = 0.
+        Va = 0.
+        for coeff, V in zip(coeffs, self._history):
+            Vm = Vm + coeff * np.abs(V)
+            Va = Va + coeff * np.angle(V)
+        res = Vm * np.exp(1j * Va)
+        # disconnected buses (null voltage) stay as they were
+        is_zero = self._history[-1] == 0.
+        res[is_zero] = 0.
+        return res
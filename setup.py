@@ -150,7 +150,7 @@ extra_compile_args = ["-march=native"] + extra_compile_args_tmp
 ext_modules = [
     Extension(
         'lightsim2grid_cpp',
-        ['src/main.cpp', "src/KLUSolver.cpp", "src/GridModel.cpp", "src/DataConverter.cpp",
+        ['src/main.cpp', "src/KLUSolver.cpp", "src/LinearSolver.cpp", "src/GridModel.cpp", "src/DataConverter.cpp",
          "src/DataLine.cpp", "src/DataGeneric.cpp", "src/DataShunt.cpp", "src/DataTrafo.cpp",
          "src/DataLoad.cpp", "src/DataGen.cpp"],
         include_dirs=include_dirs,
@@ -174,7 +174,8 @@ setup(name='LightSim2Grid',
       setup_requires=['pybind11>=2.4'],
       cmdclass={'build_ext': BuildExt},
       zip_safe=False,
-      packages=['lightsim2grid'],
+      packages=['lightsim2grid', 'lightsim2grid.benchmarks'],
+      package_data={'lightsim2grid': ['tests/*.zip']},  # the cases of lightsim2grid.benchmarks
       keywords='pandapower powergrid simulator KLU Eigen c++',
       classifiers=[
             'Development Status :: 4 - Beta',
@@ -9,26 +9,28 @@
 #ifndef CUSTTIMER_H
 #define CUSTTIMER_H
 
+#include <chrono>
+
 /**
 
 This class presents a basic timer that is used in KLUSolver to know on which part of the solver
-most time were taken.
+most time were taken. It uses a monotonic clock, that is not affected by the changes of the system time.
 
 **/
 class CustTimer{
     public:
-        CustTimer():start_(std::chrono::system_clock::now()){
+        CustTimer():start_(std::chrono::steady_clock::now()){
             end_ = start_;
         };
 
         double duration(){
-            end_ = std::chrono::system_clock::now();
+            end_ = std::chrono::steady_clock::now();
             std::chrono::duration<double> res = end_ - start_;
             return res.count();
         }
     private:
-        std::chrono::time_point<std::chrono::system_clock> start_;
-        std::chrono::time_point<std::chrono::system_clock> end_;
+        std::chrono::time_point<std::chrono::steady_clock> start_;
+        std::chrono::time_point<std::chrono::steady_clock> end_;
 };
 
 #endif //CUSTTIMER_H
\ No newline at end of file
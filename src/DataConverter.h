@@ -64,6 +64,6 @@ class PandaPowerConverter{
         void _check_init();
 };
 
-// TODO have a converter from ppc !
+// NB: matpower / pypower cases (ppc) are read directly by GridModel::init_from_ppc
 
 #endif // DATACONVERTER_H
\ No newline at end of file
@@ -26,6 +26,7 @@ void DataGen::init(const Eigen::VectorXd & generators_p,
         if (min_q_(gen_id) > max_q_(gen_id)) throw std::runtime_error("Impossible to initialize generator min_q being above max_q");
     }
     status_ = std::vector<bool>(generators_p.size(), true);
+    reset_results();
 }
 
 void DataGen::fillSbus(Eigen::VectorXcd & Sbus, bool ac, const std::vector<int> & id_grid_to_solver){
@@ -77,16 +78,23 @@ void DataGen::compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                                const std::vector<int> & id_grid_to_solver,
                                const Eigen::VectorXd & bus_vn_kv)
 {
-    int nb_gen = nb();
-    v_kv_from_vpu(Va, Vm, status_, nb_gen, bus_id_, id_grid_to_solver, bus_vn_kv, res_v_);
+    // the connected generators are given by update_active, and the results are updated in place
+    v_kv_from_vpu(Vm, active_, res_v_);
     res_p_ = p_mw_;
     // res_q_ = q_mvar_;
 }
 
+void DataGen::update_active(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv)
+{
+    _fill_active_elements(id_grid_to_solver, status_, bus_id_, bus_vn_kv, active_);
+}
+
 void DataGen::reset_results(){
-    res_p_ = Eigen::VectorXd();  // in MW
-    res_q_ = Eigen::VectorXd();  // in MVar
-    res_v_ = Eigen::VectorXd();  // in kV
+    // the memory of the results is kept (it is only allocated the first time)
+    int nb_element = nb();
+    res_p_.setZero(nb_element);  // in MW
+    res_q_.setZero(nb_element);  // in MVar
+    res_v_.setZero(nb_element);  // in kV
 }
 
 void DataGen::get_vm_for_dc(Eigen::VectorXd & Vm){
@@ -101,11 +109,13 @@ void DataGen::get_vm_for_dc(Eigen::VectorXd & Vm){
     }
 }
 
-void DataGen::change_p(int gen_id, double new_p, bool & need_reset)
+double DataGen::change_p(int gen_id, double new_p, bool & need_reset)
 {
     bool my_status = status_.at(gen_id); // and this check that load_id is not out of bound
     if(!my_status) throw std::runtime_error("Impossible to change the active value of a disconnected generator");
+    double delta = new_p - p_mw_(gen_id);
     p_mw_(gen_id) = new_p;
+    return delta;
 }
 
 void DataGen::change_v(int gen_id, double new_v_pu, bool & need_reset)
@@ -170,7 +180,7 @@ void DataGen::set_q(const std::vector<double> & q_by_bus)
 {
     // for(int bus_id = 0; bus_id < q_by_bus.size(); ++bus_id) std::cout << "bus id " << bus_id << " sum q " << q_by_bus[bus_id] << std::endl;
     int nb_gen = nb();
-    res_q_ = Eigen::VectorXd::Constant(nb_gen, 0.);
+    res_q_.setZero(nb_gen);
     double eps_q = 0.0001;
     for(int gen_id = 0; gen_id < nb_gen; ++gen_id)
     {
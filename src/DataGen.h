@@ -35,7 +35,8 @@ class DataGen: public DataGeneric
     void reactivate(int gen_id, bool & need_reset) {_reactivate(gen_id, status_, need_reset);}
     void change_bus(int gen_id, int new_bus_id, bool & need_reset, int nb_bus) {_change_bus(gen_id, new_bus_id, bus_id_, need_reset, nb_bus);}
     int get_bus(int gen_id) {return _get_bus(gen_id, status_, bus_id_);}
-    void change_p(int gen_id, double new_p, bool & need_reset);
+    // returns the change of the value (new - previous)
+    double change_p(int gen_id, double new_p, bool & need_reset);
     void change_v(int gen_id, double new_v_pu, bool & need_reset);
 
     virtual void fillSbus(Eigen::VectorXcd & Sbus, bool ac, const std::vector<int> & id_grid_to_solver);
@@ -50,6 +51,8 @@ class DataGen: public DataGeneric
                          const Eigen::Ref<Eigen::VectorXcd> & V,
                          const std::vector<int> & id_grid_to_solver,
                          const Eigen::VectorXd & bus_vn_kv);
+    // connected generators used by compute_results, to call each time the topology changes (before compute_results)
+    void update_active(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv);
     void reset_results();
     void set_q(const std::vector<double> & q_by_bus);
     int get_slack_bus_id(int gen_id);
@@ -75,6 +78,7 @@ class DataGen: public DataGeneric
         Eigen::VectorXd max_q_;
         Eigen::VectorXi bus_id_;
         std::vector<bool> status_;
+        ActiveElements active_;  // connected generators of the current topology, see update_active
 
         // intermediate data
         Eigen::VectorXd total_q_min_per_bus_;
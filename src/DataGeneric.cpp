@@ -14,16 +14,14 @@ const cdouble DataGeneric::my_i = {0., 1.};
 // TODO all functions bellow are generic ! Make a base class for that
 void DataGeneric::_get_amps(Eigen::VectorXd & a, const Eigen::VectorXd & p, const Eigen::VectorXd & q, const Eigen::VectorXd & v){
     const double _1_sqrt_3 = 1.0 / std::sqrt(3.);
-    Eigen::VectorXd p2q2 = p.array() * p.array() + q.array() * q.array();
-    p2q2 = p2q2.array().cwiseSqrt();
-
-    // modification in case of disconnected powerlines
-    // because i don't want to divide by 0. below
-    Eigen::VectorXd v_tmp = v;
-    for(auto & el: v_tmp){
-        if(el == 0.) el = 1.0;
+    int nb_element = p.size();
+    a.resize(nb_element);
+    for(int el_id = 0; el_id < nb_element; ++el_id){
+        // modification in case of disconnected powerlines
+        // because i don't want to divide by 0. below
+        double v_el = v(el_id) == 0. ? 1.0 : v(el_id);
+        a(el_id) = std::sqrt(p(el_id) * p(el_id) + q(el_id) * q(el_id)) * _1_sqrt_3 / v_el;
     }
-    a = p2q2.array() * _1_sqrt_3 / v_tmp.array();
 }
 void DataGeneric::_reactivate(int el_id, std::vector<bool> & status, bool & need_reset){
     bool val = status.at(el_id);
@@ -59,15 +57,105 @@ int DataGeneric::_get_bus(int el_id, const std::vector<bool> & status_, const Ei
     return res;
 }
 
-void DataGeneric::v_kv_from_vpu(const Eigen::Ref<Eigen::VectorXd> & Va,
-                                const Eigen::Ref<Eigen::VectorXd> & Vm,
-                                const std::vector<bool> & status,
-                                int nb_element,
-                                const Eigen::VectorXi & bus_me_id,
-                                const std::vector<int> & id_grid_to_solver,
-                                const Eigen::VectorXd & bus_vn_kv,
-                                Eigen::VectorXd & v){
-    v = Eigen::VectorXd::Constant(nb_element, 0.0);
+int DataGeneric::_get_coeff_position(const Eigen::SparseMatrix<cdouble> & mat, int row, int col)
+{
+    if(!mat.isCompressed()) return -1;
+    if(row < 0 || row >= mat.rows() || col < 0 || col >= mat.cols()) return -1;
+    const int * inner = mat.innerIndexPtr();
+    const int * beg = inner + mat.outerIndexPtr()[col];
+    const int * end = inner + mat.outerIndexPtr()[col + 1];
+    const int * it = std::lower_bound(beg, end, row);
+    if(it == end || *it != row) return -1;
+    return it - inner;
+}
+
+void DataGeneric::_get_ybus_buses(const std::vector<bool> & status, const Eigen::VectorXi & bus_id, Eigen::VectorXi & ybus_bus_id)
+{
+    int nb_element = bus_id.size();
+    ybus_bus_id = bus_id;
+    for(int el_id = 0; el_id < nb_element; ++el_id){
+        if(!status[el_id]) ybus_bus_id(el_id) = _deactivated_bus_id;
+    }
+}
+
+bool DataGeneric::_add_branch_Ybus(Eigen::SparseMatrix<cdouble> & res,
+                                   const std::vector<int> & id_grid_to_solver,
+                                   int bus_or_id_me,
+                                   int bus_ex_id_me,
+                                   cdouble y_ff,
+                                   cdouble y_ft,
+                                   cdouble y_tf,
+                                   cdouble y_tt,
+                                   double sign)
+{
+    int bus_or_solver_id = id_grid_to_solver[bus_or_id_me];
+    int bus_ex_solver_id = id_grid_to_solver[bus_ex_id_me];
+    if(bus_or_solver_id == _deactivated_bus_id || bus_ex_solver_id == _deactivated_bus_id){
+        throw std::runtime_error("DataGeneric::_add_branch_Ybus: A branch is connected to a disconnected bus.");
+    }
+    int pos_ft = _get_coeff_position(res, bus_or_solver_id, bus_ex_solver_id);
+    int pos_tf = _get_coeff_position(res, bus_ex_solver_id, bus_or_solver_id);
+    int pos_ff = _get_coeff_position(res, bus_or_solver_id, bus_or_solver_id);
+    int pos_tt = _get_coeff_position(res, bus_ex_solver_id, bus_ex_solver_id);
+    if(pos_ft == -1 || pos_tf == -1 || pos_ff == -1 || pos_tt == -1) return false;
+    cdouble * values = res.valuePtr();
+    values[pos_ft] += sign * y_ft;
+    values[pos_tf] += sign * y_tf;
+    values[pos_ff] += sign * y_ff;
+    values[pos_tt] += sign * y_tt;
+    return true;
+}
+
+bool DataGeneric::_update_branch_Ybus(Eigen::SparseMatrix<cdouble> & res,
+                                      const std::vector<int> & id_grid_to_solver,
+                                      const std::vector<bool> & status,
+                                      const Eigen::VectorXi & bus_or_id,
+                                      const Eigen::VectorXi & bus_ex_id,
+                                      const Eigen::VectorXcd & y_ff,
+                                      const Eigen::VectorXcd & y_ft,
+                                      const Eigen::VectorXcd & y_tf,
+                                      const Eigen::VectorXcd & y_tt,
+                                      Eigen::VectorXi & ybus_bus_or,
+                                      Eigen::VectorXi & ybus_bus_ex)
+{
+    int nb_branch = bus_or_id.size();
+    if(ybus_bus_or.size() != nb_branch || ybus_bus_ex.size() != nb_branch) return false;
+    for(int br_id = 0; br_id < nb_branch; ++br_id){
+        int bus_or_id_me = status[br_id] ? bus_or_id(br_id) : _deactivated_bus_id;
+        int bus_ex_id_me = status[br_id] ? bus_ex_id(br_id) : _deactivated_bus_id;
+        int & prev_or_id_me = ybus_bus_or(br_id);
+        int & prev_ex_id_me = ybus_bus_ex(br_id);
+        if(bus_or_id_me == prev_or_id_me && bus_ex_id_me == prev_ex_id_me) continue;  // nothing changed
+
+        // remove the coefficients of the branch at its previous buses
+        if(prev_or_id_me != _deactivated_bus_id){
+            if(!_add_branch_Ybus(res, id_grid_to_solver, prev_or_id_me, prev_ex_id_me,
+                                 y_ff(br_id), y_ft(br_id), y_tf(br_id), y_tt(br_id), -1.0)) return false;
+            prev_or_id_me = _deactivated_bus_id;
+            prev_ex_id_me = _deactivated_bus_id;
+        }
+        // and add them at the new ones
+        if(bus_or_id_me != _deactivated_bus_id){
+            if(!_add_branch_Ybus(res, id_grid_to_solver, bus_or_id_me, bus_ex_id_me,
+                                 y_ff(br_id), y_ft(br_id), y_tf(br_id), y_tt(br_id), 1.0)) return false;
+            prev_or_id_me = bus_or_id_me;
+            prev_ex_id_me = bus_ex_id_me;
+        }
+    }
+    return true;
+}
+
+void DataGeneric::_fill_active_elements(const std::vector<int> & id_grid_to_solver,
+                                        const std::vector<bool> & status,
+                                        const Eigen::VectorXi & bus_me_id,
+                                        const Eigen::VectorXd & bus_vn_kv,
+                                        ActiveElements & active)
+{
+    // the memory of the vectors is kept from one topology to the next
+    active.el_ids.clear();
+    active.bus_solver.clear();
+    active.vn_kv.clear();
+    int nb_element = bus_me_id.size();
     for(int el_id = 0; el_id < nb_element; ++el_id){
         // if the element is disconnected, i leave it like that
         if(!status[el_id]) continue;
@@ -76,7 +164,135 @@ void DataGeneric::v_kv_from_vpu(const Eigen::Ref<Eigen::VectorXd> & Va,
         if(bus_solver_id == _deactivated_bus_id){
             throw std::runtime_error("DataModel::res_loads: A load or a shunt is connected to a disconnected bus.");
         }
-        double bus_vn_kv_me = bus_vn_kv(el_bus_me_id);
-        v(el_id) = Vm(bus_solver_id) * bus_vn_kv_me;
+        active.el_ids.push_back(el_id);
+        active.bus_solver.push_back(bus_solver_id);
+        active.vn_kv.push_back(bus_vn_kv(el_bus_me_id));
+    }
+}
+
+void DataGeneric::v_kv_from_vpu(const Eigen::Ref<Eigen::VectorXd> & Vm,
+                                const ActiveElements & active,
+                                Eigen::VectorXd & v){
+    v.setZero();
+    int nb_active = active.el_ids.size();
+    for(int active_id = 0; active_id < nb_active; ++active_id){
+        v(active.el_ids[active_id]) = Vm(active.bus_solver[active_id]) * active.vn_kv[active_id];
+    }
+}
+
+void DataGeneric::_fill_branch_Yf_Yt(const std::vector<int> & id_grid_to_solver,
+                                     const std::vector<bool> & status,
+                                     const Eigen::VectorXi & bus_or_id,
+                                     const Eigen::VectorXi & bus_ex_id,
+                                     const Eigen::VectorXcd & y_ff,
+                                     const Eigen::VectorXcd & y_ft,
+                                     const Eigen::VectorXcd & y_tf,
+                                     const Eigen::VectorXcd & y_tt,
+                                     const Eigen::VectorXd & bus_vn_kv,
+                                     BranchYfYt & Y)
+{
+    int nb_branch = bus_or_id.size();
+    // the disconnected branches "see" the bus 0 of the solver, with null admittances and a null nominal voltage
+    Y.yf_or = Eigen::VectorXcd::Zero(nb_branch);
+    Y.yf_ex = Eigen::VectorXcd::Zero(nb_branch);
+    Y.yt_or = Eigen::VectorXcd::Zero(nb_branch);
+    Y.yt_ex = Eigen::VectorXcd::Zero(nb_branch);
+    Y.bus_or_solver = Eigen::VectorXi::Zero(nb_branch);
+    Y.bus_ex_solver = Eigen::VectorXi::Zero(nb_branch);
+    Y.vn_kv_or = Eigen::VectorXd::Zero(nb_branch);
+    Y.vn_kv_ex = Eigen::VectorXd::Zero(nb_branch);
+    for(int branch_id = 0; branch_id < nb_branch; ++branch_id){
+        if(!status[branch_id]) continue;
+        int bus_or_id_me = bus_or_id(branch_id);
+        int bus_or_solver_id = id_grid_to_solver[bus_or_id_me];
+        if(bus_or_solver_id == _deactivated_bus_id){
+            throw std::runtime_error("DataGeneric::_fill_branch_Yf_Yt: A powerline or a trafo is connected (or) to a disconnected bus.");
+        }
+        int bus_ex_id_me = bus_ex_id(branch_id);
+        int bus_ex_solver_id = id_grid_to_solver[bus_ex_id_me];
+        if(bus_ex_solver_id == _deactivated_bus_id){
+            throw std::runtime_error("DataGeneric::_fill_branch_Yf_Yt: A powerline or a trafo is connected (ex) to a disconnected bus.");
+        }
+        Y.yf_or(branch_id) = y_ff(branch_id);
+        Y.yf_ex(branch_id) = y_ft(branch_id);
+        Y.yt_or(branch_id) = y_tf(branch_id);
+        Y.yt_ex(branch_id) = y_tt(branch_id);
+        Y.bus_or_solver(branch_id) = bus_or_solver_id;
+        Y.bus_ex_solver(branch_id) = bus_ex_solver_id;
+        Y.vn_kv_or(branch_id) = bus_vn_kv(bus_or_id_me);
+        Y.vn_kv_ex(branch_id) = bus_vn_kv(bus_ex_id_me);
+    }
+}
+
+void DataGeneric::_branch_results(const BranchYfYt & Y,
+                                  const Eigen::Ref<Eigen::VectorXcd> & V,
+                                  const Eigen::Ref<Eigen::VectorXd> & Vm,
+                                  Eigen::VectorXd & p_or,
+                                  Eigen::VectorXd & q_or,
+                                  Eigen::VectorXd & v_or,
+                                  Eigen::VectorXd & a_or,
+                                  Eigen::VectorXd & p_ex,
+                                  Eigen::VectorXd & q_ex,
+                                  Eigen::VectorXd & v_ex,
+                                  Eigen::VectorXd & a_ex)
+{
+    int nb_branch = Y.bus_or_solver.size();
+    // the vectors are only allocated if their size changed
+    p_or.resize(nb_branch);
+    q_or.resize(nb_branch);
+    v_or.resize(nb_branch);
+    p_ex.resize(nb_branch);
+    q_ex.resize(nb_branch);
+    v_ex.resize(nb_branch);
+    for(int branch_id = 0; branch_id < nb_branch; ++branch_id){
+        // the disconnected branches have null admittances (and nominal voltages), so everything is 0. for them
+        int bus_or = Y.bus_or_solver(branch_id);
+        int bus_ex = Y.bus_ex_solver(branch_id);
+        cdouble Eor = V(bus_or);
+        cdouble Eex = V(bus_ex);
+        // s = V.conj(I), with If = Yf.V and It = Yt.V
+        cdouble s_orex = Eor * std::conj(Y.yf_or(branch_id) * Eor + Y.yf_ex(branch_id) * Eex);
+        cdouble s_exor = Eex * std::conj(Y.yt_ex(branch_id) * Eex + Y.yt_or(branch_id) * Eor);
+        p_or(branch_id) = std::real(s_orex);
+        q_or(branch_id) = std::imag(s_orex);
+        p_ex(branch_id) = std::real(s_exor);
+        q_ex(branch_id) = std::imag(s_exor);
+        // voltages magnitude in kv instead of pu
+        v_or(branch_id) = Vm(bus_or) * Y.vn_kv_or(branch_id);
+        v_ex(branch_id) = Vm(bus_ex) * Y.vn_kv_ex(branch_id);
+    }
+    _get_amps(a_or, p_or, q_or, v_or);
+    _get_amps(a_ex, p_ex, q_ex, v_ex);
+}
+
+void DataGeneric::_branch_p_or_sensitivity(const std::vector<int> & id_grid_to_solver,
+                                           const std::vector<bool> & status,
+                                           const Eigen::VectorXi & bus_or_id,
+                                           const Eigen::VectorXi & bus_ex_id,
+                                           const Eigen::VectorXcd & y_ff,
+                                           const Eigen::VectorXcd & y_ft,
+                                           const Eigen::Ref<const Eigen::VectorXcd> & V,
+                                           const Eigen::MatrixXcd & dV,
+                                           Eigen::Ref<Eigen::MatrixXd> res)
+{
+    // p_or = real(E_or * conj(y_ff * E_or + y_ft * E_ex)), so that
+    // dp_or = real(dE_or * conj(I_or) + E_or * conj(y_ff * dE_or + y_ft * dE_ex))
+    int nb_element = bus_or_id.size();
+    int nb_col = dV.cols();
+    res.setZero();
+    for(int el_id = 0; el_id < nb_element; ++el_id){
+        if(!status[el_id]) continue;
+        int bus_or_solver_id = id_grid_to_solver[bus_or_id(el_id)];
+        int bus_ex_solver_id = id_grid_to_solver[bus_ex_id(el_id)];
+        if(bus_or_solver_id == _deactivated_bus_id || bus_ex_solver_id == _deactivated_bus_id){
+            throw std::runtime_error("DataGeneric::_branch_p_or_sensitivity: A powerline or a trafo is connected to a disconnected bus.");
+        }
+        cdouble E_or = V(bus_or_solver_id);
+        cdouble I_or_conj = std::conj(y_ff(el_id) * E_or + y_ft(el_id) * V(bus_ex_solver_id));
+        for(int col_id = 0; col_id < nb_col; ++col_id){
+            cdouble dE_or = dV(bus_or_solver_id, col_id);
+            cdouble dE_ex = dV(bus_ex_solver_id, col_id);
+            res(el_id, col_id) = std::real(dE_or * I_or_conj + E_or * std::conj(y_ff(el_id) * dE_or + y_ft(el_id) * dE_ex));
+        }
     }
 }
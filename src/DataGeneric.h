@@ -14,6 +14,8 @@
 #include "Eigen/SparseCore"
 #include "Eigen/SparseLU"
 
+#include <algorithm>  // std::lower_bound
+
 #include "Utils.h"
 
 /**
@@ -46,20 +48,116 @@ class DataGeneric
         void _change_bus(int el_id, int new_bus_me_id, Eigen::VectorXi & el_bus_ids, bool & need_reset, int nb_bus);
         int _get_bus(int el_id, const std::vector<bool> & status_, const Eigen::VectorXi & bus_id_);
 
+        /**
+        incremental update of the Ybus matrix
+        **/
+        // position of the coefficient (row, col) in the values of the compressed matrix "mat", -1 if it is not in its
+        // sparsity pattern
+        int _get_coeff_position(const Eigen::SparseMatrix<cdouble> & mat, int row, int col);
+        // bus of each element (or _deactivated_bus_id if it is disconnected), as seen by the Ybus matrix
+        void _get_ybus_buses(const std::vector<bool> & status, const Eigen::VectorXi & bus_id, Eigen::VectorXi & ybus_bus_id);
+        // update the coefficients of "res" for the branches whose status or buses changed since "res" was filled
+        // (these are stored in ybus_bus_or and ybus_bus_ex). Returns false if one of the new coefficients is not in
+        // the sparsity pattern of "res": "res" then needs to be filled from scratch.
+        bool _update_branch_Ybus(Eigen::SparseMatrix<cdouble> & res,
+                                 const std::vector<int> & id_grid_to_solver,
+                                 const std::vector<bool> & status,
+                                 const Eigen::VectorXi & bus_or_id,
+                                 const Eigen::VectorXi & bus_ex_id,
+                                 const Eigen::VectorXcd & y_ff,
+                                 const Eigen::VectorXcd & y_ft,
+                                 const Eigen::VectorXcd & y_tf,
+                                 const Eigen::VectorXcd & y_tt,
+                                 Eigen::VectorXi & ybus_bus_or,
+                                 Eigen::VectorXi & ybus_bus_ex);
+        // add (or remove if sign is -1.) the 4 coefficients of a branch, returns false if one is not in the pattern
+        bool _add_branch_Ybus(Eigen::SparseMatrix<cdouble> & res,
+                              const std::vector<int> & id_grid_to_solver,
+                              int bus_or_id_me,
+                              int bus_ex_id_me,
+                              cdouble y_ff,
+                              cdouble y_ft,
+                              cdouble y_tf,
+                              cdouble y_tt,
+                              double sign);
+
+        // first order variation of the active power flowing at the "or" side of the branches (one row per branch),
+        // for the variations of voltages dV (one row per bus of the solver, one column per variation) around V
+        void _branch_p_or_sensitivity(const std::vector<int> & id_grid_to_solver,
+                                      const std::vector<bool> & status,
+                                      const Eigen::VectorXi & bus_or_id,
+                                      const Eigen::VectorXi & bus_ex_id,
+                                      const Eigen::VectorXcd & y_ff,
+                                      const Eigen::VectorXcd & y_ft,
+                                      const Eigen::Ref<const Eigen::VectorXcd> & V,
+                                      const Eigen::MatrixXcd & dV,
+                                      Eigen::Ref<Eigen::MatrixXd> res);
+
+        /**
+        results of the branches (powerlines or trafos), computed for all of them at once
+        **/
+        // branch-from and branch-to admittance matrices Yf and Yt, with the currents at both sides If = Yf.V and
+        // It = Yt.V. Each row has (at most) two non zero coefficients, at the buses (of the solver) of both sides, so
+        // they are stored as vectors of coefficients (0. for the disconnected branches), with the nominal voltages
+        // of both sides. They only depend on the topology.
+        struct BranchYfYt
+        {
+            Eigen::VectorXcd yf_or;
+            Eigen::VectorXcd yf_ex;
+            Eigen::VectorXcd yt_or;
+            Eigen::VectorXcd yt_ex;
+            Eigen::VectorXi bus_or_solver;
+            Eigen::VectorXi bus_ex_solver;
+            Eigen::VectorXd vn_kv_or;
+            Eigen::VectorXd vn_kv_ex;
+        };
+        void _fill_branch_Yf_Yt(const std::vector<int> & id_grid_to_solver,
+                                const std::vector<bool> & status,
+                                const Eigen::VectorXi & bus_or_id,
+                                const Eigen::VectorXi & bus_ex_id,
+                                const Eigen::VectorXcd & y_ff,
+                                const Eigen::VectorXcd & y_ft,
+                                const Eigen::VectorXcd & y_tf,
+                                const Eigen::VectorXcd & y_tt,
+                                const Eigen::VectorXd & bus_vn_kv,
+                                BranchYfYt & Y);
+        // p, q, v (kV) and a (kA) at both sides of the branches, in a single pass (no check is performed here)
+        void _branch_results(const BranchYfYt & Y,
+                             const Eigen::Ref<Eigen::VectorXcd> & V,
+                             const Eigen::Ref<Eigen::VectorXd> & Vm,
+                             Eigen::VectorXd & p_or,
+                             Eigen::VectorXd & q_or,
+                             Eigen::VectorXd & v_or,
+                             Eigen::VectorXd & a_or,
+                             Eigen::VectorXd & p_ex,
+                             Eigen::VectorXd & q_ex,
+                             Eigen::VectorXd & v_ex,
+                             Eigen::VectorXd & a_ex);
+
         /**
         compute the amps from the p, the q and the v (v should NOT be pair unit)
         **/
         void _get_amps(Eigen::VectorXd & a, const Eigen::VectorXd & p, const Eigen::VectorXd & q, const Eigen::VectorXd & v);
 
         /**
+        results of the elements connected to one bus (loads, generators, shunts)
         **/
-        void v_kv_from_vpu(const Eigen::Ref<Eigen::VectorXd> & Va,
-                           const Eigen::Ref<Eigen::VectorXd> & Vm,
-                           const std::vector<bool> & status,
-                           int nb_element,
-                           const Eigen::VectorXi & bus_me_id,
-                           const std::vector<int> & id_grid_to_solver,
-                           const Eigen::VectorXd & bus_vn_kv,
+        // connected elements, with the bus (of the solver) and the nominal voltage of their bus. They only depend on
+        // the topology, so that the results are computed without checking the status (or the bus) of each element.
+        struct ActiveElements
+        {
+            std::vector<int> el_ids;
+            std::vector<int> bus_solver;
+            std::vector<double> vn_kv;
+        };
+        void _fill_active_elements(const std::vector<int> & id_grid_to_solver,
+                                   const std::vector<bool> & status,
+                                   const Eigen::VectorXi & bus_me_id,
+                                   const Eigen::VectorXd & bus_vn_kv,
+                                   ActiveElements & active);
+        // voltage magnitudes (in kV) of the elements, 0. for the disconnected ones (v is updated in place)
+        void v_kv_from_vpu(const Eigen::Ref<Eigen::VectorXd> & Vm,
+                           const ActiveElements & active,
                            Eigen::VectorXd & v);
 
 };
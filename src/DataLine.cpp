@@ -33,13 +33,60 @@ void DataLine::init(const Eigen::VectorXd & branch_r,
     powerlines_r_ = branch_r;
     powerlines_x_ = branch_x;
     status_ = std::vector<bool>(branch_r.size(), true); // by default everything is connected
+    _update_model_coeffs();
+    reset_results();
+}
+
+void DataLine::_update_model_coeffs()
+{
+    int size = powerlines_r_.size();
+    yac_ff_ = Eigen::VectorXcd::Zero(size);
+    yac_ft_ = Eigen::VectorXcd::Zero(size);
+    yac_tf_ = Eigen::VectorXcd::Zero(size);
+    yac_tt_ = Eigen::VectorXcd::Zero(size);
+    ydc_ff_ = Eigen::VectorXcd::Zero(size);
+    ydc_ft_ = Eigen::VectorXcd::Zero(size);
+    ydc_tf_ = Eigen::VectorXcd::Zero(size);
+    ydc_tt_ = Eigen::VectorXcd::Zero(size);
+    for(int line_id = 0; line_id < size; ++line_id){
+        // for AC
+        // convert subsceptance to half subsceptance, applied on each ends
+        cdouble h = my_i * 0.5 * powerlines_h_(line_id); // yes it's the correct one
+
+        // compute the admittance y
+        cdouble y = 0.;
+        cdouble z = powerlines_r_(line_id) + my_i * powerlines_x_(line_id);
+        if (z != 0.) y = 1.0 / z;
+
+        yac_ff_(line_id) = y + h;
+        yac_tt_(line_id) = y + h;
+        yac_ft_(line_id) = -y;
+        yac_tf_(line_id) = -y;
+
+        // for DC
+        // no subsceptance and only the reactance is taken into account
+        cdouble ydc = 0.;
+        double x = powerlines_x_(line_id);
+        if (x != 0.) ydc = 1.0 / x;
+        ydc_ff_(line_id) = ydc;
+        ydc_tt_(line_id) = ydc;
+        ydc_ft_(line_id) = -ydc;
+        ydc_tf_(line_id) = -ydc;
+    }
 }
 
 void DataLine::fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, const std::vector<int> & id_grid_to_solver)
 {
+    // remember the state of the powerlines used to fill the matrix (for update_Ybus)
+    _get_ybus_buses(status_, bus_or_id_, ac ? ybus_ac_bus_or_ : ybus_dc_bus_or_);
+    _get_ybus_buses(status_, bus_ex_id_, ac ? ybus_ac_bus_ex_ : ybus_dc_bus_ex_);
+
     // fill the matrix
-    //TODO template here instead of "if" for ac / dc
     int nb_line = powerlines_r_.size();
+    const Eigen::VectorXcd & y_ff = ac ? yac_ff_ : ydc_ff_;
+    const Eigen::VectorXcd & y_ft = ac ? yac_ft_ : ydc_ft_;
+    const Eigen::VectorXcd & y_tf = ac ? yac_tf_ : ydc_tf_;
+    const Eigen::VectorXcd & y_tt = ac ? yac_tt_ : ydc_tt_;
 
     //diagonal coefficients
     for(int line_id =0; line_id < nb_line; ++line_id){
@@ -59,36 +106,26 @@ void DataLine::fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, co
             throw std::runtime_error("DataLine::fillYbusBranch: A line is connected (or) to a disconnected bus.");
         }
 
-        // convert subsceptance to half subsceptance, applied on each ends
-        cdouble h = 0.;
-        if(ac){
-            h = powerlines_h_(line_id); // yes it's the correct one
-            h = my_i * 0.5 * h;
-        }
-
-        // compute the admittance y
-        cdouble y = 0.;
-        cdouble z = powerlines_x_(line_id);
-        if(ac){
-            z *= my_i;
-            z += powerlines_r_(line_id);
-        }
-        if (z !=0. ) y = 1.0 / z;
-
         // fill non diagonal coefficient
-        res.push_back(Eigen::Triplet<cdouble> (bus_or_solver_id, bus_ex_solver_id, -y));
-        res.push_back(Eigen::Triplet<cdouble> (bus_ex_solver_id, bus_or_solver_id, -y));
+        res.push_back(Eigen::Triplet<cdouble> (bus_or_solver_id, bus_ex_solver_id, y_ft(line_id)));
+        res.push_back(Eigen::Triplet<cdouble> (bus_ex_solver_id, bus_or_solver_id, y_tf(line_id)));
         // fill diagonal coefficient
-        cdouble tmp = y + h;
-        res.push_back(Eigen::Triplet<cdouble> (bus_or_solver_id, bus_or_solver_id, tmp));
-        res.push_back(Eigen::Triplet<cdouble> (bus_ex_solver_id, bus_ex_solver_id, tmp));
+        res.push_back(Eigen::Triplet<cdouble> (bus_or_solver_id, bus_or_solver_id, y_ff(line_id)));
+        res.push_back(Eigen::Triplet<cdouble> (bus_ex_solver_id, bus_ex_solver_id, y_tt(line_id)));
     }
 }
 void DataLine::fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver)
 {
+    // remember the state of the powerlines used to fill the matrix (for update_Ybus)
+    _get_ybus_buses(status_, bus_or_id_, ac ? ybus_ac_bus_or_ : ybus_dc_bus_or_);
+    _get_ybus_buses(status_, bus_ex_id_, ac ? ybus_ac_bus_ex_ : ybus_dc_bus_ex_);
+
     // fill the matrix
-    //TODO template here instead of "if" for ac / dc
     int nb_line = powerlines_r_.size();
+    const Eigen::VectorXcd & y_ff = ac ? yac_ff_ : ydc_ff_;
+    const Eigen::VectorXcd & y_ft = ac ? yac_ft_ : ydc_ft_;
+    const Eigen::VectorXcd & y_tf = ac ? yac_tf_ : ydc_tf_;
+    const Eigen::VectorXcd & y_tt = ac ? yac_tt_ : ydc_tt_;
 
     //diagonal coefficients
     for(int line_id =0; line_id < nb_line; ++line_id){
@@ -108,112 +145,57 @@ void DataLine::fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, const
             throw std::runtime_error("DataLine::fillYbusBranch: A line is connected (or) to a disconnected bus.");
         }
 
-        // convert subsceptance to half subsceptance, applied on each ends
-        cdouble h = 0.;
-        if(ac){
-            h = powerlines_h_(line_id); // yes it's the correct one
-            h = my_i * 0.5 * h;
-        }
-
-        // compute the admittance y
-        cdouble y = 0.;
-        cdouble z = powerlines_x_(line_id);
-        if(ac){
-            z *= my_i;
-            z += powerlines_r_(line_id);
-        }
-        if (z !=0. ) y = 1.0 / z;
-
         // fill non diagonal coefficient
-        res.coeffRef(bus_or_solver_id, bus_ex_solver_id) -= y; // * base_for_pu_from;
-        res.coeffRef(bus_ex_solver_id, bus_or_solver_id) -= y; // * base_for_pu_to;
+        res.coeffRef(bus_or_solver_id, bus_ex_solver_id) += y_ft(line_id);
+        res.coeffRef(bus_ex_solver_id, bus_or_solver_id) += y_tf(line_id);
 
         // fill diagonal coefficient
-        cdouble tmp = y + h;
-        res.coeffRef(bus_or_solver_id, bus_or_solver_id) += tmp;
-        res.coeffRef(bus_ex_solver_id, bus_ex_solver_id) += tmp;
+        res.coeffRef(bus_or_solver_id, bus_or_solver_id) += y_ff(line_id);
+        res.coeffRef(bus_ex_solver_id, bus_ex_solver_id) += y_tt(line_id);
     }
 }
 
 void DataLine::reset_results()
 {
-    res_powerline_por_ = Eigen::VectorXd();  // in MW
-    res_powerline_qor_ = Eigen::VectorXd();  // in MVar
-    res_powerline_vor_ = Eigen::VectorXd();  // in kV
-    res_powerline_aor_ = Eigen::VectorXd();  // in kA
-    res_powerline_pex_ = Eigen::VectorXd();  // in MW
-    res_powerline_qex_ = Eigen::VectorXd();  // in MVar
-    res_powerline_vex_ = Eigen::VectorXd();  // in kV
-    res_powerline_aex_ = Eigen::VectorXd();  // in kA
+    // the memory of the results is kept (it is only allocated the first time)
+    int nb_element = nb();
+    res_powerline_por_.setZero(nb_element);  // in MW
+    res_powerline_qor_.setZero(nb_element);  // in MVar
+    res_powerline_vor_.setZero(nb_element);  // in kV
+    res_powerline_aor_.setZero(nb_element);  // in kA
+    res_powerline_pex_.setZero(nb_element);  // in MW
+    res_powerline_qex_.setZero(nb_element);  // in MVar
+    res_powerline_vex_.setZero(nb_element);  // in kV
+    res_powerline_aex_.setZero(nb_element);  // in kA
 }
 
 
+bool DataLine::update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver)
+{
+    if(ac){
+        return _update_branch_Ybus(res, id_grid_to_solver, status_, bus_or_id_, bus_ex_id_,
+                                   yac_ff_, yac_ft_, yac_tf_, yac_tt_, ybus_ac_bus_or_, ybus_ac_bus_ex_);
+    }
+    return _update_branch_Ybus(res, id_grid_to_solver, status_, bus_or_id_, bus_ex_id_,
+                               ydc_ff_, ydc_ft_, ydc_tf_, ydc_tt_, ybus_dc_bus_or_, ybus_dc_bus_ex_);
+}
+
 void DataLine::compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                                const Eigen::Ref<Eigen::VectorXd> & Vm,
                                const Eigen::Ref<Eigen::VectorXcd> & V,
                                const std::vector<int> & id_grid_to_solver,
                                const Eigen::VectorXd & bus_vn_kv)
 {
-    // it needs to be initialized at 0.
-    int nb_element = nb();
-    res_powerline_por_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MW
-    res_powerline_qor_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MVar
-    res_powerline_vor_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kV
-    res_powerline_aor_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kA
-    res_powerline_pex_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MW
-    res_powerline_qex_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MVar
-    res_powerline_vex_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kV
-    res_powerline_aex_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kA
-    for(int line_id = 0; line_id < nb_element; ++line_id){
-        // don't do anything if the element is disconnected
-        if(!status_[line_id]) continue;
-
-        //physical properties
-        double r = powerlines_r_(line_id);
-        double x = powerlines_x_(line_id);
-        cdouble h = my_i * 0.5 * powerlines_h_(line_id);
-        cdouble y = 1.0 / (r + my_i * x);
-
-        // connectivity
-        int bus_or_id_me = bus_or_id_(line_id);
-        int bus_or_solver_id = id_grid_to_solver[bus_or_id_me];
-        if(bus_or_solver_id == _deactivated_bus_id){
-            throw std::runtime_error("DataModel::res_powerlines: A powerline or a trafo is connected (or) to a disconnected bus.");
-        }
-        int bus_ex_id_me = bus_ex_id_(line_id);
-        int bus_ex_solver_id = id_grid_to_solver[bus_ex_id_me];
-        if(bus_ex_solver_id == _deactivated_bus_id){
-            throw std::runtime_error("DataModel::res_powerlines: A powerline or a trafo is connected (ex) to a disconnected bus.");
-        }
-
-        // results of the powerflow
-        cdouble Eor = V(bus_or_solver_id);
-        cdouble Eex = V(bus_ex_solver_id);
-
-        // powerline equations
-        cdouble I_orex = (y + h) * Eor - y * Eex;
-        cdouble I_exor = (y + h) * Eex - y * Eor;
-
-        I_orex = std::conj(I_orex);
-        I_exor = std::conj(I_exor);
-        cdouble s_orex = Eor * I_orex;
-        cdouble s_exor = Eex * I_exor;
-
-        res_powerline_por_(line_id) = std::real(s_orex);
-        res_powerline_qor_(line_id) = std::imag(s_orex);
-        res_powerline_pex_(line_id) = std::real(s_exor);
-        res_powerline_qex_(line_id) = std::imag(s_exor);
+    // all the branches at once, from the admittances of the current topology (see update_Yf_Yt)
+    _branch_results(Yf_Yt_, V, Vm,
+                    res_powerline_por_, res_powerline_qor_, res_powerline_vor_, res_powerline_aor_,
+                    res_powerline_pex_, res_powerline_qex_, res_powerline_vex_, res_powerline_aex_);
+}
 
-        // retrieve voltages magnitude in kv instead of pu
-        double v_or = Vm(bus_or_solver_id);
-        double v_ex = Vm(bus_ex_solver_id);
-        double bus_vn_kv_or = bus_vn_kv(bus_or_id_me);
-        double bus_vn_kv_ex = bus_vn_kv(bus_ex_id_me);
-        res_powerline_vor_(line_id) = v_or * bus_vn_kv_or;
-        res_powerline_vex_(line_id) = v_ex * bus_vn_kv_ex;
-    }
-    _get_amps(res_powerline_aor_, res_powerline_por_, res_powerline_qor_, res_powerline_vor_);
-    _get_amps(res_powerline_aex_, res_powerline_pex_, res_powerline_qex_, res_powerline_vex_);
+void DataLine::update_Yf_Yt(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv)
+{
+    _fill_branch_Yf_Yt(id_grid_to_solver, status_, bus_or_id_, bus_ex_id_,
+                       yac_ff_, yac_ft_, yac_tf_, yac_tt_, bus_vn_kv, Yf_Yt_);
 }
 
 double DataLine::get_p_slack(int slack_bus_id)
@@ -29,7 +29,7 @@ class DataLine : public DataGeneric
               const Eigen::VectorXi & branch_to_id
               );
 
-    int nb() { return powerlines_r_.size(); }
+    int nb() const { return powerlines_r_.size(); }
 
     void deactivate(int powerline_id, bool & need_reset) {_deactivate(powerline_id, status_, need_reset);}
     void reactivate(int powerline_id, bool & need_reset) {_reactivate(powerline_id, status_, need_reset);}
@@ -38,6 +38,8 @@ class DataLine : public DataGeneric
     int get_bus_or(int powerline_id) {return _get_bus(powerline_id, status_, bus_or_id_);}
     int get_bus_ex(int powerline_id) {return _get_bus(powerline_id, status_, bus_ex_id_);}
     virtual void fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, const std::vector<int> & id_grid_to_solver);
+    // update the coefficients of the powerlines whose status or buses changed since fillYbus was called
+    bool update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver);
     virtual void fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver);
 
     void compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
@@ -45,7 +47,16 @@ class DataLine : public DataGeneric
                          const Eigen::Ref<Eigen::VectorXcd> & V,
                          const std::vector<int> & id_grid_to_solver,
                          const Eigen::VectorXd & bus_vn_kv);
+    // admittances used by compute_results, to call each time the topology changes (before compute_results)
+    void update_Yf_Yt(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv);
     void reset_results();
+    // first order variation of the active power at the origin side of the powerlines, see GridModel::get_sensitivities
+    void get_p_or_sensitivity(const Eigen::Ref<const Eigen::VectorXcd> & V,
+                              const Eigen::MatrixXcd & dV,
+                              const std::vector<int> & id_grid_to_solver,
+                              Eigen::Ref<Eigen::MatrixXd> res){
+        _branch_p_or_sensitivity(id_grid_to_solver, status_, bus_or_id_, bus_ex_id_, yac_ff_, yac_ft_, V, dV, res);
+    }
     virtual double get_p_slack(int slack_bus_id);
     virtual void get_q(std::vector<double>& q_by_bus);
 
@@ -53,6 +64,10 @@ class DataLine : public DataGeneric
     tuple4d get_lineex_res() const {return tuple4d(res_powerline_pex_, res_powerline_qex_, res_powerline_vex_, res_powerline_aex_);}
     const std::vector<bool>& get_status() const {return status_;}
 
+    protected:
+        // compute the coefficients each powerline adds to the Ybus matrix, in AC and in DC
+        void _update_model_coeffs();
+
     protected:
         // physical properties
         Eigen::VectorXd powerlines_r_;
@@ -64,6 +79,24 @@ class DataLine : public DataGeneric
         Eigen::VectorXi bus_ex_id_;
         std::vector<bool> status_;
 
+        // model coefficients (the four "stamps" of each powerline in the Ybus matrix)
+        Eigen::VectorXcd yac_ff_;
+        Eigen::VectorXcd yac_ft_;
+        Eigen::VectorXcd yac_tf_;
+        Eigen::VectorXcd yac_tt_;
+        Eigen::VectorXcd ydc_ff_;
+        Eigen::VectorXcd ydc_ft_;
+        Eigen::VectorXcd ydc_tf_;
+        Eigen::VectorXcd ydc_tt_;
+
+        // buses of each powerline (or -1 if it is disconnected) when the ac (resp. dc) Ybus matrix was last filled / updated
+        Eigen::VectorXi ybus_ac_bus_or_;
+        Eigen::VectorXi ybus_ac_bus_ex_;
+        Eigen::VectorXi ybus_dc_bus_or_;
+        Eigen::VectorXi ybus_dc_bus_ex_;
+
+        BranchYfYt Yf_Yt_;  // admittances of the current topology, see update_Yf_Yt
+
         //output data
         Eigen::VectorXd res_powerline_por_;  // in MW
         Eigen::VectorXd res_powerline_qor_;  // in MVar
@@ -15,6 +15,7 @@ void DataLoad::init(const Eigen::VectorXd & loads_p,
     q_mvar_ = loads_q;
     bus_id_ = loads_bus_id;
     status_ = std::vector<bool>(loads_p.size(), true);
+    reset_results();
 }
 
 void DataLoad::fillSbus(Eigen::VectorXcd & Sbus, bool ac, const std::vector<int> & id_grid_to_solver){
@@ -43,30 +44,41 @@ void DataLoad::compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                                const std::vector<int> & id_grid_to_solver,
                                const Eigen::VectorXd & bus_vn_kv)
 {
-    int nb_load = nb();
-    v_kv_from_vpu(Va, Vm, status_, nb_load, bus_id_, id_grid_to_solver, bus_vn_kv, res_v_);
+    // the connected loads are given by update_active, and the results are updated in place
+    v_kv_from_vpu(Vm, active_, res_v_);
     res_p_ = p_mw_;
     res_q_ = q_mvar_;
 }
 
+void DataLoad::update_active(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv)
+{
+    _fill_active_elements(id_grid_to_solver, status_, bus_id_, bus_vn_kv, active_);
+}
+
 void DataLoad::reset_results(){
-    res_p_ = Eigen::VectorXd();  // in MW
-    res_q_ =  Eigen::VectorXd();  // in MVar
-    res_v_ = Eigen::VectorXd();  // in kV
+    // the memory of the results is kept (it is only allocated the first time)
+    int nb_element = nb();
+    res_p_.setZero(nb_element);  // in MW
+    res_q_.setZero(nb_element);  // in MVar
+    res_v_.setZero(nb_element);  // in kV
 }
 
-void DataLoad::change_p(int load_id, double new_p, bool & need_reset)
+double DataLoad::change_p(int load_id, double new_p, bool & need_reset)
 {
     bool my_status = status_.at(load_id); // and this check that load_id is not out of bound
     if(!my_status) throw std::runtime_error("Impossible to change the active value of a disconnected load");
+    double delta = new_p - p_mw_(load_id);
     p_mw_(load_id) = new_p;
+    return delta;
 }
 
-void DataLoad::change_q(int load_id, double new_q, bool & need_reset)
+double DataLoad::change_q(int load_id, double new_q, bool & need_reset)
 {
     bool my_status = status_.at(load_id); // and this check that load_id is not out of bound
     if(!my_status) throw std::runtime_error("Impossible to change the reactive value of a disconnected load");
+    double delta = new_q - q_mvar_(load_id);
     q_mvar_(load_id) = new_q;
+    return delta;
 }
 
 double DataLoad::get_p_slack(int slack_bus_id)
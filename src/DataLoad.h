@@ -33,8 +33,9 @@ class DataLoad : public DataGeneric
     void reactivate(int load_id, bool & need_reset) {_reactivate(load_id, status_, need_reset);}
     void change_bus(int load_id, int new_bus_id, bool & need_reset, int nb_bus) {_change_bus(load_id, new_bus_id, bus_id_, need_reset, nb_bus);}
     int get_bus(int load_id) {return _get_bus(load_id, status_, bus_id_);}
-    void change_p(int load_id, double new_p, bool & need_reset);
-    void change_q(int load_id, double new_q, bool & need_reset);
+    // returns the change of the value (new - previous)
+    double change_p(int load_id, double new_p, bool & need_reset);
+    double change_q(int load_id, double new_q, bool & need_reset);
 
     virtual void fillSbus(Eigen::VectorXcd & Sbus, bool ac, const std::vector<int> & id_grid_to_solver);
 
@@ -43,6 +44,8 @@ class DataLoad : public DataGeneric
                          const Eigen::Ref<Eigen::VectorXcd> & V,
                          const std::vector<int> & id_grid_to_solver,
                          const Eigen::VectorXd & bus_vn_kv);
+    // connected loads used by compute_results, to call each time the topology changes (before compute_results)
+    void update_active(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv);
     void reset_results();
     virtual double get_p_slack(int slack_bus_id);
     virtual void get_q(std::vector<double>& q_by_bus);
@@ -58,6 +61,7 @@ class DataLoad : public DataGeneric
         Eigen::VectorXd q_mvar_;
         Eigen::VectorXi bus_id_;
         std::vector<bool> status_;
+        ActiveElements active_;  // connected loads of the current topology, see update_active
 
         //output data
         Eigen::VectorXd res_p_;  // in MW
@@ -16,9 +16,14 @@ void DataShunt::init(const Eigen::VectorXd & shunt_p_mw,
     q_mvar_ = shunt_q_mvar;
     bus_id_ = shunt_bus_id;
     status_ = std::vector<bool>(p_mw_.size(), true); // by default everything is connected
+    reset_results();
 }
 
 void DataShunt::fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, const std::vector<int> & id_grid_to_solver){
+    // remember the state of the shunts used to fill the matrix (for update_Ybus)
+    _get_ybus_buses(status_, bus_id_, ac ? ybus_ac_bus_ : ybus_dc_bus_);
+    (ac ? ybus_ac_y_ : ybus_dc_y_) = -1.0 * (p_mw_.cast<cdouble>() + my_i * q_mvar_.cast<cdouble>());
+
     int nb_shunt = q_mvar_.size();
     cdouble tmp;
     int bus_id_me, bus_id_solver;
@@ -37,6 +42,10 @@ void DataShunt::fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, c
     }
 }
 void DataShunt::fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver){
+    // remember the state of the shunts used to fill the matrix (for update_Ybus)
+    _get_ybus_buses(status_, bus_id_, ac ? ybus_ac_bus_ : ybus_dc_bus_);
+    (ac ? ybus_ac_y_ : ybus_dc_y_) = -1.0 * (p_mw_.cast<cdouble>() + my_i * q_mvar_.cast<cdouble>());
+
     int nb_shunt = q_mvar_.size();
     cdouble tmp;
     int bus_id_me, bus_id_solver;
@@ -55,24 +64,56 @@ void DataShunt::fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, cons
     }
 }
 
+bool DataShunt::update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver)
+{
+    Eigen::VectorXi & ybus_bus = ac ? ybus_ac_bus_ : ybus_dc_bus_;
+    Eigen::VectorXcd & ybus_y = ac ? ybus_ac_y_ : ybus_dc_y_;
+    int nb_shunt = p_mw_.size();
+    if(ybus_bus.size() != nb_shunt || ybus_y.size() != nb_shunt) return false;
+    cdouble * values = res.valuePtr();
+    for(int shunt_id = 0; shunt_id < nb_shunt; ++shunt_id){
+        int bus_id_me = status_[shunt_id] ? bus_id_(shunt_id) : _deactivated_bus_id;
+        cdouble y = -1.0 * (p_mw_(shunt_id) + my_i * q_mvar_(shunt_id));
+        int & prev_bus_id_me = ybus_bus(shunt_id);
+        cdouble & prev_y = ybus_y(shunt_id);
+        if(bus_id_me == prev_bus_id_me && (bus_id_me == _deactivated_bus_id || y == prev_y)) continue;  // nothing changed
+
+        // remove the previous coefficient, and add the new one
+        if(prev_bus_id_me != _deactivated_bus_id){
+            int pos = _get_coeff_position(res, id_grid_to_solver[prev_bus_id_me], id_grid_to_solver[prev_bus_id_me]);
+            if(pos == -1) return false;
+            values[pos] -= prev_y;
+            prev_bus_id_me = _deactivated_bus_id;
+        }
+        if(bus_id_me != _deactivated_bus_id){
+            int bus_id_solver = id_grid_to_solver[bus_id_me];
+            if(bus_id_solver == _deactivated_bus_id){
+                throw std::runtime_error("DataShunt::update_Ybus: A shunt is connected to a disconnected bus.");
+            }
+            int pos = _get_coeff_position(res, bus_id_solver, bus_id_solver);
+            if(pos == -1) return false;
+            values[pos] += y;
+            prev_bus_id_me = bus_id_me;
+            prev_y = y;
+        }
+    }
+    return true;
+}
+
 void DataShunt::compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                                const Eigen::Ref<Eigen::VectorXd> & Vm,
                                const Eigen::Ref<Eigen::VectorXcd> & V,
                                const std::vector<int> & id_grid_to_solver,
                                const Eigen::VectorXd & bus_vn_kv)
 {
-    int nb_shunt = p_mw_.size();
-    v_kv_from_vpu(Va, Vm, status_, nb_shunt, bus_id_, id_grid_to_solver, bus_vn_kv, res_v_);
-    res_p_ = Eigen::VectorXd::Constant(nb_shunt, 0.);
-    res_q_ = Eigen::VectorXd::Constant(nb_shunt, 0.);
-    for(int shunt_id = 0; shunt_id < nb_shunt; ++shunt_id){
-        if(!status_[shunt_id]) continue;
-        int bus_id_me = bus_id_(shunt_id);
-        int bus_solver_id = id_grid_to_solver[bus_id_me];
-        if(bus_solver_id == _deactivated_bus_id){
-            throw std::runtime_error("DataShunt::compute_results: A shunt is connected to a disconnected bus.");
-        }
-        cdouble E = V(bus_solver_id);
+    // the connected shunts are given by update_active, and the results are updated in place
+    v_kv_from_vpu(Vm, active_, res_v_);
+    res_p_.setZero();
+    res_q_.setZero();
+    int nb_active = active_.el_ids.size();
+    for(int active_id = 0; active_id < nb_active; ++active_id){
+        int shunt_id = active_.el_ids[active_id];
+        cdouble E = V(active_.bus_solver[active_id]);
         cdouble y = -1.0 * (p_mw_(shunt_id) + my_i * q_mvar_(shunt_id));
         cdouble I = y * E;
         I = std::conj(I);
@@ -82,10 +123,17 @@ void DataShunt::compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
     }
 }
 
+void DataShunt::update_active(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv)
+{
+    _fill_active_elements(id_grid_to_solver, status_, bus_id_, bus_vn_kv, active_);
+}
+
 void DataShunt::reset_results(){
-    res_p_ = Eigen::VectorXd();  // in MW
-    res_q_ = Eigen::VectorXd();  // in MVar
-    res_v_ = Eigen::VectorXd();  // in kV
+    // the memory of the results is kept (it is only allocated the first time)
+    int nb_element = p_mw_.size();
+    res_p_.setZero(nb_element);  // in MW
+    res_q_.setZero(nb_element);  // in MVar
+    res_v_.setZero(nb_element);  // in kV
 }
 
 void DataShunt::change_p(int shunt_id, double new_p, bool & need_reset)
@@ -38,12 +38,16 @@ class DataShunt : public DataGeneric
 
     virtual void fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, const std::vector<int> & id_grid_to_solver);
     virtual void fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver);
+    // update the coefficients of the shunts whose status, bus or value changed since fillYbus was called
+    bool update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver);
 
     void compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                          const Eigen::Ref<Eigen::VectorXd> & Vm,
                          const Eigen::Ref<Eigen::VectorXcd> & V,
                          const std::vector<int> & id_grid_to_solver,
                          const Eigen::VectorXd & bus_vn_kv);
+    // connected shunts used by compute_results, to call each time the topology changes (before compute_results)
+    void update_active(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv);
     void reset_results();
     virtual double get_p_slack(int slack_bus_id);
     virtual void get_q(std::vector<double>& q_by_bus);
@@ -59,6 +63,14 @@ class DataShunt : public DataGeneric
         Eigen::VectorXd q_mvar_;
         Eigen::VectorXi bus_id_;
         std::vector<bool> status_;
+        ActiveElements active_;  // connected shunts of the current topology, see update_active
+
+        // bus (or -1 if it is disconnected) and coefficient of each shunt when the ac (resp. dc) Ybus matrix was last
+        // filled / updated
+        Eigen::VectorXi ybus_ac_bus_;
+        Eigen::VectorXcd ybus_ac_y_;
+        Eigen::VectorXi ybus_dc_bus_;
+        Eigen::VectorXcd ybus_dc_y_;
 
         //output data
         Eigen::VectorXd res_p_;  // in MW
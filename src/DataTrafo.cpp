@@ -33,13 +33,64 @@ void DataTrafo::init(const Eigen::VectorXd & trafo_r,
     bus_hv_id_ = trafo_hv_id;
     bus_lv_id_ = trafo_lv_id;
     status_ = std::vector<bool>(trafo_r.size(), true);
+    _update_model_coeffs();
+    reset_results();
+}
+
+void DataTrafo::_update_model_coeffs()
+{
+    int size = r_.size();
+    yac_ff_ = Eigen::VectorXcd::Zero(size);
+    yac_ft_ = Eigen::VectorXcd::Zero(size);
+    yac_tf_ = Eigen::VectorXcd::Zero(size);
+    yac_tt_ = Eigen::VectorXcd::Zero(size);
+    ydc_ff_ = Eigen::VectorXcd::Zero(size);
+    ydc_ft_ = Eigen::VectorXcd::Zero(size);
+    ydc_tf_ = Eigen::VectorXcd::Zero(size);
+    ydc_tt_ = Eigen::VectorXcd::Zero(size);
+    for(int trafo_id = 0; trafo_id < size; ++trafo_id){
+        // get the transformers ratio
+        double r = ratio_(trafo_id);
+
+        // for AC
+        // subsecptance
+        cdouble h = my_i * 0.5 * h_(trafo_id);
+
+        // admittance
+        cdouble y = 0.;
+        cdouble z = r_(trafo_id) + my_i * x_(trafo_id);
+        if(z != 0.) y = 1.0 / z;
+
+        cdouble tmp = y / r;
+        yac_ft_(trafo_id) = -tmp;
+        yac_tf_(trafo_id) = -tmp;
+        yac_ff_(trafo_id) = (tmp + h) / r;
+        yac_tt_(trafo_id) = (tmp + h) * r;
+
+        // for DC
+        // no subsceptance, only the reactance and r = 1.0 on the diagonal (same voltage both side)
+        cdouble ydc = 0.;
+        double x = x_(trafo_id);
+        if(x != 0.) ydc = 1.0 / x;
+        tmp = ydc / r;
+        ydc_ft_(trafo_id) = -tmp;
+        ydc_tf_(trafo_id) = -tmp;
+        ydc_ff_(trafo_id) = tmp;
+        ydc_tt_(trafo_id) = tmp;
+    }
 }
 
 void DataTrafo::fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver)
 {
-    //TODO merge that with fillYbusBranch!
-    //TODO template here instead of "if"
+    // remember the state of the trafos used to fill the matrix (for update_Ybus)
+    _get_ybus_buses(status_, bus_hv_id_, ac ? ybus_ac_bus_or_ : ybus_dc_bus_or_);
+    _get_ybus_buses(status_, bus_lv_id_, ac ? ybus_ac_bus_ex_ : ybus_dc_bus_ex_);
+
     int nb_trafo = nb();
+    const Eigen::VectorXcd & y_ff = ac ? yac_ff_ : ydc_ff_;
+    const Eigen::VectorXcd & y_ft = ac ? yac_ft_ : ydc_ft_;
+    const Eigen::VectorXcd & y_tf = ac ? yac_tf_ : ydc_tf_;
+    const Eigen::VectorXcd & y_tt = ac ? yac_tt_ : ydc_tt_;
     for(int trafo_id =0; trafo_id < nb_trafo; ++trafo_id){
         // i don't do anything if the trafo is disconnected
         if(!status_[trafo_id]) continue;
@@ -56,45 +107,27 @@ void DataTrafo::fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, cons
             throw std::runtime_error("DataModel::fillYbusTrafo: A trafo is connected (lv) to a disconnected bus.");
         }
 
-        // get the transformers ratio
-        double r = ratio_(trafo_id);
-
-        // subsecptance
-        cdouble h = 0.;
-        if(ac){
-            h = h_(trafo_id);
-            h = my_i * 0.5 * h;
-        }
-
-        // admittance
-        cdouble y = 0.;
-        cdouble z = x_(trafo_id);
-        if(ac){
-            z *= my_i;
-            z += r_(trafo_id);
-        }
-        if(z != 0.) y = 1.0 / z;
-
         // fill non diagonal coefficient
-        cdouble tmp = y / r;
-        res.coeffRef(bus_hv_solver_id, bus_lv_solver_id) -= tmp ;
-        res.coeffRef(bus_lv_solver_id, bus_hv_solver_id) -= tmp;
+        res.coeffRef(bus_hv_solver_id, bus_lv_solver_id) += y_ft(trafo_id);
+        res.coeffRef(bus_lv_solver_id, bus_hv_solver_id) += y_tf(trafo_id);
 
         // fill diagonal coefficient
-        if(!ac){
-            r = 1.0; // in dc, r = 1.0 here (same voltage both side)
-        }
-        tmp += h;
-        res.coeffRef(bus_hv_solver_id, bus_hv_solver_id) += tmp / r ;
-        res.coeffRef(bus_lv_solver_id, bus_lv_solver_id) += tmp * r;
+        res.coeffRef(bus_hv_solver_id, bus_hv_solver_id) += y_ff(trafo_id);
+        res.coeffRef(bus_lv_solver_id, bus_lv_solver_id) += y_tt(trafo_id);
     }
 }
 
 void DataTrafo::fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, const std::vector<int> & id_grid_to_solver)
 {
-    //TODO merge that with fillYbusBranch!
-    //TODO template here instead of "if"
+    // remember the state of the trafos used to fill the matrix (for update_Ybus)
+    _get_ybus_buses(status_, bus_hv_id_, ac ? ybus_ac_bus_or_ : ybus_dc_bus_or_);
+    _get_ybus_buses(status_, bus_lv_id_, ac ? ybus_ac_bus_ex_ : ybus_dc_bus_ex_);
+
     int nb_trafo = nb();
+    const Eigen::VectorXcd & y_ff = ac ? yac_ff_ : ydc_ff_;
+    const Eigen::VectorXcd & y_ft = ac ? yac_ft_ : ydc_ft_;
+    const Eigen::VectorXcd & y_tf = ac ? yac_tf_ : ydc_tf_;
+    const Eigen::VectorXcd & y_tt = ac ? yac_tt_ : ydc_tt_;
     for(int trafo_id =0; trafo_id < nb_trafo; ++trafo_id){
         // i don't do anything if the trafo is disconnected
         if(!status_[trafo_id]) continue;
@@ -111,40 +144,26 @@ void DataTrafo::fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, c
             throw std::runtime_error("DataModel::fillYbusTrafo: A trafo is connected (lv) to a disconnected bus.");
         }
 
-        // get the transformers ratio
-        double r = ratio_(trafo_id);
-
-        // subsecptance
-        cdouble h = 0.;
-        if(ac){
-            h = h_(trafo_id);
-            h = my_i * 0.5 * h;
-        }
-
-        // admittance
-        cdouble y = 0.;
-        cdouble z = x_(trafo_id);
-        if(ac){
-            z *= my_i;
-            z += r_(trafo_id);
-        }
-        if(z != 0.) y = 1.0 / z;
-
         // fill non diagonal coefficient
-        cdouble tmp = y / r;
-        res.push_back(Eigen::Triplet<cdouble> (bus_hv_solver_id, bus_lv_solver_id, -tmp));
-        res.push_back(Eigen::Triplet<cdouble> (bus_lv_solver_id, bus_hv_solver_id, -tmp));
+        res.push_back(Eigen::Triplet<cdouble> (bus_hv_solver_id, bus_lv_solver_id, y_ft(trafo_id)));
+        res.push_back(Eigen::Triplet<cdouble> (bus_lv_solver_id, bus_hv_solver_id, y_tf(trafo_id)));
 
         // fill diagonal coefficient
-        if(!ac){
-            r = 1.0; // in dc, r = 1.0 here (same voltage both side)
-        }
-        tmp += h;
-        res.push_back(Eigen::Triplet<cdouble>(bus_hv_solver_id, bus_hv_solver_id, tmp / r));
-        res.push_back(Eigen::Triplet<cdouble>(bus_lv_solver_id, bus_lv_solver_id, tmp * r));
+        res.push_back(Eigen::Triplet<cdouble>(bus_hv_solver_id, bus_hv_solver_id, y_ff(trafo_id)));
+        res.push_back(Eigen::Triplet<cdouble>(bus_lv_solver_id, bus_lv_solver_id, y_tt(trafo_id)));
     }
 }
 
+bool DataTrafo::update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver)
+{
+    if(ac){
+        return _update_branch_Ybus(res, id_grid_to_solver, status_, bus_hv_id_, bus_lv_id_,
+                                   yac_ff_, yac_ft_, yac_tf_, yac_tt_, ybus_ac_bus_or_, ybus_ac_bus_ex_);
+    }
+    return _update_branch_Ybus(res, id_grid_to_solver, status_, bus_hv_id_, bus_lv_id_,
+                               ydc_ff_, ydc_ft_, ydc_tf_, ydc_tt_, ybus_dc_bus_or_, ybus_dc_bus_ex_);
+}
+
 void DataTrafo::compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                          const Eigen::Ref<Eigen::VectorXd> & Vm,
                          const Eigen::Ref<Eigen::VectorXcd> & V,
@@ -152,79 +171,29 @@ void DataTrafo::compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                          const Eigen::VectorXd & bus_vn_kv
                               )
 {
-    // it needs to be initialized at 0.
-    int nb_element = nb();
-    res_p_hv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MW
-    res_q_hv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MVar
-    res_v_hv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kV
-    res_a_hv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kA
-    res_p_lv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MW
-    res_q_lv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in MVar
-    res_v_lv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kV
-    res_a_lv_ = Eigen::VectorXd::Constant(nb_element, 0.0);  // in kA
-    for(int line_id = 0; line_id < nb_element; ++line_id){
-        // don't do anything if the element is disconnected
-        if(!status_[line_id]) continue;
-
-        //physical properties
-        double r = r_(line_id);
-        double x = x_(line_id);
-        double ratio_me = ratio_(line_id);
-        cdouble h = my_i * 0.5 * h_(line_id);
-        cdouble y = 1.0 / (r + my_i * x);
-        y /= ratio_me;
-
-        // connectivity
-        int bus_or_id_me = bus_hv_id_(line_id);
-        int bus_or_solver_id = id_grid_to_solver[bus_or_id_me];
-        if(bus_or_solver_id == _deactivated_bus_id){
-            throw std::runtime_error("DataTrafo::compute_results: A trafo is connected (hv) to a disconnected bus.");
-        }
-        int bus_ex_id_me = bus_lv_id_(line_id);
-        int bus_ex_solver_id = id_grid_to_solver[bus_ex_id_me];
-        if(bus_ex_solver_id == _deactivated_bus_id){
-            throw std::runtime_error("DataTrafo::compute_results: A trafo is connected (lv) to a disconnected bus.");
-        }
+    // all the branches at once, from the admittances of the current topology (see update_Yf_Yt)
+    _branch_results(Yf_Yt_, V, Vm,
+                    res_p_hv_, res_q_hv_, res_v_hv_, res_a_hv_,
+                    res_p_lv_, res_q_lv_, res_v_lv_, res_a_lv_);
+}
 
-        // results of the powerflow
-        cdouble Eor = V(bus_or_solver_id);
-        cdouble Eex = V(bus_ex_solver_id);
-
-        // powerline equations
-        cdouble I_orex = (y + h) / ratio_me * Eor - y * Eex;
-        cdouble I_exor = (y + h) * ratio_me * Eex - y * Eor;
-
-        I_orex = std::conj(I_orex);
-        I_exor = std::conj(I_exor);
-        cdouble s_orex = Eor * I_orex;
-        cdouble s_exor = Eex * I_exor;
-
-        res_p_hv_(line_id) = std::real(s_orex);
-        res_q_hv_(line_id) = std::imag(s_orex);
-        res_p_lv_(line_id) = std::real(s_exor);
-        res_q_lv_(line_id) = std::imag(s_exor);
-
-        // retrieve voltages magnitude in kv instead of pu
-        double v_or = Vm(bus_or_solver_id);
-        double v_ex = Vm(bus_ex_solver_id);
-        double bus_vn_kv_or = bus_vn_kv(bus_or_id_me);
-        double bus_vn_kv_ex = bus_vn_kv(bus_ex_id_me);
-        res_v_hv_(line_id) = v_or * bus_vn_kv_or;
-        res_v_lv_(line_id) = v_ex * bus_vn_kv_ex;
-    }
-    _get_amps(res_a_hv_, res_p_hv_, res_q_hv_, res_v_hv_);
-    _get_amps(res_a_lv_, res_p_lv_, res_q_lv_, res_v_lv_);
+void DataTrafo::update_Yf_Yt(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv)
+{
+    _fill_branch_Yf_Yt(id_grid_to_solver, status_, bus_hv_id_, bus_lv_id_,
+                       yac_ff_, yac_ft_, yac_tf_, yac_tt_, bus_vn_kv, Yf_Yt_);
 }
 
 void DataTrafo::reset_results(){
-    res_p_hv_ = Eigen::VectorXd();  // in MW
-    res_q_hv_ = Eigen::VectorXd();  // in MVar
-    res_v_hv_ = Eigen::VectorXd();  // in kV
-    res_a_hv_ = Eigen::VectorXd();  // in kA
-    res_p_lv_ = Eigen::VectorXd();  // in MW
-    res_q_lv_ = Eigen::VectorXd();  // in MVar
-    res_v_lv_ = Eigen::VectorXd();  // in kV
-    res_a_lv_ = Eigen::VectorXd();  // in kA
+    // the memory of the results is kept (it is only allocated the first time)
+    int nb_element = nb();
+    res_p_hv_.setZero(nb_element);  // in MW
+    res_q_hv_.setZero(nb_element);  // in MVar
+    res_v_hv_.setZero(nb_element);  // in kV
+    res_a_hv_.setZero(nb_element);  // in kA
+    res_p_lv_.setZero(nb_element);  // in MW
+    res_q_lv_.setZero(nb_element);  // in MVar
+    res_v_lv_.setZero(nb_element);  // in kV
+    res_a_lv_.setZero(nb_element);  // in kA
 }
 
 double DataTrafo::get_p_slack(int slack_bus_id)
@@ -33,7 +33,7 @@ class DataTrafo : public DataGeneric
                            const Eigen::VectorXi & trafo_lv_id
               );
 
-    int nb() { return r_.size(); }
+    int nb() const { return r_.size(); }
 
     void deactivate(int trafo_id, bool & need_reset) {_deactivate(trafo_id, status_, need_reset);}
     void reactivate(int trafo_id, bool & need_reset) {_reactivate(trafo_id, status_, need_reset);}
@@ -44,13 +44,24 @@ class DataTrafo : public DataGeneric
 
     virtual void fillYbus_spmat(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver);
     virtual void fillYbus(std::vector<Eigen::Triplet<cdouble> > & res, bool ac, const std::vector<int> & id_grid_to_solver);
+    // update the coefficients of the trafos whose status or buses changed since fillYbus was called
+    bool update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int> & id_grid_to_solver);
 
     void compute_results(const Eigen::Ref<Eigen::VectorXd> & Va,
                          const Eigen::Ref<Eigen::VectorXd> & Vm,
                          const Eigen::Ref<Eigen::VectorXcd> & V,
                          const std::vector<int> & id_grid_to_solver,
                          const Eigen::VectorXd & bus_vn_kv);
+    // admittances used by compute_results, to call each time the topology changes (before compute_results)
+    void update_Yf_Yt(const std::vector<int> & id_grid_to_solver, const Eigen::VectorXd & bus_vn_kv);
     void reset_results();
+    // first order variation of the active power at the high voltage side of the trafos, see GridModel::get_sensitivities
+    void get_p_hv_sensitivity(const Eigen::Ref<const Eigen::VectorXcd> & V,
+                              const Eigen::MatrixXcd & dV,
+                              const std::vector<int> & id_grid_to_solver,
+                              Eigen::Ref<Eigen::MatrixXd> res){
+        _branch_p_or_sensitivity(id_grid_to_solver, status_, bus_hv_id_, bus_lv_id_, yac_ff_, yac_ft_, V, dV, res);
+    }
     virtual double get_p_slack(int slack_bus_id);
     virtual void get_q(std::vector<double>& q_by_bus);
 
@@ -58,6 +69,10 @@ class DataTrafo : public DataGeneric
     tuple4d get_res_lv() const {return tuple4d(res_p_lv_, res_q_lv_, res_v_lv_, res_a_lv_);}
     const std::vector<bool>& get_status() const {return status_;}
 
+    protected:
+        // compute the coefficients each trafo adds to the Ybus matrix, in AC and in DC
+        void _update_model_coeffs();
+
     protected:
         // physical properties
         Eigen::VectorXd r_;
@@ -70,6 +85,24 @@ class DataTrafo : public DataGeneric
         std::vector<bool> status_;
         Eigen::VectorXd ratio_;
 
+        // model coefficients (the four "stamps" of each trafo in the Ybus matrix)
+        Eigen::VectorXcd yac_ff_;
+        Eigen::VectorXcd yac_ft_;
+        Eigen::VectorXcd yac_tf_;
+        Eigen::VectorXcd yac_tt_;
+        Eigen::VectorXcd ydc_ff_;
+        Eigen::VectorXcd ydc_ft_;
+        Eigen::VectorXcd ydc_tf_;
+        Eigen::VectorXcd ydc_tt_;
+
+        // buses of each trafo (or -1 if it is disconnected) when the ac (resp. dc) Ybus matrix was last filled / updated
+        Eigen::VectorXi ybus_ac_bus_or_;
+        Eigen::VectorXi ybus_ac_bus_ex_;
+        Eigen::VectorXi ybus_dc_bus_or_;
+        Eigen::VectorXi ybus_dc_bus_ex_;
+
+        BranchYfYt Yf_Yt_;  // admittances of the current topology, see update_Yf_Yt
+
         //output data
         Eigen::VectorXd res_p_hv_;  // in MW
         Eigen::VectorXd res_q_hv_;  // in MVar
@@ -20,11 +20,12 @@ void GridModel::init_bus(const Eigen::VectorXd & bus_vn_kv, int nb_line, int nb_
     bus_vn_kv_ = bus_vn_kv;  // base_kv
 
     bus_status_ = std::vector<bool>(nb_bus, true); // by default everything is connected
+    grid_changed();
 }
 
 void GridModel::reset()
 {
-    Ybus_ = Eigen::SparseMatrix<cdouble>();
+    // Ybus_ is kept: its sparsity pattern is reused by the next call to fillYbus if it did not change
     Sbus_ = Eigen::VectorXcd();
     id_me_to_solver_ = std::vector<int>();
     id_solver_to_me_ = std::vector<int>();
@@ -43,20 +44,41 @@ Eigen::VectorXcd GridModel::ac_pf(const Eigen::VectorXcd & Vinit,
     if(Vinit.size() != nb_bus){
         throw std::runtime_error("Size of the Vinit should be the same as the total number of buses (both conencted and disconnected). Components of Vinit corresponding to deactivated bys will be ignored anyway.");
     }
+    Profiler::Scope profile(profiler_, ProfilePhase::AcPf);
     bool conv = false;
     Eigen::VectorXcd res = Eigen::VectorXcd();
     Eigen::VectorXcd res_tmp = Eigen::VectorXcd();
 
-    // if(need_reset_){ // TODO optimization when it's not mandatory to start from scratch
-    reset();
-    slack_bus_id_ = generators_.get_slack_bus_id(gen_slackbus_);
-    init_Ybus(Ybus_, Sbus_, id_me_to_solver_, id_solver_to_me_, slack_bus_id_solver_);
-    fillYbus(Ybus_, true, id_me_to_solver_);
-    fillpv_pq(id_me_to_solver_);
-    generators_.init_q_vector(bus_vn_kv_.size());
-    _solver.reset();
-    // }
-    fillSbus_me(Sbus_, true, id_me_to_solver_, slack_bus_id_solver_);
+    if(need_reset_){
+        reset();
+        slack_bus_id_ = generators_.get_slack_bus_id(gen_slackbus_);
+        {
+            Profiler::Scope profile_ybus(profiler_, ProfilePhase::Ybus);
+            init_Ybus(Ybus_, Sbus_, id_me_to_solver_, id_solver_to_me_, slack_bus_id_solver_);
+            assemble_Ybus(Ybus_, true, id_me_to_solver_, id_solver_to_me_);
+        }
+        if(!update_islands(id_me_to_solver_, id_solver_to_me_, slack_bus_id_solver_)){
+            // no need to try the newton raphson, it cannot converge
+            _solver.reset();
+            reset_results();
+            return res;
+        }
+        fillpv_pq(id_me_to_solver_);
+        {
+            // what the results need from the topology
+            Profiler::Scope profile_results_init(profiler_, ProfilePhase::ResultsInit);
+            powerlines_.update_Yf_Yt(id_me_to_solver_, bus_vn_kv_);
+            trafos_.update_Yf_Yt(id_me_to_solver_, bus_vn_kv_);
+            loads_.update_active(id_me_to_solver_, bus_vn_kv_);
+            shunts_.update_active(id_me_to_solver_, bus_vn_kv_);
+            generators_.update_active(id_me_to_solver_, bus_vn_kv_);
+        }
+        generators_.init_q_vector(bus_vn_kv_.size());
+        linear_solver_used_ = linear_solver_for(id_solver_to_me_.size());
+        _solver.set_linear_solver(linear_solver_used_);  // also resets the solver
+        fillSbus_me(Sbus_, true, id_me_to_solver_, slack_bus_id_solver_);
+    }
+    // otherwise Sbus_ has been kept up to date by update_Sbus
 
     int nb_bus_solver = id_solver_to_me_.size();
     Eigen::VectorXcd V = Eigen::VectorXcd::Constant(id_solver_to_me_.size(), 1.04);
@@ -93,6 +115,187 @@ Eigen::VectorXcd GridModel::ac_pf(const Eigen::VectorXcd & Vinit,
     return res;
 };
 
+std::tuple<Eigen::MatrixXcd, Eigen::MatrixXcd, Eigen::MatrixXd> GridModel::get_sensitivities(const Eigen::VectorXi & bus_ids)
+{
+    if(need_reset_ || !_solver.converged()){
+        throw std::runtime_error("GridModel::get_sensitivities: a converged ac powerflow is needed, call ac_pf first.");
+    }
+    int nb_bus = bus_vn_kv_.size();
+    int nb_bus_solver = id_solver_to_me_.size();
+    int nb_inj = bus_ids.size();
+    int n_pv = bus_pv_.size();
+    int n_pq = bus_pq_.size();
+    int n_pvpq = n_pv + n_pq;
+    std::vector<int> pvpq_inv(nb_bus_solver, -1);
+    for(int inv_id = 0; inv_id < n_pv; ++inv_id) pvpq_inv[bus_pv_(inv_id)] = inv_id;
+    for(int inv_id = 0; inv_id < n_pq; ++inv_id) pvpq_inv[bus_pq_(inv_id)] = n_pv + inv_id;
+    std::vector<int> pq_inv(nb_bus_solver, -1);
+    for(int inv_id = 0; inv_id < n_pq; ++inv_id) pq_inv[bus_pq_(inv_id)] = inv_id;
+
+    // right hand sides: the active injections first, then the reactive ones
+    Eigen::MatrixXd B = Eigen::MatrixXd::Zero(n_pvpq + n_pq, 2 * nb_inj);
+    for(int inj_id = 0; inj_id < nb_inj; ++inj_id){
+        int bus_id_me = bus_ids(inj_id);
+        if(bus_id_me < 0) throw std::out_of_range("GridModel::get_sensitivities: negative bus id");
+        if(bus_id_me >= nb_bus) throw std::out_of_range("GridModel::get_sensitivities: bus id too high");
+        int bus_id_solver = id_me_to_solver_[bus_id_me];
+        if(bus_id_solver == _deactivated_bus_id) continue;  // an injection at a disconnected bus has no effect
+        if(pvpq_inv[bus_id_solver] >= 0) B(pvpq_inv[bus_id_solver], inj_id) = 1.;
+        if(pq_inv[bus_id_solver] >= 0) B(n_pvpq + pq_inv[bus_id_solver], nb_inj + inj_id) = 1.;
+    }
+    if(!_solver.solve_jacobian(Ybus_, bus_pv_, bus_pq_, B)){
+        throw std::runtime_error("GridModel::get_sensitivities: the linear system could not be solved.");
+    }
+
+    // dV = V * (dVm / Vm + j.dVa)
+    const auto & V = _solver.get_V();
+    const auto & Vm = _solver.get_Vm();
+    Eigen::MatrixXcd dV = Eigen::MatrixXcd::Zero(nb_bus_solver, 2 * nb_inj);
+    for(int k = 0; k < n_pvpq; ++k){
+        int bus_id_solver = k < n_pv ? bus_pv_(k) : bus_pq_(k - n_pv);
+        dV.row(bus_id_solver) += (my_i * V(bus_id_solver)) * B.row(k).cast<cdouble>();
+    }
+    for(int k = 0; k < n_pq; ++k){
+        int bus_id_solver = bus_pq_(k);
+        dV.row(bus_id_solver) += (V(bus_id_solver) / Vm(bus_id_solver)) * B.row(n_pvpq + k).cast<cdouble>();
+    }
+
+    // convert back to the "big" vectors
+    Eigen::MatrixXcd dV_dP = Eigen::MatrixXcd::Zero(nb_bus, nb_inj);
+    Eigen::MatrixXcd dV_dQ = Eigen::MatrixXcd::Zero(nb_bus, nb_inj);
+    for(int bus_id_me = 0; bus_id_me < nb_bus; ++bus_id_me){
+        int bus_id_solver = id_me_to_solver_[bus_id_me];
+        if(bus_id_solver == _deactivated_bus_id) continue;
+        dV_dP.row(bus_id_me) = dV.block(bus_id_solver, 0, 1, nb_inj);
+        dV_dQ.row(bus_id_me) = dV.block(bus_id_solver, nb_inj, 1, nb_inj);
+    }
+
+    int nb_line = powerlines_.nb();
+    int nb_trafo = trafos_.nb();
+    Eigen::MatrixXcd dV_P = dV.leftCols(nb_inj);
+    Eigen::MatrixXd dP_dP = Eigen::MatrixXd::Zero(nb_line + nb_trafo, nb_inj);
+    powerlines_.get_p_or_sensitivity(V, dV_P, id_me_to_solver_, dP_dP.topRows(nb_line));
+    trafos_.get_p_hv_sensitivity(V, dV_P, id_me_to_solver_, dP_dP.bottomRows(nb_trafo));
+    return std::tuple<Eigen::MatrixXcd, Eigen::MatrixXcd, Eigen::MatrixXd>(dV_dP, dV_dQ, dP_dP);
+}
+
+void GridModel::change_topology(int el_type, int el_id, int new_bus){
+    bool connect = new_bus >= 0;
+    switch(el_type){
+        case 0:
+            if(connect){reactivate_load(el_id); change_bus_load(el_id, new_bus);}
+            else deactivate_load(el_id);
+            break;
+        case 1:
+            if(connect){reactivate_gen(el_id); change_bus_gen(el_id, new_bus);}
+            else deactivate_gen(el_id);
+            break;
+        case 2:
+            if(connect){reactivate_powerline(el_id); change_bus_powerline_or(el_id, new_bus);}
+            else deactivate_powerline(el_id);
+            break;
+        case 3:
+            if(connect){reactivate_powerline(el_id); change_bus_powerline_ex(el_id, new_bus);}
+            else deactivate_powerline(el_id);
+            break;
+        case 4:
+            if(connect){reactivate_trafo(el_id); change_bus_trafo_hv(el_id, new_bus);}
+            else deactivate_trafo(el_id);
+            break;
+        case 5:
+            if(connect){reactivate_trafo(el_id); change_bus_trafo_lv(el_id, new_bus);}
+            else deactivate_trafo(el_id);
+            break;
+        case 6:
+            if(connect){reactivate_shunt(el_id); change_bus_shunt(el_id, new_bus);}
+            else deactivate_shunt(el_id);
+            break;
+        default:
+            throw std::runtime_error("GridModel::change_topology: unknown type of element");
+    }
+}
+
+std::tuple<Eigen::VectorXi, Eigen::MatrixXd, Eigen::MatrixXd> GridModel::simulate_topologies(const Eigen::VectorXcd & Vinit,
+                                                                                            const Eigen::VectorXi & action_ptr,
+                                                                                            const Eigen::VectorXi & el_type,
+                                                                                            const Eigen::VectorXi & el_id,
+                                                                                            const Eigen::VectorXi & el_bus,
+                                                                                            const Eigen::MatrixXi & bus_status,
+                                                                                            int max_iter,
+                                                                                            double tol,
+                                                                                            int nb_thread) const
+{
+    int nb_bus = bus_vn_kv_.size();
+    int nb_action = action_ptr.size() - 1;
+    int nb_change = el_type.size();
+    if(nb_action < 0) throw std::runtime_error("GridModel::simulate_topologies: action_ptr should not be empty");
+    if((el_id.size() != nb_change) || (el_bus.size() != nb_change)){
+        throw std::runtime_error("GridModel::simulate_topologies: el_type, el_id and el_bus should have the same size");
+    }
+    if((action_ptr(0) != 0) || (action_ptr(nb_action) != nb_change)){
+        throw std::runtime_error("GridModel::simulate_topologies: action_ptr should start at 0 and end with the number of changes");
+    }
+    for(int action_id = 0; action_id < nb_action; ++action_id){
+        if(action_ptr(action_id + 1) < action_ptr(action_id)){
+            throw std::runtime_error("GridModel::simulate_topologies: action_ptr should be sorted");
+        }
+    }
+    if((bus_status.rows() != nb_action) || (bus_status.cols() != nb_bus)){
+        throw std::runtime_error("GridModel::simulate_topologies: bus_status should have one row per action and one column per bus");
+    }
+    if(Vinit.size() != nb_bus){
+        throw std::runtime_error("GridModel::simulate_topologies: Vinit should have one component per bus");
+    }
+
+    int nb_line = powerlines_.nb();
+    int nb_trafo = trafos_.nb();
+    double nan = std::numeric_limits<double>::quiet_NaN();
+    Eigen::VectorXi converged = Eigen::VectorXi::Zero(nb_action);
+    Eigen::MatrixXd res_a = Eigen::MatrixXd::Constant(nb_action, nb_line + nb_trafo, nan);
+    Eigen::MatrixXd res_p = Eigen::MatrixXd::Constant(nb_action, nb_line + nb_trafo, nan);
+
+    // each thread evaluates the topologies thread_id, thread_id + nb_thread, ... each time from a copy of this grid
+    // (the rows of the results written by the different threads do not overlap)
+    auto evaluate = [&](int thread_id){
+        for(int action_id = thread_id; action_id < nb_action; action_id += nb_thread){
+            try{
+                GridModel model(*this);
+                for(int change_id = action_ptr(action_id); change_id < action_ptr(action_id + 1); ++change_id){
+                    model.change_topology(el_type(change_id), el_id(change_id), el_bus(change_id));
+                }
+                for(int bus_id = 0; bus_id < nb_bus; ++bus_id){
+                    int status = bus_status(action_id, bus_id);
+                    if(status == 1) model.reactivate_bus(bus_id);
+                    else if(status == 0) model.deactivate_bus(bus_id);
+                }
+                Eigen::VectorXcd V = model.ac_pf(Vinit, max_iter, tol);
+                if(V.size() == 0) continue;
+                converged(action_id) = 1;
+                tuple4d line_res = model.get_lineor_res();
+                tuple4d trafo_res = model.get_trafohv_res();
+                res_p.block(action_id, 0, 1, nb_line) = std::get<0>(line_res).transpose();
+                res_a.block(action_id, 0, 1, nb_line) = std::get<3>(line_res).transpose();
+                res_p.block(action_id, nb_line, 1, nb_trafo) = std::get<0>(trafo_res).transpose();
+                res_a.block(action_id, nb_line, 1, nb_trafo) = std::get<3>(trafo_res).transpose();
+            } catch(const std::exception &){
+                // invalid topology (for example an element connected to a non existing bus): it "diverges"
+                converged(action_id) = 0;
+            }
+        }
+    };
+
+    if(nb_thread > nb_action) nb_thread = nb_action;
+    if(nb_thread <= 1){
+        nb_thread = 1;
+        evaluate(0);
+    } else {
+        std::vector<std::thread> threads;
+        for(int thread_id = 0; thread_id < nb_thread; ++thread_id) threads.push_back(std::thread(evaluate, thread_id));
+        for(auto & thread : threads) thread.join();
+    }
+    return std::tuple<Eigen::VectorXi, Eigen::MatrixXd, Eigen::MatrixXd>(converged, res_a, res_p);
+}
+
 void GridModel::init_Ybus(Eigen::SparseMatrix<cdouble> & Ybus, Eigen::VectorXcd & Sbus,
                           std::vector<int>& id_me_to_solver, std::vector<int>& id_solver_to_me,
                           int & slack_bus_id_solver){
@@ -113,8 +316,11 @@ void GridModel::init_Ybus(Eigen::SparseMatrix<cdouble> & Ybus, Eigen::VectorXcd
     }
     int nb_bus = id_solver_to_me.size();
 
-    Ybus = Eigen::SparseMatrix<cdouble>(nb_bus, nb_bus);
-    Ybus.reserve(nb_bus + 2*powerlines_.nb() + 2*trafos_.nb());
+    if(Ybus.rows() != nb_bus || Ybus.cols() != nb_bus){
+        // otherwise the matrix is kept, and its values are overwritten by fillYbus
+        Ybus = Eigen::SparseMatrix<cdouble>(nb_bus, nb_bus);
+        Ybus.reserve(nb_bus + 2*powerlines_.nb() + 2*trafos_.nb());
+    }
 
     Sbus = Eigen::VectorXcd::Constant(nb_bus, 0.);
     slack_bus_id_solver = id_me_to_solver[slack_bus_id_];
@@ -128,22 +334,101 @@ void GridModel::fillYbus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std:
     /**
     Supposes that the powerlines, shunt and transformers are initialized.
     And it fills the Ybus matrix.
+
+    If the sparsity pattern of the matrix did not change since the last call, the coefficients are directly
+    added at their position in the matrix (no sorting of the triplets is performed). Otherwise the matrix is
+    rebuilt from the triplets.
     **/
+    YbusScatter & scatter = ac ? ybus_ac_scatter_ : ybus_dc_scatter_;
 
     // init the Ybus matrix
-    std::vector<Eigen::Triplet<cdouble> > tripletList;
-    tripletList.reserve(bus_vn_kv_.size() + 4*powerlines_.nb() + 4*trafos_.nb() + shunts_.nb());
-    powerlines_.fillYbus(tripletList, ac, id_me_to_solver);
-    shunts_.fillYbus(tripletList, ac, id_me_to_solver);
-    trafos_.fillYbus(tripletList, ac, id_me_to_solver);
-    loads_.fillYbus(tripletList, ac, id_me_to_solver);
-    generators_.fillYbus(tripletList, ac, id_me_to_solver);
-    res.setFromTriplets(tripletList.begin(), tripletList.end());
+    ybus_triplets_.clear();
+    ybus_triplets_.reserve(bus_vn_kv_.size() + 4*powerlines_.nb() + 4*trafos_.nb() + shunts_.nb());
+    powerlines_.fillYbus(ybus_triplets_, ac, id_me_to_solver);
+    shunts_.fillYbus(ybus_triplets_, ac, id_me_to_solver);
+    trafos_.fillYbus(ybus_triplets_, ac, id_me_to_solver);
+    loads_.fillYbus(ybus_triplets_, ac, id_me_to_solver);
+    generators_.fillYbus(ybus_triplets_, ac, id_me_to_solver);
+    if(scatter_add_Ybus(res, scatter)) return;
+
+    // the sparsity pattern changed
+    res.setFromTriplets(ybus_triplets_.begin(), ybus_triplets_.end());
     res.makeCompressed();
+    init_Ybus_scatter(res, scatter);
+}
+
+void GridModel::assemble_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac,
+                              const std::vector<int>& id_me_to_solver, const std::vector<int>& id_solver_to_me){
+    /**
+    The matrix is only updated for the elements that changed, unless the buses of the solver changed (or its
+    sparsity pattern would change), in which case it is filled from scratch.
+    **/
+    std::vector<int> & ybus_id_solver_to_me = ac ? ybus_ac_id_solver_to_me_ : ybus_dc_id_solver_to_me_;
+    bool can_update = ybus_id_solver_to_me == id_solver_to_me;
+    ybus_id_solver_to_me.clear();  // if an exception is raised below, the matrix will be filled from scratch next time
+    if(!can_update || !update_Ybus(res, ac, id_me_to_solver)) fillYbus(res, ac, id_me_to_solver);
+    ybus_id_solver_to_me = id_solver_to_me;
+}
+
+bool GridModel::update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int>& id_me_to_solver){
+    /**
+    Only the powerlines, shunts and transformers that changed (status, bus, or value for shunts) are updated, loads
+    and generators are not in the Ybus matrix.
+    If it returns false, some coefficients might have been updated and others not, so "res" needs to be filled
+    from scratch.
+    **/
+    if(!powerlines_.update_Ybus(res, ac, id_me_to_solver)) return false;
+    if(!shunts_.update_Ybus(res, ac, id_me_to_solver)) return false;
+    if(!trafos_.update_Ybus(res, ac, id_me_to_solver)) return false;
+    return true;
+}
+
+bool GridModel::scatter_add_Ybus(Eigen::SparseMatrix<cdouble> & Ybus, const YbusScatter & scatter)
+{
+    /**
+    The positions have been computed (and checked) once, by init_Ybus_scatter, so this only checks that the
+    elements gave the same triplets (same rows, same columns, in the same order) as then, which is only done when
+    the topology changed (otherwise the matrix is updated in place, see assemble_Ybus).
+    **/
+    int nb_triplet = ybus_triplets_.size();
+    if(static_cast<int>(scatter.pos.size()) != nb_triplet) return false;
+    if(!Ybus.isCompressed() || Ybus.nonZeros() != scatter.nnz) return false;
+    for(int k = 0; k < nb_triplet; ++k){
+        const Eigen::Triplet<cdouble> & el = ybus_triplets_[k];
+        if(el.row() != scatter.rows[k] || el.col() != scatter.cols[k]) return false;
+    }
+
+    // pure scatter add
+    cdouble * values = Ybus.valuePtr();
+    std::fill(values, values + scatter.nnz, cdouble(0.));
+    for(int k = 0; k < nb_triplet; ++k) values[scatter.pos[k]] += ybus_triplets_[k].value();
+    return true;
+}
+
+void GridModel::init_Ybus_scatter(const Eigen::SparseMatrix<cdouble> & Ybus, YbusScatter & scatter)
+{
+    // Ybus is compressed and its inner indices are sorted (it has been built with setFromTriplets from
+    // ybus_triplets_), so every triplet has its position and every coefficient comes from at least one triplet
+    int nb_triplet = ybus_triplets_.size();
+    const int * outer = Ybus.outerIndexPtr();
+    const int * inner = Ybus.innerIndexPtr();
+    scatter.rows = std::vector<int>(nb_triplet);
+    scatter.cols = std::vector<int>(nb_triplet);
+    scatter.pos = std::vector<int>(nb_triplet);
+    scatter.nnz = Ybus.nonZeros();
+    for(int k = 0; k < nb_triplet; ++k){
+        const Eigen::Triplet<cdouble> & el = ybus_triplets_[k];
+        const int * beg = inner + outer[el.col()];
+        const int * end = inner + outer[el.col() + 1];
+        scatter.rows[k] = el.row();
+        scatter.cols[k] = el.col();
+        scatter.pos[k] = std::lower_bound(beg, end, el.row()) - inner;
+    }
 }
 
 void GridModel::fillSbus_me(Eigen::VectorXcd & res, bool ac, const std::vector<int>& id_me_to_solver, int slack_bus_id_solver)
 {
+    Profiler::Scope profile(profiler_, ProfilePhase::Sbus);
     // init the Sbus vector
     powerlines_.fillSbus(res, ac, id_me_to_solver);
     shunts_.fillSbus(res, ac, id_me_to_solver);
@@ -156,14 +441,31 @@ void GridModel::fillSbus_me(Eigen::VectorXcd & res, bool ac, const std::vector<i
     res.coeffRef(slack_bus_id_solver) -= sum_active;
 }
 
+void GridModel::update_Sbus(int bus_id_me, cdouble delta)
+{
+    /**
+    Called when the injection of a load or a generator changes. Only the buses concerned by the change are
+    modified (instead of filling again Sbus_ from every element before the next powerflow): the injection at the
+    bus of the element, and the slack bus that compensates for the change in the total active power.
+    Nothing is done if Sbus_ will be filled from scratch anyway.
+    **/
+    if(need_reset_) return;
+    int bus_id_solver = id_me_to_solver_[bus_id_me];
+    Sbus_.coeffRef(bus_id_solver) += delta;
+    Sbus_.coeffRef(slack_bus_id_solver_) -= std::real(delta);
+}
+
 void GridModel::fillpv_pq(const std::vector<int>& id_me_to_solver)
 {
+    Profiler::Scope profile(profiler_, ProfilePhase::PvPq);
     // init pq and pv vector
     // TODO remove the order here..., i could be faster in this piece of code (looping once through the buses)
     int nb_bus = id_solver_to_me_.size();  // number of bus in the solver!
     std::vector<int> bus_pq;
     std::vector<int> bus_pv;
     std::vector<bool> has_bus_been_added(nb_bus, false);
+    // the reference buses of the islands are neither PV nor PQ
+    for(int bus_id : island_ref_bus_solver_) has_bus_been_added[bus_id] = true;
 
     bus_pv_ = Eigen::VectorXi();
     bus_pq_ = Eigen::VectorXi();
@@ -183,39 +485,133 @@ void GridModel::fillpv_pq(const std::vector<int>& id_me_to_solver)
     bus_pq_ = Eigen::Map<Eigen::VectorXi, Eigen::Unaligned>(bus_pq.data(), bus_pq.size());
 }
 void GridModel::compute_results(){
+    Profiler::Scope profile(profiler_, ProfilePhase::Results);
     // retrieve results from powerflow
     const auto & Va = _solver.get_Va();
     const auto & Vm = _solver.get_Vm();
     const auto & V = _solver.get_V();
-    // for powerlines
-    powerlines_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);
-    // for trafo
-    trafos_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);
-    // for loads
-    loads_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);
-    // for shunts
-    shunts_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);
-    // for prods
-    generators_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);
+    // the results of the different kind of elements are independant (see set_nb_thread)
+    parallel_invoke({
+        // for powerlines
+        [&](){powerlines_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);},
+        // for trafo
+        [&](){trafos_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);},
+        // for loads
+        [&](){loads_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);},
+        // for shunts
+        [&](){shunts_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);},
+        // for prods
+        [&](){generators_.compute_results(Va, Vm, V, id_me_to_solver_, bus_vn_kv_);}
+        }, _solver.nb_thread_for(id_solver_to_me_.size()));
 
     //handle_slack_bus
-    double p_slack = powerlines_.get_p_slack(slack_bus_id_);
-    p_slack += trafos_.get_p_slack(slack_bus_id_);
-    p_slack += loads_.get_p_slack(slack_bus_id_);
-    p_slack += shunts_.get_p_slack(slack_bus_id_);
-    generators_.set_p_slack(gen_slackbus_, p_slack);
+    generators_.set_p_slack(gen_slackbus_, compute_p_slack(slack_bus_id_));
+    int nb_island = island_ref_gen_.size();
+    for(int island_id = 0; island_id < nb_island; ++island_id){
+        int bus_id_me = id_solver_to_me_[island_ref_bus_solver_[island_id]];
+        generators_.set_p_slack(island_ref_gen_[island_id], compute_p_slack(bus_id_me));
+    }
 
     // handle gen_q now
-    std::vector<double> q_by_bus = std::vector<double>(bus_vn_kv_.size(), 0.);
-    powerlines_.get_q(q_by_bus);
-    trafos_.get_q(q_by_bus);
-    loads_.get_q(q_by_bus);
-    shunts_.get_q(q_by_bus);
+    q_by_bus_.assign(bus_vn_kv_.size(), 0.);  // the memory is kept from one powerflow to the next
+    powerlines_.get_q(q_by_bus_);
+    trafos_.get_q(q_by_bus_);
+    loads_.get_q(q_by_bus_);
+    shunts_.get_q(q_by_bus_);
 
-    generators_.set_q(q_by_bus);
+    generators_.set_q(q_by_bus_);
     //TODO for res_gen_q_ !!!
 }
 
+double GridModel::compute_p_slack(int bus_id_me){
+    double p_slack = powerlines_.get_p_slack(bus_id_me);
+    p_slack += trafos_.get_p_slack(bus_id_me);
+    p_slack += loads_.get_p_slack(bus_id_me);
+    p_slack += shunts_.get_p_slack(bus_id_me);
+    return p_slack;
+}
+
+bool GridModel::update_islands(const std::vector<int>& id_me_to_solver, const std::vector<int>& id_solver_to_me,
+                               int slack_bus_id_solver)
+{
+    /**
+    The connected components are found with a "union find" over the buses of the solver, linked by every connected
+    powerline and trafo, which is linear in the size of the grid. It is called only when the topology changed.
+    The reference bus of a component (other than the one of the slack bus) is the bus of its first connected
+    generator.
+    **/
+    int nb_bus_solver = id_solver_to_me.size();
+    std::vector<int> parent(nb_bus_solver);
+    for(int bus_id = 0; bus_id < nb_bus_solver; ++bus_id) parent[bus_id] = bus_id;
+    auto find_root = [&parent](int bus_id){
+        while(parent[bus_id] != bus_id){
+            parent[bus_id] = parent[parent[bus_id]];  // path halving
+            bus_id = parent[bus_id];
+        }
+        return bus_id;
+    };
+    auto add_branch = [&](int bus_1_id_me, int bus_2_id_me){
+        int bus_1_solver = id_me_to_solver[bus_1_id_me];
+        int bus_2_solver = id_me_to_solver[bus_2_id_me];
+        if(bus_1_solver == _deactivated_bus_id || bus_2_solver == _deactivated_bus_id){
+            throw std::runtime_error("GridModel::update_islands: A powerline or a trafo is connected to a disconnected bus.");
+        }
+        int root_1 = find_root(bus_1_solver);
+        int root_2 = find_root(bus_2_solver);
+        if(root_1 != root_2) parent[root_2] = root_1;
+    };
+    const std::vector<bool> & line_status = powerlines_.get_status();
+    for(int line_id = 0; line_id < powerlines_.nb(); ++line_id){
+        if(!line_status[line_id]) continue;
+        add_branch(powerlines_.get_bus_or(line_id), powerlines_.get_bus_ex(line_id));
+    }
+    const std::vector<bool> & trafo_status = trafos_.get_status();
+    for(int trafo_id = 0; trafo_id < trafos_.nb(); ++trafo_id){
+        if(!trafo_status[trafo_id]) continue;
+        add_branch(trafos_.get_bus_hv(trafo_id), trafos_.get_bus_lv(trafo_id));
+    }
+
+    // number the components, starting with the one of the slack bus
+    std::vector<int> root_component(nb_bus_solver, -1);
+    root_component[find_root(slack_bus_id_solver)] = 0;
+    nb_component_ = 1;
+    bus_component_ = Eigen::VectorXi::Constant(bus_vn_kv_.size(), -1);
+    for(int bus_id = 0; bus_id < nb_bus_solver; ++bus_id){
+        int root = find_root(bus_id);
+        if(root_component[root] == -1){
+            root_component[root] = nb_component_;
+            ++nb_component_;
+        }
+        bus_component_(id_solver_to_me[bus_id]) = root_component[root];
+    }
+
+    island_ref_bus_solver_.clear();
+    island_ref_gen_.clear();
+    if(nb_component_ == 1){
+        island_status_ = 0;
+        return true;
+    }
+
+    // look for a generator in each component
+    std::vector<int> ref_gen(nb_component_, -1);
+    const std::vector<bool> & gen_status = generators_.get_status();
+    for(int gen_id = 0; gen_id < generators_.nb(); ++gen_id){
+        if(!gen_status[gen_id]) continue;
+        int component = bus_component_(generators_.get_bus(gen_id));
+        if(component > 0 && ref_gen[component] == -1) ref_gen[component] = gen_id;
+    }
+    island_status_ = 1;
+    for(int component = 1; component < nb_component_; ++component){
+        if(ref_gen[component] == -1) island_status_ = 2;
+    }
+    if(island_status_ == 2 || !solve_islands_) return false;
+    for(int component = 1; component < nb_component_; ++component){
+        island_ref_gen_.push_back(ref_gen[component]);
+        island_ref_bus_solver_.push_back(id_me_to_solver[generators_.get_bus(ref_gen[component])]);
+    }
+    return true;
+}
+
 void GridModel::reset_results(){
     powerlines_.reset_results();
     shunts_.reset_results();
@@ -230,11 +626,11 @@ Eigen::VectorXcd GridModel::dc_pf(const Eigen::VectorXcd & Vinit,
                                   )
 {
     // TODO refactor that with ac pf, this is mostly done, but only mostly...
+    Profiler::Scope profile(profiler_, ProfilePhase::DcPf);
     int nb_bus = bus_vn_kv_.size();
     if(Vinit.size() != nb_bus){
         throw std::runtime_error("Size of the Vinit should be the same as the total number of buses (both conencted and disconnected). Components of Vinit corresponding to deactivated bys will be ignored anyway.");
     }
-    Eigen::SparseMatrix<cdouble> dcYbus_tmp;
     Eigen::VectorXcd Sbus_tmp;
     std::vector<int> id_me_to_solver;
     std::vector<int> id_solver_to_me;
@@ -242,8 +638,15 @@ Eigen::VectorXcd GridModel::dc_pf(const Eigen::VectorXcd & Vinit,
 
     //if(need_reset_){
     slack_bus_id_ = generators_.get_slack_bus_id(gen_slackbus_);
-    init_Ybus(dcYbus_tmp, Sbus_tmp, id_me_to_solver, id_solver_to_me, slack_bus_id_solver);
-    fillYbus(dcYbus_tmp, false, id_me_to_solver);
+    {
+        Profiler::Scope profile_ybus(profiler_, ProfilePhase::Ybus);
+        init_Ybus(dcYbus_, Sbus_tmp, id_me_to_solver, id_solver_to_me, slack_bus_id_solver);
+        assemble_Ybus(dcYbus_, false, id_me_to_solver, id_solver_to_me);
+    }
+    if(!update_islands(id_me_to_solver, id_solver_to_me, slack_bus_id_solver)){
+        // at least one component without reference bus, the matrix would be singular
+        return Eigen::VectorXcd();
+    }
     // fillpv_pq(id_me_to_solver);
     //}
     fillSbus_me(Sbus_tmp, false, id_me_to_solver, slack_bus_id_solver);
@@ -256,59 +659,80 @@ Eigen::VectorXcd GridModel::dc_pf(const Eigen::VectorXcd & Vinit,
     // TODO all this should rather be one in a "dc solver" instead of here
     // remove the slack bus
 
-    // remove the slack bus from Ybus
+    // remove the slack bus (and the reference bus of each island) from Ybus
     // TODO see if "prune" might work here https://eigen.tuxfamily.org/dox/classEigen_1_1SparseMatrix.html#title29
-    dcYbus_tmp.makeCompressed();
-    Eigen::SparseMatrix<double> dcYbus = Eigen::SparseMatrix<double>(nb_bus_solver - 1, nb_bus_solver - 1);
+    std::vector<bool> is_ref(nb_bus_solver, false);
+    is_ref[slack_bus_id_solver] = true;
+    for(int bus_id : island_ref_bus_solver_) is_ref[bus_id] = true;
+    std::vector<int> id_solver_to_dc(nb_bus_solver, -1);
+    int nb_bus_dc = 0;
+    for (int k=0; k < nb_bus_solver; ++k){
+        if(is_ref[k]) continue;
+        id_solver_to_dc[k] = nb_bus_dc;
+        ++nb_bus_dc;
+    }
+    Eigen::SparseMatrix<double> dcYbus = Eigen::SparseMatrix<double>(nb_bus_dc, nb_bus_dc);
     std::vector<Eigen::Triplet<double> > tripletList;
-    tripletList.reserve(dcYbus_tmp.nonZeros());
+    tripletList.reserve(dcYbus_.nonZeros());
     for (int k=0; k < nb_bus_solver; ++k){
-        if(k == slack_bus_id_solver) continue;  // I don't add anything to the slack bus
-        for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dcYbus_tmp, k); it; ++it)
+        if(is_ref[k]) continue;  // I don't add anything to the slack bus
+        for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dcYbus_, k); it; ++it)
         {
-            int row_res = it.row();
-            if(row_res == slack_bus_id_solver) continue;
-            row_res = row_res > slack_bus_id_solver ? row_res - 1 : row_res;
-            int col_res = it.col();
-            col_res = col_res > slack_bus_id_solver ? col_res - 1 : col_res;
-            tripletList.push_back(Eigen::Triplet<double> (row_res, col_res, std::real(it.value())));
+            int row_res = id_solver_to_dc[it.row()];
+            if(row_res == -1) continue;
+            tripletList.push_back(Eigen::Triplet<double> (row_res, id_solver_to_dc[k], std::real(it.value())));
         }
     }
     dcYbus.setFromTriplets(tripletList.begin(), tripletList.end());
     dcYbus.makeCompressed();
 
-    // initialize the solver
-    Eigen::SparseLU<Eigen::SparseMatrix<double>, Eigen::COLAMDOrdering<int> >   solver;
-    solver.analyzePattern(dcYbus);
-    solver.factorize(dcYbus);
-    if(solver.info() != Eigen::Success) {
+    // initialize the solver (same choice as for the ac powerflow, see set_small_grid_threshold)
+    linear_solver_used_ = linear_solver_for(nb_bus_solver);
+    std::unique_ptr<LinearSolver> solver = LinearSolver::make(linear_solver_used_);
+    int err;
+    {
+        Profiler::Scope profile_analyze(profiler_, ProfilePhase::Analyze);
+        err = solver->analyze(dcYbus);
+    }
+    if(err == 0){
+        Profiler::Scope profile_factor(profiler_, ProfilePhase::Factor);
+        err = solver->factor(dcYbus);
+    }
+    if(err != 0) {
         // matrix is not connected
         return Eigen::VectorXcd();
     }
 
     // remove the slack bus from Sbus
-    Eigen::VectorXd Sbus = Eigen::VectorXd::Constant(nb_bus_solver - 1, 0.);
+    Eigen::VectorXd Sbus = Eigen::VectorXd::Constant(nb_bus_dc, 0.);
     for (int k=0; k < nb_bus_solver; ++k){
-        if(k == slack_bus_id_solver) continue;  // I don't add anything to the slack bus
-        int col_res = k;
-        col_res = col_res > slack_bus_id_solver ? col_res - 1 : col_res;
-        Sbus(col_res) = std::real(Sbus_tmp(k));
+        if(is_ref[k]) continue;  // I don't add anything to the slack bus
+        Sbus(id_solver_to_dc[k]) = std::real(Sbus_tmp(k));
     }
 
     // solve for theta: Sbus = dcY . theta
-    Eigen::VectorXd Va_dc = solver.solve(Sbus);
-    if(solver.info() != Eigen::Success) {
+    Eigen::VectorXd Va_dc = Sbus;
+    {
+        Profiler::Scope profile_solve(profiler_, ProfilePhase::Solve);
+        err = solver->solve(Va_dc);
+    }
+    if(err != 0) {
         // solving failed, this should not happen in dc ...
         return Eigen::VectorXcd();
     }
 
-    // retrieve back the results in the proper shape
+    // retrieve back the results in the proper shape, the angles of each component are given with respect to
+    // the angle of its reference bus in Vinit
+    std::vector<double> component_va(nb_component_, std::arg(Vinit(slack_bus_id_)));
+    int nb_island = island_ref_bus_solver_.size();
+    for(int island_id = 0; island_id < nb_island; ++island_id){
+        component_va[island_id + 1] = std::arg(Vinit(id_solver_to_me[island_ref_bus_solver_[island_id]]));
+    }
     int nb_bus_me = bus_vn_kv_.size();
     int bus_id_solver;
     Eigen::VectorXd Va = Eigen::VectorXd::Constant(nb_bus_me, 0.);
     // fill Va from dc approx
     for (int bus_id_me=0; bus_id_me < nb_bus_me; ++bus_id_me){
-        if(bus_id_me == slack_bus_id_) continue;  // slack bus is handled elsewhere
         if(!bus_status_[bus_id_me]) continue;  // nothing is done if the bus is not connected
 
         bus_id_solver = id_me_to_solver[bus_id_me];
@@ -316,10 +740,10 @@ Eigen::VectorXcd GridModel::dc_pf(const Eigen::VectorXcd & Vinit,
             //TODO improve error message with the gen_id
             throw std::runtime_error("One bus is both connected and disconnected");
         }
-        bus_id_solver = bus_id_solver > slack_bus_id_solver ? bus_id_solver - 1 : bus_id_solver;
-        Va(bus_id_me) = Va_dc(bus_id_solver);
+        Va(bus_id_me) = component_va[bus_component_(bus_id_me)];
+        if(is_ref[bus_id_solver]) continue;  // reference buses are handled above
+        Va(bus_id_me) += Va_dc(id_solver_to_dc[bus_id_solver]);
     }
-    Va.array() +=  std::arg(Vinit(slack_bus_id_));
 
     // fill Vm either Vinit if pq or Vm if pv (TODO)
     if(false){
@@ -360,4 +784,155 @@ void GridModel::add_gen_slackbus(int gen_id){
     if(gen_id < 0) throw std::runtime_error("Slack bus should be an id of a generator, thus positive");
     if(gen_id > generators_.nb()) throw std::runtime_error("Slack bus should be an id of a generator, your id is to high.");
     gen_slackbus_ = gen_id;
-}
\ No newline at end of file
+    need_reset_ = true;  // Sbus and the pv / pq buses depend on the slack bus
+}
+void GridModel::init_from_ppc(double base_mva,
+                              const Eigen::Ref<const RealMat> & bus,
+                              const Eigen::Ref<const RealMat> & branch,
+                              const Eigen::Ref<const RealMat> & gen)
+{
+    /**
+    Initialize the GridModel from the matrices of a matpower / pypower case. Columns follow the matpower
+    convention (only the first 10 columns of bus, 11 of branch and 8 of gen are used).
+
+    Powers (PD, QD, GS, BS, PG, QG, QMAX, QMIN) are in MW / MVAr and branch parameters (BR_R, BR_X, BR_B)
+    are pair unit on a base of base_mva, as in matpower. They are converted to the base used by the GridModel
+    (1 MVA, everything in MW / MVAr).
+
+    Each bus with a non zero (PD, QD) gets a load, each bus with a non zero (GS, BS) gets a shunt, and a branch
+    with a non zero TAP is a transformer (the others being powerlines). The slack is the first in service
+    generator connected to a bus of type 3.
+
+    As in matpower, a generator connected to a PQ bus (type 1) does not control the voltage: it is added as a
+    load (consuming -PG, -QG) after the loads of the buses. The generators of the GridModel are then the
+    generators of the ppc connected to PV or reference buses, in the same order. When multiple generators are
+    connected to the same bus, the voltage setpoint of the first one is used.
+    **/
+    if(base_mva <= 0.) throw std::runtime_error("GridModel::init_from_ppc: baseMVA should be > 0.");
+    if(bus.cols() < 10) throw std::runtime_error("GridModel::init_from_ppc: bus should have at least 10 columns.");
+    if(branch.cols() < 11) throw std::runtime_error("GridModel::init_from_ppc: branch should have at least 11 columns.");
+    if(gen.cols() < 8) throw std::runtime_error("GridModel::init_from_ppc: gen should have at least 8 columns.");
+    int nb_bus = bus.rows();
+    if(nb_bus == 0) throw std::runtime_error("GridModel::init_from_ppc: there is no bus on this grid.");
+
+    // 1. buses. In a ppc, buses are labeled with any positive integer: it is converted to 0, 1, ..., nb_bus - 1
+    Eigen::VectorXi bus_label = bus.col(0).cast<int>();
+    if(bus_label.minCoeff() < 0) throw std::runtime_error("GridModel::init_from_ppc: bus numbers should be positive.");
+    std::vector<int> label_to_id(bus_label.maxCoeff() + 1, _deactivated_bus_id);
+    for(int bus_id = 0; bus_id < nb_bus; ++bus_id){
+        int & id = label_to_id[bus_label(bus_id)];
+        if(id != _deactivated_bus_id) throw std::runtime_error("GridModel::init_from_ppc: two buses have the same number.");
+        id = bus_id;
+    }
+    auto to_bus_id = [&label_to_id](const Eigen::Ref<const Eigen::VectorXd> & labels){
+        Eigen::VectorXi res(labels.size());
+        int max_label = static_cast<int>(label_to_id.size()) - 1;
+        for(int el_id = 0; el_id < labels.size(); ++el_id){
+            int label = static_cast<int>(labels(el_id));
+            int id = (label >= 0 && label <= max_label) ? label_to_id[label] : _deactivated_bus_id;
+            if(id == _deactivated_bus_id) throw std::runtime_error("GridModel::init_from_ppc: an element is connected to a bus that does not exist.");
+            res(el_id) = id;
+        }
+        return res;
+    };
+    Eigen::VectorXd bus_type = bus.col(1);
+    std::vector<int> load_bus, shunt_bus;
+    for(int bus_id = 0; bus_id < nb_bus; ++bus_id){
+        if(bus_type(bus_id) == 4.) continue;  // isolated bus
+        if(bus(bus_id, 2) != 0. || bus(bus_id, 3) != 0.) load_bus.push_back(bus_id);
+        if(bus(bus_id, 4) != 0. || bus(bus_id, 5) != 0.) shunt_bus.push_back(bus_id);
+    }
+    int nb_load_bus = load_bus.size();
+
+    // generators: the ones connected to a PQ bus are loads
+    Eigen::VectorXi gen_bus_all = to_bus_id(gen.col(0));
+    std::vector<int> gen_ids, gen_as_load_ids;
+    std::vector<int> first_gen_of_bus(nb_bus, -1);
+    for(int gen_id = 0; gen_id < gen.rows(); ++gen_id){
+        int bus_id = gen_bus_all(gen_id);
+        if(bus_type(bus_id) == 1.){
+            if(gen(gen_id, 7) > 0.) gen_as_load_ids.push_back(gen_id);
+            continue;
+        }
+        gen_ids.push_back(gen_id);
+        if(gen(gen_id, 7) > 0. && first_gen_of_bus[bus_id] == -1) first_gen_of_bus[bus_id] = gen_id;
+    }
+    for(auto gen_id : gen_as_load_ids) load_bus.push_back(gen_bus_all(gen_id));
+    Eigen::VectorXd load_p(load_bus.size());
+    Eigen::VectorXd load_q(load_bus.size());
+    load_p << bus.col(2)(std::vector<int>(load_bus.begin(), load_bus.begin() + nb_load_bus)), -gen.col(1)(gen_as_load_ids);
+    load_q << bus.col(3)(std::vector<int>(load_bus.begin(), load_bus.begin() + nb_load_bus)), -gen.col(2)(gen_as_load_ids);
+
+    // 2. branches
+    Eigen::VectorXd tap = branch.col(8);
+    if((branch.col(9).array() != 0.).any()){
+        throw std::runtime_error("GridModel::init_from_ppc: phase shifting transformers (non zero SHIFT) are not supported.");
+    }
+    Eigen::VectorXi branch_from = to_bus_id(branch.col(0));
+    Eigen::VectorXi branch_to = to_bus_id(branch.col(1));
+    // from pair unit on base_mva to pair unit on 1 MVA
+    Eigen::VectorXd branch_r = branch.col(2) / base_mva;
+    Eigen::VectorXd branch_x = branch.col(3) / base_mva;
+    Eigen::VectorXd branch_b = branch.col(4) * base_mva;
+    std::vector<int> line_ids, trafo_ids;
+    for(int br_id = 0; br_id < branch.rows(); ++br_id){
+        if(tap(br_id) == 0.) line_ids.push_back(br_id);
+        else trafo_ids.push_back(br_id);
+    }
+    int nb_line = line_ids.size();
+    int nb_trafo = trafo_ids.size();
+
+    init_bus(bus.col(9), nb_line, nb_trafo);
+    loads_.init(load_p, load_q, Eigen::Map<Eigen::VectorXi>(load_bus.data(), load_bus.size()));
+    // same convention as pandapower shunts (see DataShunt)
+    shunts_.init(bus.col(4)(shunt_bus), -bus.col(5)(shunt_bus), Eigen::Map<Eigen::VectorXi>(shunt_bus.data(), shunt_bus.size()));
+    powerlines_.init(branch_r(line_ids), branch_x(line_ids), branch_b(line_ids).cast<cdouble>(),
+                     branch_from(line_ids), branch_to(line_ids));
+
+    // the ratio is on the "from" side (hv side in the DataTrafo), and the subsceptance of the matpower model
+    // is on the "to" side which gives h = b / ratio in the DataTrafo model
+    Eigen::VectorXd trafo_ratio = tap(trafo_ids);
+    Eigen::VectorXcd trafo_b = (branch_b(trafo_ids).array() / trafo_ratio.array()).cast<cdouble>();
+    Eigen::VectorXd trafo_tap_step_pct = 100. * (trafo_ratio.array() - 1.);
+    Eigen::VectorXd trafo_tap_pos = Eigen::VectorXd::Constant(nb_trafo, 1.);
+    Eigen::Vector<bool, Eigen::Dynamic> trafo_tap_hv = Eigen::Vector<bool, Eigen::Dynamic>::Constant(nb_trafo, true);
+    trafos_.init(branch_r(trafo_ids), branch_x(trafo_ids), trafo_b, trafo_tap_step_pct, trafo_tap_pos, trafo_tap_hv,
+                 branch_from(trafo_ids), branch_to(trafo_ids));
+
+    // 3. generators
+    Eigen::VectorXi gen_bus = gen_bus_all(gen_ids);
+    Eigen::VectorXd gen_vm = gen.col(5)(gen_ids);
+    for(int gen_num = 0; gen_num < gen_bus.size(); ++gen_num){
+        int first_gen_id = first_gen_of_bus[gen_bus(gen_num)];
+        if(first_gen_id != -1) gen_vm(gen_num) = gen(first_gen_id, 5);
+    }
+    generators_.init(gen.col(1)(gen_ids), gen_vm, gen.col(4)(gen_ids), gen.col(3)(gen_ids), gen_bus);
+
+    // 4. status of everything
+    for(int br_num = 0; br_num < nb_line; ++br_num){
+        int br_id = line_ids[br_num];
+        if(branch(br_id, 10) <= 0. || bus_type(branch_from(br_id)) == 4. || bus_type(branch_to(br_id)) == 4.){
+            powerlines_.deactivate(br_num, need_reset_);
+        }
+    }
+    for(int br_num = 0; br_num < nb_trafo; ++br_num){
+        int br_id = trafo_ids[br_num];
+        if(branch(br_id, 10) <= 0. || bus_type(branch_from(br_id)) == 4. || bus_type(branch_to(br_id)) == 4.){
+            trafos_.deactivate(br_num, need_reset_);
+        }
+    }
+    int slack_gen_id = -1;
+    for(int gen_num = 0; gen_num < gen_bus.size(); ++gen_num){
+        int gen_id = gen_ids[gen_num];
+        if(gen(gen_id, 7) <= 0. || bus_type(gen_bus(gen_num)) == 4.){
+            generators_.deactivate(gen_num, need_reset_);
+        } else if(slack_gen_id == -1 && bus_type(gen_bus(gen_num)) == 3.){
+            slack_gen_id = gen_num;
+        }
+    }
+    for(int bus_id = 0; bus_id < nb_bus; ++bus_id){
+        if(bus_type(bus_id) == 4.) deactivate_bus(bus_id);
+    }
+    if(slack_gen_id == -1) throw std::runtime_error("GridModel::init_from_ppc: no generator in service is connected to the reference bus (type 3).");
+    add_gen_slackbus(slack_gen_id);
+}
@@ -11,6 +11,9 @@
 
 #include <iostream>
 #include <vector>
+#include <algorithm>  // std::lower_bound, std::fill
+#include <thread>
+#include <limits>
 #include <stdio.h>
 #include <cstdint> // for int32
 #include <chrono>
@@ -36,12 +39,21 @@
 
 // import klu solver
 #include "KLUSolver.h"
+#include "Parallel.h"
+#include "Profiler.h"
 
-//TODO implement a BFS check to make sure the Ymatrix is "connected" [one single component]
 class GridModel : public DataGeneric
 {
     public:
-        GridModel():need_reset_(true){};
+        GridModel():need_reset_(true),solve_islands_(false),nb_component_(0),island_status_(0),
+                    linear_solver_type_(LinearSolverType::KLU),linear_solver_used_(LinearSolverType::KLU),
+                    small_grid_threshold_(0){};
+        // copy everything, except the state of the solver (factorization is recomputed by the copy)
+        GridModel(const GridModel & other) = default;
+        GridModel copy() const {
+            GridModel res(*this);
+            return res;
+        }
 
         // All methods to init this data model, all need to be pair unit when applicable
         void init_bus(const Eigen::VectorXd & bus_vn_kv, int nb_line, int nb_trafo);
@@ -53,11 +65,13 @@ class GridModel : public DataGeneric
                              const Eigen::VectorXi & branch_to_id
                              ){
             powerlines_.init(branch_r, branch_x, branch_h, branch_from_id, branch_to_id);
+            grid_changed();
         }
         void init_shunt(const Eigen::VectorXd & shunt_p_mw,
                         const Eigen::VectorXd & shunt_q_mvar,
                         const Eigen::VectorXi & shunt_bus_id){
             shunts_.init(shunt_p_mw, shunt_q_mvar, shunt_bus_id);
+            grid_changed();
         }
         void init_trafo(const Eigen::VectorXd & trafo_r,
                         const Eigen::VectorXd & trafo_x,
@@ -70,6 +84,7 @@ class GridModel : public DataGeneric
                         const Eigen::VectorXi & trafo_lv_id
                         ){
             trafos_.init(trafo_r, trafo_x, trafo_b, trafo_tap_step_pct, trafo_tap_pos, trafo_tap_hv, trafo_hv_id, trafo_lv_id);
+            grid_changed();
         }
         void init_generators(const Eigen::VectorXd & generators_p,
                              const Eigen::VectorXd & generators_v,
@@ -77,15 +92,23 @@ class GridModel : public DataGeneric
                              const Eigen::VectorXd & generators_max_q,
                              const Eigen::VectorXi & generators_bus_id){
             generators_.init(generators_p, generators_v, generators_min_q, generators_max_q, generators_bus_id);
+            grid_changed();
         }
         void init_loads(const Eigen::VectorXd & loads_p,
                         const Eigen::VectorXd & loads_q,
                         const Eigen::VectorXi & loads_bus_id){
             loads_.init(loads_p, loads_q, loads_bus_id);
+            grid_changed();
         }
 
         void add_gen_slackbus(int gen_id);
 
+        // init everything from the "bus", "branch" and "gen" matrices of a matpower / pypower case (ppc)
+        void init_from_ppc(double base_mva,
+                           const Eigen::Ref<const RealMat> & bus,
+                           const Eigen::Ref<const RealMat> & branch,
+                           const Eigen::Ref<const RealMat> & gen);
+
         //powerflows
         // dc powerflow
         Eigen::VectorXcd dc_pf(const Eigen::VectorXcd & Vinit,
@@ -126,15 +149,24 @@ class GridModel : public DataGeneric
         void deactivate_load(int load_id) {loads_.deactivate(load_id, need_reset_); }
         void reactivate_load(int load_id) {loads_.reactivate(load_id, need_reset_); }
         void change_bus_load(int load_id, int new_bus_id) {loads_.change_bus(load_id, new_bus_id, need_reset_, bus_vn_kv_.size()); }
-        void change_p_load(int load_id, double new_p) {loads_.change_p(load_id, new_p, need_reset_); }
-        void change_q_load(int load_id, double new_q) {loads_.change_q(load_id, new_q, need_reset_); }
+        void change_p_load(int load_id, double new_p) {
+            double delta = loads_.change_p(load_id, new_p, need_reset_);
+            update_Sbus(loads_.get_bus(load_id), -delta);  // loads are counted negatively in Sbus
+        }
+        void change_q_load(int load_id, double new_q) {
+            double delta = loads_.change_q(load_id, new_q, need_reset_);
+            update_Sbus(loads_.get_bus(load_id), -my_i * delta);
+        }
         int get_bus_load(int load_id) {return loads_.get_bus(load_id);}
 
         //generator
         void deactivate_gen(int gen_id) {generators_.deactivate(gen_id, need_reset_); }
         void reactivate_gen(int gen_id) {generators_.reactivate(gen_id, need_reset_); }
         void change_bus_gen(int gen_id, int new_bus_id) {generators_.change_bus(gen_id, new_bus_id, need_reset_, bus_vn_kv_.size()); }
-        void change_p_gen(int gen_id, double new_p) {generators_.change_p(gen_id, new_p, need_reset_); }
+        void change_p_gen(int gen_id, double new_p) {
+            double delta = generators_.change_p(gen_id, new_p, need_reset_);
+            update_Sbus(generators_.get_bus(gen_id), delta);
+        }
         void change_v_gen(int gen_id, double new_v_pu) {generators_.change_v(gen_id, new_v_pu, need_reset_); }
         int get_bus_gen(int gen_id) {return generators_.get_bus(gen_id);}
 
@@ -183,8 +215,198 @@ class GridModel : public DataGeneric
         Eigen::SparseMatrix<double> get_J(){
             return _solver.get_J();
         }
+        int get_nb_iter(){
+            // number of newton raphson iterations performed by the last call to "ac_pf"
+            return _solver.get_nb_iter();
+        }
+        std::tuple<double, double, double, double, double, double, double, int, int> get_timers(){
+            // timers (and number of factorizations / solves) of the last call to "ac_pf", see KLUSolver::get_timers
+            return _solver.get_timers();
+        }
+
+        /**
+        Profiling of the powerflows: cumulated time (in s) and number of calls of each of their phases, for all the
+        powerflows computed since the last call to "reset_profile": building Ybus, Sbus and the pv / pq buses,
+        analysis, factorization, refactorization and solving of the linear systems, jacobian matrix and mismatch of
+        the newton raphson, results, as well as the total time of the newton raphson, "ac_pf" and "dc_pf".
+        Nothing is recorded (and the clock is not read) unless it is enabled.
+        **/
+        void set_profiling(bool profiling){
+            profiler_.set_enabled(profiling);
+            _solver.set_profiling(profiling);
+        }
+        bool get_profiling() const {
+            return profiler_.get_enabled();
+        }
+        void reset_profile(){
+            profiler_.reset();
+            _solver.reset_profile();
+        }
+        void set_trace(bool trace){
+            // see KLUSolver::set_trace
+            _solver.set_trace(trace);
+        }
+        bool get_trace_enabled() const {
+            return _solver.get_trace_enabled();
+        }
+        const std::vector<NewtonTrace> & get_trace() const {
+            // trace of the newton raphson of the last call to "ac_pf"
+            return _solver.get_trace();
+        }
+        std::map<std::string, std::tuple<double, int> > get_profile() const {
+            // phase name: (time, number of calls)
+            Profiler res = profiler_;
+            res.add(_solver.get_profiler());
+            return res.get();
+        }
+        void set_chord(bool chord, double threshold){
+            // see KLUSolver::set_chord
+            _solver.set_chord(chord, threshold);
+        }
+        void set_divergence_detection(int nb_growth, double vm_min, double vm_max){
+            // see KLUSolver::set_divergence_detection
+            _solver.set_divergence_detection(nb_growth, vm_min, vm_max);
+        }
+        void set_linear_solver(LinearSolverType solver_type){
+            // linear solver of the ac powerflow (see KLUSolver::set_linear_solver) and of the dc powerflow
+            linear_solver_type_ = solver_type;
+            need_reset_ = true;
+        }
+        LinearSolverType get_linear_solver() const {
+            return linear_solver_type_;
+        }
+        /**
+        Threads used inside one ac powerflow (dS/dV, jacobian matrix and results) for the grids with at least
+        "min_size" buses, see KLUSolver::set_nb_thread. This is independant of the threads of "simulate_topologies".
+        **/
+        void set_nb_thread(int nb_thread, int min_size){
+            _solver.set_nb_thread(nb_thread, min_size);
+        }
+        std::tuple<int, int> get_nb_thread() const {
+            return _solver.get_nb_thread();
+        }
+        void set_klu_options(int ordering, int btf, int scale){
+            // see KLUSolver::set_klu_options
+            _solver.set_klu_options(ordering, btf, scale);
+            need_reset_ = true;
+        }
+        std::tuple<int, int, int> get_klu_options() const {
+            return _solver.get_klu_options();
+        }
+        /**
+        Chooses the fastest options of KLU for the jacobian matrix of the last ac powerflow (that should have
+        converged, with KLU), see KLUSolver::autotune_klu. They are kept by the copies of this grid, and they can
+        be saved (see get_klu_options) to be set directly the next time.
+        It throws if the last powerflow used dense matrices (see set_small_grid_threshold): there is nothing to tune.
+        **/
+        std::tuple<int, int, int> autotune_klu(int nb_run){
+            if(need_reset_ || !_solver.converged()){
+                throw std::runtime_error("GridModel::autotune_klu: the last ac powerflow should have converged");
+            }
+            auto res = _solver.autotune_klu(nb_run);
+            need_reset_ = true;
+            return res;
+        }
+        /**
+        On small grids, the overhead of the sparse LU decomposition (symbolic analysis, sparse data structures) is
+        higher than the cost of a dense one: the powerflows of the grids with at most "small_grid_threshold" buses
+        (connected ones) use a dense LU decomposition (LinearSolverType::DenseLU) instead of KLU.
+        This only applies when the linear solver is KLU (the default). It is 0 by default (always use KLU): the gain
+        on the newton raphson (about 1/3 of its time on a 14 buses grid) is lost in the noise of a grid2op step.
+        **/
+        void set_small_grid_threshold(int small_grid_threshold){
+            if(small_grid_threshold < 0) throw std::runtime_error("GridModel::set_small_grid_threshold: the threshold cannot be negative");
+            small_grid_threshold_ = small_grid_threshold;
+            need_reset_ = true;
+        }
+        int get_small_grid_threshold() const {
+            return small_grid_threshold_;
+        }
+        // linear solver used by the last powerflow
+        LinearSolverType get_linear_solver_used() const {
+            return linear_solver_used_;
+        }
+        void set_line_search(bool line_search, int max_backtrack){
+            // see KLUSolver::set_line_search
+            _solver.set_line_search(line_search, max_backtrack);
+        }
+        int get_solver_error(){
+            // error of the last call to "ac_pf", see KLUSolver::get_error (-1 if the newton raphson has not been run)
+            return _solver.get_error();
+        }
+
+        /**
+        connected components of the grid (buses linked by a connected powerline or trafo). They are computed by ac_pf
+        (each time the topology changes) and by dc_pf.
+        get_bus_components gives the component of each bus (-1 if the bus is deactivated), the component of the slack
+        bus being 0.
+        **/
+        int get_nb_components() const {return nb_component_;}
+        Eigen::VectorXi get_bus_components() const {return bus_component_;}
+        /**
+        result of the islanding check of the last powerflow:
+        - 0: the grid is connected
+        - 1: the grid is split, and every component has at least a connected generator. The powerflow fails unless
+             set_solve_islands(true) has been called, in which case each component is solved with the bus of its first
+             connected generator as reference (this generator compensates the losses of its component).
+        - 2: at least one component has no connected generator, the powerflow fails
+        **/
+        int get_island_status() const {return island_status_;}
+        void set_solve_islands(bool solve_islands){
+            solve_islands_ = solve_islands;
+            need_reset_ = true;
+        }
+        bool get_solve_islands() const {return solve_islands_;}
+
+        /**
+        first order sensitivities, around the last converged ac powerflow, to an injection of 1 MW (or 1 MVAr) at each
+        of the buses "bus_ids" (one column per bus, the slack bus compensates the active power).
+        Returns:
+        - dV_dP: variation of the complex voltages (pu, one row per bus) for the active injections
+        - dV_dQ: variation of the complex voltages (pu, one row per bus) for the reactive injections
+        - dP_dP: variation of the active power flows (MW, powerlines "or" side then trafos "hv" side)
+        All right hand sides are solved at once with the factorization of the jacobian matrix.
+        **/
+        std::tuple<Eigen::MatrixXcd, Eigen::MatrixXcd, Eigen::MatrixXd> get_sensitivities(const Eigen::VectorXi & bus_ids);
+
+        /**
+        computes, for each of the "nb_action" topologies described below, the ac powerflow starting from "Vinit" on a
+        copy of this grid (this grid is not modified). The topologies are evaluated in parallel with "nb_thread"
+        threads.
+        Each topology is made of:
+        - the changes of elements el_type[k], el_id[k], el_bus[k] for k in [action_ptr[i], action_ptr[i+1])
+          (see GridModel::change_topology for their meaning)
+        - the status of the buses bus_status(i, :) (1: connected, 0: disconnected, -1: not modified)
+        Returns, for each topology (one row per topology), whether the powerflow converged, the current flows (kA) and
+        the active flows (MW) at the origin side of the powerlines, then at the high voltage side of the trafos
+        (NaN if it diverged).
+        **/
+        std::tuple<Eigen::VectorXi, Eigen::MatrixXd, Eigen::MatrixXd> simulate_topologies(const Eigen::VectorXcd & Vinit,
+                                                                                         const Eigen::VectorXi & action_ptr,
+                                                                                         const Eigen::VectorXi & el_type,
+                                                                                         const Eigen::VectorXi & el_id,
+                                                                                         const Eigen::VectorXi & el_bus,
+                                                                                         const Eigen::MatrixXi & bus_status,
+                                                                                         int max_iter,
+                                                                                         double tol,
+                                                                                         int nb_thread) const;
+
+        /**
+        connects the element "el_id" of type "el_type" to the bus "new_bus" (or disconnects it if new_bus is negative).
+        The types are 0: load, 1: generator, 2: powerline (origin side), 3: powerline (extremity side), 4: trafo (high
+        voltage side), 5: trafo (low voltage side), 6: shunt. Disconnecting any side of a branch disconnects it.
+        **/
+        void change_topology(int el_type, int el_id, int new_bus);
 
     protected:
+        // linear solver to use for a powerflow with "nb_bus_solver" buses (see set_small_grid_threshold)
+        LinearSolverType linear_solver_for(int nb_bus_solver) const {
+            if(linear_solver_type_ == LinearSolverType::KLU && nb_bus_solver <= small_grid_threshold_){
+                return LinearSolverType::DenseLU;
+            }
+            return linear_solver_type_;
+        }
+
     // add method to change topology, change ratio of transformers, change
 
         // compute admittance matrix
@@ -196,8 +418,45 @@ class GridModel : public DataGeneric
                        std::vector<int> & id_me_to_solver, std::vector<int>& id_solver_to_me,
                        int & slack_bus_id_solver);
         void fillYbus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int>& id_me_to_solver);
+        // update the Ybus matrix if possible, fill it from scratch otherwise
+        void assemble_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac,
+                           const std::vector<int>& id_me_to_solver, const std::vector<int>& id_solver_to_me);
+        // update in place the coefficients of the elements that changed since the last call to fillYbus, returns false if
+        // the sparsity pattern of "res" would change (the matrix then needs to be filled from scratch with fillYbus)
+        // Supposes the buses of the solver did not change.
+        bool update_Ybus(Eigen::SparseMatrix<cdouble> & res, bool ac, const std::vector<int>& id_me_to_solver);
+        // the elements themselves changed (not only their status, bus or value, as with the "deactivate_*",
+        // "change_*" etc.), so everything is computed from scratch at the next powerflow, Ybus included
+        void grid_changed(){
+            need_reset_ = true;
+            ybus_ac_id_solver_to_me_.clear();
+            ybus_dc_id_solver_to_me_.clear();
+        }
+
+        // to assemble Ybus without sorting the triplets each time (see fillYbus)
+        struct YbusScatter
+        {
+            std::vector<int> rows;  // row of each triplet used to build the matrix
+            std::vector<int> cols;  // column of each triplet used to build the matrix
+            std::vector<int> pos;  // position, in the values of the matrix, where each triplet is added
+            int nnz;  // number of coefficients of the matrix built from these triplets
+            YbusScatter():nnz(0){}
+        };
+        // add the triplets of ybus_triplets_ directly in the values of "Ybus", returns false if they are not the
+        // ones "scatter" has been built with (and in that case "Ybus" is not modified)
+        bool scatter_add_Ybus(Eigen::SparseMatrix<cdouble> & Ybus, const YbusScatter & scatter);
+        // compute, for each triplet of ybus_triplets_, its position in the values of "Ybus"
+        void init_Ybus_scatter(const Eigen::SparseMatrix<cdouble> & Ybus, YbusScatter & scatter);
         void fillSbus_me(Eigen::VectorXcd & res, bool ac, const std::vector<int>& id_me_to_solver, int slack_bus_id_solver);
+        // add the change of the injection at one bus to Sbus_ (and its opposite, for the active part, to the slack bus)
+        void update_Sbus(int bus_id_me, cdouble delta);
         void fillpv_pq(const std::vector<int>& id_me_to_solver);
+        // compute the connected components and the reference bus of each component without the slack bus, returns
+        // false if the powerflow cannot be computed (see get_island_status)
+        bool update_islands(const std::vector<int>& id_me_to_solver, const std::vector<int>& id_solver_to_me,
+                            int slack_bus_id_solver);
+        // active power injected by the generator at the bus "bus_id_me" if it compensates the other elements
+        double compute_p_slack(int bus_id_me);
 
         // results
         /**
@@ -254,17 +513,45 @@ class GridModel : public DataGeneric
         int slack_bus_id_;
         int slack_bus_id_solver_;
 
+        // 8. connected components
+        bool solve_islands_;
+        int nb_component_;
+        int island_status_;
+        Eigen::VectorXi bus_component_;  // id are the initial id
+        // reference bus (id of the solver) and generator of each component, except the one of the slack bus
+        std::vector<int> island_ref_bus_solver_;
+        std::vector<int> island_ref_gen_;
+
+        // 9. linear solver
+        LinearSolverType linear_solver_type_;
+        LinearSolverType linear_solver_used_;  // by the last powerflow (ac or dc)
+        int small_grid_threshold_;
+
         // as matrix, for the solver
         Eigen::SparseMatrix<cdouble> Ybus_;
+        Eigen::SparseMatrix<cdouble> dcYbus_;
         Eigen::VectorXcd Sbus_;
         Eigen::VectorXi bus_pv_;  // id are the solver internal id and NOT the initial id
         Eigen::VectorXi bus_pq_;  // id are the solver internal id and NOT the initial id
+        std::vector<double> q_by_bus_;  // buffer for the reactive power of the generators, see compute_results
+
+        // to assemble Ybus_ (resp. dcYbus_) without sorting the triplets each time
+        std::vector<Eigen::Triplet<cdouble> > ybus_triplets_;
+        YbusScatter ybus_ac_scatter_;
+        YbusScatter ybus_dc_scatter_;
+        // buses of the solver for which Ybus_ (resp. dcYbus_) has been successfully filled (empty if it needs to be
+        // filled from scratch)
+        std::vector<int> ybus_ac_id_solver_to_me_;
+        std::vector<int> ybus_dc_id_solver_to_me_;
 
         // TODO have version of the stuff above for the public api, indexed with "me" and not "solver"
 
         // to solve the newton raphson
         KLUSolver _solver;
 
+        // profiling of the powerflows (see set_profiling), the newton raphson is profiled by the solver itself
+        Profiler profiler_;
+
 };
 
 #endif  //GRIDMODEL_H
@@ -27,7 +27,13 @@ bool KLUSolver::do_newton(const Eigen::SparseMatrix<cdouble> & Ybus,
     // TODO check what can be checked: no voltage at 0, Ybus is square, Sbus same size than V and
     // TODO Ybus (nrow or ncol), pv and pq have value that are between 0 and nrow etc.
     reset_timer();
+    if(trace_enabled_){
+        // the memory is only allocated if max_iter is larger than at the previous calls
+        trace_.clear();
+        trace_.reserve(max_iter + 1);
+    }
     if(err_ > 0) return false; // i don't do anything if there were a problem at the initialization
+    Profiler::Scope profile(profiler_, ProfilePhase::Newton);
     auto timer = CustTimer();
     // initialize once and for all the "inverse" of these vectors
     int n_pv = pv.size();
@@ -49,62 +55,171 @@ bool KLUSolver::do_newton(const Eigen::SparseMatrix<cdouble> & Ybus,
     bool converged = _check_for_convergence(F, tol);
     nr_iter_ = 0; //current step
     bool res = true;  // have i converged or not
-    bool has_just_been_inialized = false;  // to avoid a call to klu_refactor follow a call to klu_factor in the same loop
+    bool has_just_been_inialized = false;  // to avoid a refactorization following a factorization in the same loop
+    // with the chord method, the last factorization is reused (if any) until the mismatch stops decreasing fast enough
+    bool refactor = !chord_ || need_factorize_ || (n_ != n_pvpq + n_pq);
+    double norm_F = F.lpNorm<Eigen::Infinity>();
+    int nb_growth = 0;  // number of consecutive iterations that increased the mismatch
+    double norm2_F = F.squaredNorm();
+    if(trace_enabled_) _add_trace(norm_F, 0., NewtonTrace::NoFactorization, timer);
+    Eigen::VectorXd Vm_prev, Va_prev;  // voltages before the step, for the line search
     while ((!converged) & (nr_iter_ < max_iter)){
         nr_iter_++;
-        fill_jacobian_matrix(Ybus, V_, pq, pvpq, pq_inv, pvpq_inv);
-        if(need_factorize_){
-            initialize();
-            if(err_ != 0){
-                // I got an error during the initialization of the linear system, i need to stop here
-                res = false;
-                break;
+        int factorization = NewtonTrace::NoFactorization;
+        if(refactor){
+            fill_jacobian(Ybus, V_, pq, pvpq, pq_inv, pvpq_inv);
+            factorization = NewtonTrace::Refactorization;
+            if(need_factorize_){
+                factorization = NewtonTrace::Factorization;
+                initialize();
+                if(err_ != 0){
+                    // I got an error during the initialization of the linear system, i need to stop here
+                    res = false;
+                    break;
+                }
+                has_just_been_inialized = true;
             }
+            ++nb_refactor_;
+        } else {
+            // the jacobian matrix is not computed, the previous factorization is used "as is"
             has_just_been_inialized = true;
         }
         //TODO refactorize is called uselessly at the first iteration
         solve(F, has_just_been_inialized);
+        ++nb_solve_;
         has_just_been_inialized = false;
         if(err_ != 0){
             // I got an error during the solving of the linear system, i need to stop here
             res = false;
             break;
         }
-        auto dx = -1.0*F;
-
+        Eigen::VectorXd dx = -1.0*F;
 
         Vm_ = V_.array().abs();  // update Vm and Va again in case
         Va_ = V_.array().arg();  // we wrapped around with a negative Vm
-
-        // update voltage (this should be done consistently with "klu_solver._evaluate_Fx")
-        if (n_pv > 0) Va_(pv) += dx.segment(0,n_pv);
-        if (n_pq > 0){
-            Va_(pq) += dx.segment(n_pv,n_pq);
-            Vm_(pq) += dx.segment(n_pv+n_pq, n_pq);
+        if(line_search_){
+            Vm_prev = Vm_;
+            Va_prev = Va_;
         }
 
-        // TODO change here for not having to cast all the time ... maybe
-        V_ = Vm_.array() * (Va_.array().cos().cast<cdouble>() + my_i * Va_.array().sin().cast<cdouble>() );
+        // backtracking line search (see set_line_search): the step is halved until the mismatch decreases enough,
+        // the mismatch of the step finally accepted is the one used for the next iteration
+        double step = 1.;
+        for(int nb_backtrack = 0; ; ++nb_backtrack){
+            if(nb_backtrack > 0){
+                Vm_ = Vm_prev;
+                Va_ = Va_prev;
+            }
+            // update voltage (this should be done consistently with "klu_solver._evaluate_Fx")
+            if (n_pv > 0) Va_(pv) += step * dx.segment(0,n_pv);
+            if (n_pq > 0){
+                Va_(pq) += step * dx.segment(n_pv,n_pq);
+                Vm_(pq) += step * dx.segment(n_pv+n_pq, n_pq);
+            }
+
+            // TODO change here for not having to cast all the time ... maybe
+            V_ = Vm_.array() * (Va_.array().cos().cast<cdouble>() + my_i * Va_.array().sin().cast<cdouble>() );
 
-        F = _evaluate_Fx(Ybus, V_, Sbus, pv, pq);
+            F = _evaluate_Fx(Ybus, V_, Sbus, pv, pq);
+            if(!line_search_ || nb_backtrack >= max_backtrack_) break;
+            // sufficient decrease of |F|^2, for which the newton direction is a descent direction
+            double new_norm2_F = F.squaredNorm();
+            if(new_norm2_F <= (1. - 2e-4 * step) * norm2_F) break;
+            step *= 0.5;
+            ++nb_backtrack_;
+        }
+        norm2_F = F.squaredNorm();
         converged = _check_for_convergence(F, tol);
+        double new_norm_F = F.lpNorm<Eigen::Infinity>();
+        if(trace_enabled_) _add_trace(new_norm_F, step * dx.lpNorm<Eigen::Infinity>(), factorization, timer);
+        if(chord_){
+            refactor = !(new_norm_F <= chord_threshold_ * norm_F);  // also true if the mismatch is nan
+        }
+        nb_growth = new_norm_F > norm_F ? nb_growth + 1 : 0;
+        norm_F = new_norm_F;
+        if(!converged && _is_diverging(norm_F, nb_growth)){
+            // no need to go up to max_iter
+            err_ = 5;
+            res = false;
+            break;
+        }
     }
     if(!converged){
-        err_ = 4;
+        if(err_ == 0) err_ = 4;
         res = false;
     }
     timer_total_nr_ += timer.duration();
     return res;
 }
 
+bool KLUSolver::_is_diverging(double norm_F, int nb_growth) const
+{
+    if(!std::isfinite(norm_F)) return true;
+    if((div_nb_growth_ > 0) && (nb_growth >= div_nb_growth_)) return true;
+    if(Vm_.size() == 0) return false;
+    return (Vm_.minCoeff() < div_vm_min_) || (Vm_.maxCoeff() > div_vm_max_);
+}
+
+bool KLUSolver::solve_jacobian(const Eigen::SparseMatrix<cdouble> & Ybus,
+                               const Eigen::VectorXi & pv,
+                               const Eigen::VectorXi & pq,
+                               Eigen::MatrixXd & B)
+{
+    if(err_ != 0 || need_factorize_) return false;
+    int n_pv = pv.size();
+    int n_pq = pq.size();
+    if((n_ != n_pv + 2 * n_pq) || (B.rows() != n_)) return false;
+    if(B.cols() == 0) return true;
+    Eigen::VectorXi pvpq(n_pv + n_pq);
+    pvpq << pv, pq;
+    int n_pvpq = pvpq.size();
+    std::vector<int> pvpq_inv(V_.size(), -1);
+    for(int inv_id=0; inv_id < n_pvpq; ++inv_id) pvpq_inv[pvpq(inv_id)] = inv_id;
+    std::vector<int> pq_inv(V_.size(), -1);
+    for(int inv_id=0; inv_id < n_pq; ++inv_id) pq_inv[pq(inv_id)] = inv_id;
+
+    fill_jacobian(Ybus, V_, pq, pvpq, pq_inv, pvpq_inv);
+    int err = linear_solver_->is_dense() ? linear_solver_->refactor_dense(J_dense_) : linear_solver_->refactor(J_);
+    if(err != 0) return false;
+    return linear_solver_->solve(B) == 0;
+}
+
+std::tuple<int, int, int> KLUSolver::autotune_klu(int nb_run)
+{
+    if(nb_run <= 0) throw std::runtime_error("KLUSolver::autotune_klu: nb_run should be > 0");
+    if((linear_solver_type_ != LinearSolverType::KLU) || need_factorize_ || (J_.cols() == 0)){
+        throw std::runtime_error("KLUSolver::autotune_klu: the jacobian matrix of a newton raphson solved with KLU is needed");
+    }
+    Eigen::SparseMatrix<double> J = J_;
+    Eigen::VectorXd b;
+    double best_time = -1.;
+    std::tuple<int, int, int> best = get_klu_options();
+    for(int ordering = 0; ordering < 2; ++ordering){
+        for(int btf = 0; btf < 2; ++btf){
+            for(int scale = 0; scale < 3; ++scale){
+                KLULinearSolver solver(ordering, btf, scale);
+                auto timer = CustTimer();
+                int err = solver.initialize(J);
+                for(int run_id = 0; (run_id < nb_run) && (err == 0); ++run_id){
+                    err = solver.refactor(J);
+                    b = Eigen::VectorXd::Ones(J.cols());
+                    if(err == 0) err = solver.solve(b);
+                }
+                double time = timer.duration();
+                if((err == 0) && ((best_time < 0.) || (time < best_time))){
+                    best_time = time;
+                    best = std::tuple<int, int, int>(ordering, btf, scale);
+                }
+            }
+        }
+    }
+    set_klu_options(std::get<0>(best), std::get<1>(best), std::get<2>(best));
+    return best;
+}
+
 void KLUSolver::reset(){
-    klu_free_symbolic(&symbolic_, &common_);
-    klu_free_numeric(&numeric_, &common_);
+    linear_solver_->reset();
     n_ = -1;
-    common_ = klu_common();
-
-    symbolic_ = nullptr;
-    numeric_ = nullptr;
 
     Vm_ = Eigen::VectorXd();  // voltage magnitude
     Va_= Eigen::VectorXd();  // voltage angle
@@ -120,43 +235,43 @@ void KLUSolver::reset(){
 }
 
 void KLUSolver::initialize(){
-    // default Eigen representation: column major, which is good for klu !
-    // J is const here, even if it's not said in klu_analyze
+    // analyze the sparsity pattern of the jacobian matrix, and factorize it
     auto timer = CustTimer();
-    n_ = J_.cols(); // should be equal to J_.nrows()
-    err_ = 0; // reset error message
-    common_ = klu_common();
-    symbolic_ = klu_analyze(n_, J_.outerIndexPtr(), J_.innerIndexPtr(), &common_);
-    numeric_ = klu_factor(J_.outerIndexPtr(), J_.innerIndexPtr(), J_.valuePtr(), symbolic_, &common_);
-    if (common_.status != KLU_OK) {
-        err_ = 1;
+    if(linear_solver_->is_dense()){
+        // no symbolic analysis for the dense matrices
+        Profiler::Scope profile(profiler_, ProfilePhase::Factor);
+        n_ = J_dense_.cols();
+        err_ = linear_solver_->initialize_dense(J_dense_);
+    } else {
+        n_ = J_.cols(); // should be equal to J_.nrows()
+        {
+            Profiler::Scope profile(profiler_, ProfilePhase::Analyze);
+            err_ = linear_solver_->analyze(J_) == 0 ? 0 : 1;
+        }
+        if(err_ == 0){
+            Profiler::Scope profile(profiler_, ProfilePhase::Factor);
+            err_ = linear_solver_->factor(J_) == 0 ? 0 : 1;
+        }
     }
     need_factorize_ = false;
-    timer_solve_ += timer.duration();
+    timer_initialize_ += timer.duration();
 }
 
 void KLUSolver::solve(Eigen::VectorXd & b, bool has_just_been_inialized){
     // solves (for x) the linear system J.x = b
-    // supposes that the solver has been initialized (call klu_solver.analyze() before calling that)
+    // supposes that the solver has been initialized (call initialize() before calling that)
     // J is const even if it does not compile if said const
     auto timer = CustTimer();
-    int ok;
-    bool stop = false;
     if(!has_just_been_inialized){
-        // if the call to "klu_factor" has been made this iteration, there is no need
+        // if the matrix has been factorized this iteration, there is no need
         // to re factor again the matrix
         // i'm in the case where it has not
-        ok = klu_refactor(J_.outerIndexPtr(), J_.innerIndexPtr(), J_.valuePtr(), symbolic_, numeric_, &common_);
-        if (ok != 1) {
-            err_ = 2;
-            stop = true;
-        }
+        Profiler::Scope profile(profiler_, ProfilePhase::Refactor);
+        err_ = linear_solver_->is_dense() ? linear_solver_->refactor_dense(J_dense_) : linear_solver_->refactor(J_);
     }
-    if(!stop){
-        ok = klu_solve(symbolic_, numeric_, n_, 1, &b(0), &common_);
-        if (ok != 1) {
-            err_ = 3;
-        }
+    if(err_ == 0){
+        Profiler::Scope profile(profiler_, ProfilePhase::Solve);
+        err_ = linear_solver_->solve(b);
     }
     timer_solve_ += timer.duration();
 }
@@ -172,31 +287,33 @@ void KLUSolver::_dSbus_dV(const Eigen::Ref<const Eigen::SparseMatrix<cdouble> >
     dS_dVm_ = Ybus;
     dS_dVa_ = Ybus;
 
-    // i fill the buffer columns per columns
-    for (int k=0; k < size_dS; ++k){
-        for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dS_dVm_,k); it; ++it)
-        {
-            it.valueRef() *= Vnorm(it.col());  // dS_dVm[k] *= Vnorm[Yj[k]]
-            it.valueRef() = std::conj(it.valueRef()) * V(it.row());  // dS_dVm[k] = conj(dS_dVm[k]) * V[r]
-            if(it.col() == it.row()){
-                // diagonal element
-                it.valueRef() += std::conj(Ibus(it.row())) * Vnorm(it.row()); // dS_dVm[k] += buffer[r] # buffer being conj(Ibus) * Vnorm
+    // i fill the buffer columns per columns (the columns are independant, they can be filled by different threads)
+    parallel_for(size_dS, nb_thread_for(size_dS), [&](int begin, int end){
+        for (int k=begin; k < end; ++k){
+            for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dS_dVm_,k); it; ++it)
+            {
+                it.valueRef() *= Vnorm(it.col());  // dS_dVm[k] *= Vnorm[Yj[k]]
+                it.valueRef() = std::conj(it.valueRef()) * V(it.row());  // dS_dVm[k] = conj(dS_dVm[k]) * V[r]
+                if(it.col() == it.row()){
+                    // diagonal element
+                    it.valueRef() += std::conj(Ibus(it.row())) * Vnorm(it.row()); // dS_dVm[k] += buffer[r] # buffer being conj(Ibus) * Vnorm
+                }
             }
         }
-    }
 
-    for (int k=0; k < size_dS; ++k){
-        for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dS_dVa_,k); it; ++it)
-        {
-            it.valueRef() *= V(it.col());  // dS_dVa[k] *= V[Yj[k]]
-            if(it.col() == it.row()){
-                // diagonal element
-                it.valueRef() -= Ibus(it.row());  // dS_dVa[k] = -Ibus[r] + dS_dVa[k]
+        for (int k=begin; k < end; ++k){
+            for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dS_dVa_,k); it; ++it)
+            {
+                it.valueRef() *= V(it.col());  // dS_dVa[k] *= V[Yj[k]]
+                if(it.col() == it.row()){
+                    // diagonal element
+                    it.valueRef() -= Ibus(it.row());  // dS_dVa[k] = -Ibus[r] + dS_dVa[k]
+                }
+                cdouble tmp = my_i * V(it.row());
+                it.valueRef() = std::conj(-it.valueRef()) * tmp;  // dS_dVa[k] = conj(-dS_dVa[k]) * (1j * V[r])
             }
-            cdouble tmp = my_i * V(it.row());
-            it.valueRef() = std::conj(-it.valueRef()) * tmp;  // dS_dVa[k] = conj(-dS_dVa[k]) * (1j * V[r])
         }
-    }
+    });
     dS_dVa_.makeCompressed();
     dS_dVm_.makeCompressed();
     timer_dSbus_ += timer.duration();
@@ -262,10 +379,13 @@ void KLUSolver::fill_jacobian_matrix(const Eigen::SparseMatrix<cdouble> & Ybus,
 
     auto timer = CustTimer();
     _dSbus_dV(Ybus, V);
-    Eigen::SparseMatrix<double> dS_dVa_r = dS_dVa_.real();
-    Eigen::SparseMatrix<double> dS_dVa_i = dS_dVa_.imag();
-    Eigen::SparseMatrix<double> dS_dVm_r = dS_dVm_.real();
-    Eigen::SparseMatrix<double> dS_dVm_i = dS_dVm_.imag();
+    const int nb_thread = nb_thread_for(Ybus.cols());
+    Eigen::SparseMatrix<double> dS_dVa_r, dS_dVa_i, dS_dVm_r, dS_dVm_i;
+    parallel_invoke({[&](){dS_dVa_r = dS_dVa_.real();},
+                     [&](){dS_dVa_i = dS_dVa_.imag();},
+                     [&](){dS_dVm_r = dS_dVm_.real();},
+                     [&](){dS_dVm_i = dS_dVm_.imag();}},
+                    nb_thread);
 
     const int n_pvpq = pvpq.size();
     const int n_pq = pq.size();
@@ -286,98 +406,103 @@ void KLUSolver::fill_jacobian_matrix(const Eigen::SparseMatrix<cdouble> & Ybus,
         // innerIndexPtr and valuePtr are not.
     }
 
-    // i fill the buffer columns per columns
-    int nb_obj_this_col = 0;
-    std::vector<int> inner_index;
-    std::vector<double> values;
+    // i fill the buffer columns per columns. Once the sparsity pattern of J_ is known, the columns are independant
+    // and they can be filled by different threads (inserting coefficients modifies the whole matrix)
+    auto fill_columns = [&](int begin, int end){
+        int nb_obj_this_col = 0;
+        std::vector<int> inner_index;
+        std::vector<double> values;
+        for(int col_id_J=begin; col_id_J < end; ++col_id_J){
+            // reset from the previous column
+            nb_obj_this_col = 0;
+            inner_index.clear();
+            values.clear();
+
+            if(col_id_J < n_pvpq){
+                // fill n_pvpq leftmost columns
+                int col_id = col_id_J;
+                // fill with the first column with the column of dS_dVa[:,pvpq[col_id]]
+                // and check the row order !
+                _get_values_J(nb_obj_this_col, inner_index, values,
+                              dS_dVa_r,
+                              pvpq_inv, pvpq,
+                              col_id, 0);
+                // fill the rest of the rows with the first column of dS_dVa_imag[:,pq[col_id]]
+                _get_values_J(nb_obj_this_col, inner_index, values,
+                              dS_dVa_i,
+                              pq_inv, pvpq,
+                              col_id, n_pvpq
+                              );
+            } else {
+                // fill the remaining n_pq columns
+                int col_id = col_id_J - n_pvpq;
+                // fill with the first column with the column of dS_dVm[:,pq[col_id]]
+                // and check the row order !
+                _get_values_J(nb_obj_this_col, inner_index, values,
+                              dS_dVm_r,
+                              pvpq_inv, pq,
+                              col_id, 0);
+
+                // fill the rest of the rows with the first column of dS_dVm_imag[:,pq[col_id]]
+                _get_values_J(nb_obj_this_col, inner_index, values,
+                              dS_dVm_i,
+                              pq_inv, pq,
+                              col_id, n_pvpq
+                              );
+            }
 
-    // TODO use the loop provided above (in dS) if J is already initialized
-    // fill n_pvpq leftmost columns
+            // "efficient" insert of the element in the matrix
+            for(int in_ind=0; in_ind < nb_obj_this_col; ++in_ind){
+                int row_id = inner_index[in_ind];
+                if(need_insert) J_.insert(row_id, col_id_J) = values[in_ind];
+                else J_.coeffRef(row_id, col_id_J) = values[in_ind];
+            }
+        }
+    };
+    parallel_for(size_j, need_insert ? 1 : nb_thread, fill_columns);
+    J_.makeCompressed();
+    timer_fillJ_ += timer.duration();
+}
+
+void KLUSolver::fill_jacobian_dense(const Eigen::SparseMatrix<cdouble> & Ybus,
+                                    const Eigen::VectorXcd & V,
+                                    const Eigen::VectorXi & pq,
+                                    const Eigen::VectorXi & pvpq,
+                                    const std::vector<int> & pq_inv,
+                                    const std::vector<int> & pvpq_inv
+                                    )
+{
+    /**
+    Same blocks as in fill_jacobian_matrix, but the coefficients are written directly in J_dense_: there is
+    no sparse structure to look up, and no memory allocated as long as the size of the matrix does not change.
+    **/
+    auto timer = CustTimer();
+    _dSbus_dV(Ybus, V);
+
+    const int n_pvpq = pvpq.size();
+    const int n_pq = pq.size();
+    const int size_j = n_pvpq + n_pq;
+    if(J_dense_.cols() != size_j) J_dense_.resize(size_j, size_j);
+    J_dense_.setZero();
+
+    // J11 and J21
     for(int col_id=0; col_id < n_pvpq; ++col_id){
-        // reset from the previous column
-        nb_obj_this_col = 0;
-        inner_index.clear();
-        values.clear();
-
-        // fill with the first column with the column of dS_dVa[:,pvpq[col_id]]
-        // and check the row order !
-        _get_values_J(nb_obj_this_col, inner_index, values,
-                      dS_dVa_r,
-                      pvpq_inv, pvpq,
-                      col_id, 0);
-        // fill the rest of the rows with the first column of dS_dVa_imag[:,pq[col_id]]
-        _get_values_J(nb_obj_this_col, inner_index, values,
-                      dS_dVa_i,
-                      pq_inv, pvpq,
-                      col_id, n_pvpq
-                      );
-
-        // "efficient" insert of the element in the matrix
-        for(int in_ind=0; in_ind < nb_obj_this_col; ++in_ind){
-            int row_id = inner_index[in_ind];
-            if(need_insert) J_.insert(row_id, col_id) = values[in_ind];
-            else J_.coeffRef(row_id, col_id) = values[in_ind];
+        for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dS_dVa_, pvpq(col_id)); it; ++it){
+            int row_id = pvpq_inv[it.row()];
+            if(row_id >= 0) J_dense_(row_id, col_id) = std::real(it.value());
+            row_id = pq_inv[it.row()];
+            if(row_id >= 0) J_dense_(row_id + n_pvpq, col_id) = std::imag(it.value());
         }
-//                if(need_insert){
-//                    for(int in_ind=0; in_ind < nb_obj_this_col; ++in_ind){
-//                        int row_id = inner_index[in_ind];
-//                        J_.insert(row_id, col_id) = values[in_ind];
-//                        // else J_.coeffRef(row_id, col_id) = values[in_ind];
-//                    }
-//                }else{
-//                    int in_ind=0;
-//                    for (Eigen::SparseMatrix<double>::InnerIterator it(J_,col_id); it; ++it, ++in_ind)
-//                    {
-////                        int row_id = inner_index[it.row()];
-//                        it.valueRef() = values[it.row()];
-//                    }
-//                }
     }
-
-    //TODO make same for the second part (have a funciton for previous loop)
-    // fill the remaining n_pq columns
+    // J12 and J22
     for(int col_id=0; col_id < n_pq; ++col_id){
-        // reset from the previous column
-        nb_obj_this_col = 0;
-        inner_index.clear();
-        values.clear();
-
-        // fill with the first column with the column of dS_dVa[:,pvpq[col_id]]
-        // and check the row order !
-        _get_values_J(nb_obj_this_col, inner_index, values,
-                      dS_dVm_r,
-                      pvpq_inv, pq,
-                      col_id, 0);
-
-        // fill the rest of the rows with the first column of dS_dVa_imag[:,pq[col_id]]
-        _get_values_J(nb_obj_this_col, inner_index, values,
-                      dS_dVm_i,
-                      pq_inv, pq,
-                      col_id, n_pvpq
-                      );
-
-        // "efficient" insert of the element in the matrix
-        for(int in_ind=0; in_ind < nb_obj_this_col; ++in_ind){
-            int row_id = inner_index[in_ind];
-            if(need_insert) J_.insert(row_id, col_id + n_pvpq) = values[in_ind];
-            else J_.coeffRef(row_id, col_id + n_pvpq) = values[in_ind];
+        for (Eigen::SparseMatrix<cdouble>::InnerIterator it(dS_dVm_, pq(col_id)); it; ++it){
+            int row_id = pvpq_inv[it.row()];
+            if(row_id >= 0) J_dense_(row_id, col_id + n_pvpq) = std::real(it.value());
+            row_id = pq_inv[it.row()];
+            if(row_id >= 0) J_dense_(row_id + n_pvpq, col_id + n_pvpq) = std::imag(it.value());
         }
-//                if(need_insert){
-//                    for(int in_ind=0; in_ind < nb_obj_this_col; ++in_ind){
-//                        int row_id = inner_index[in_ind];
-//                        J_.insert(row_id, col_id + n_pvpq) = values[in_ind];
-//                        // else J_.coeffRef(row_id, col_id) = values[in_ind];
-//                    }
-//                }else{
-//                    int in_ind=0;
-//                    for (Eigen::SparseMatrix<double>::InnerIterator it(J_, col_id + n_pvpq); it; ++it, ++in_ind)
-//                    {
-//                        int row_id = inner_index[it.row()];
-//                        it.valueRef() = values[row_id];
-//                    }
-//                }
     }
-    J_.makeCompressed();
     timer_fillJ_ += timer.duration();
 }
 
@@ -387,6 +512,7 @@ Eigen::VectorXd KLUSolver::_evaluate_Fx(const Eigen::SparseMatrix<cdouble> &  Yb
                                         const Eigen::VectorXi & pv,
                                         const Eigen::VectorXi & pq)
 {
+    Profiler::Scope profile(profiler_, ProfilePhase::Mismatch);
     auto timer = CustTimer();
     auto npv = pv.size();
     auto npq = pq.size();
@@ -14,6 +14,7 @@
 #include <stdio.h>
 #include <cstdint> // for int32
 #include <chrono>
+#include <stdexcept>
 #include <complex>      // std::complex, std::conj
 #include <cmath>  // for PI
 
@@ -23,16 +24,28 @@
 #include "Eigen/Dense"
 #include "Eigen/SparseCore"
 
-// import klu package
-extern "C" {
-    #include "cs.h"
-    #include "klu.h"
-}
-
 #include "CustTimer.h"
 #include "Utils.h"
+#include "LinearSolver.h"
+#include "Parallel.h"
+#include "Profiler.h"
 /**
-class to handle the solver using newton-raphson method, using KLU algorithm and sparse matrices.
+one iteration of the newton raphson, see KLUSolver::set_trace
+**/
+struct NewtonTrace
+{
+    enum {NoFactorization = 0, Factorization = 1, Refactorization = 2};
+
+    int iter;  // 0 for the initial voltages
+    double mismatch;  // infinity norm of the mismatch after the step
+    double step;  // infinity norm of the step (after the line search, if any)
+    int factorization;  // of the jacobian matrix: none (the previous one is reused), full (analysis + factorization) or refactorization
+    double time;  // in s, from the beginning of do_newton
+};
+
+/**
+class to handle the solver using newton-raphson method, using KLU algorithm (or another LinearSolver, see
+set_linear_solver) and sparse matrices.
 
 As long as the admittance matrix of the sytem does not change, you can reuse the same solver.
 Reusing the same solver is possible, but "reset" method must be called.
@@ -43,9 +56,14 @@ Otherwise, unexpected behaviour might follow, including "segfault".
 class KLUSolver
 {
     public:
-        KLUSolver():symbolic_(),numeric_(),common_(),n_(-1),need_factorize_(true),err_(-1),
-                    timer_Fx_(0.){
-            klu_defaults(&common_);
+        KLUSolver():linear_solver_type_(LinearSolverType::KLU),linear_solver_(LinearSolver::make(LinearSolverType::KLU)),
+                    n_(-1),need_factorize_(true),err_(-1),
+                    chord_(false),chord_threshold_(0.2),nb_refactor_(0),nb_solve_(0),
+                    line_search_(false),max_backtrack_(4),nb_backtrack_(0),
+                    div_nb_growth_(2),div_vm_min_(0.),div_vm_max_(3.),
+                    klu_ordering_(0),klu_btf_(1),klu_scale_(2),
+                    nb_thread_(1),parallel_min_size_(5000),
+                    timer_Fx_(0.),trace_enabled_(false){
             timer_Fx_ = 0.;
             timer_solve_ = 0.;
             timer_initialize_ = 0.;
@@ -55,13 +73,82 @@ class KLUSolver
             timer_total_nr_ = 0.;
         }
 
-        ~KLUSolver()
-         {
-             klu_free_symbolic(&symbolic_, &common_);
-             klu_free_numeric(&numeric_, &common_);
-         }
+        // a copy of a solver does not copy its factorization, only its configuration:
+        // the copy starts from scratch the next time it is used.
+        KLUSolver(const KLUSolver & other):KLUSolver(){
+            set_klu_options(other.klu_ordering_, other.klu_btf_, other.klu_scale_);
+            set_linear_solver(other.linear_solver_type_);
+            chord_ = other.chord_;
+            chord_threshold_ = other.chord_threshold_;
+            div_nb_growth_ = other.div_nb_growth_;
+            div_vm_min_ = other.div_vm_min_;
+            div_vm_max_ = other.div_vm_max_;
+            profiler_.set_enabled(other.profiler_.get_enabled());
+            set_trace(other.trace_enabled_);
+            line_search_ = other.line_search_;
+            max_backtrack_ = other.max_backtrack_;
+            nb_thread_ = other.nb_thread_;
+            parallel_min_size_ = other.parallel_min_size_;
+        }
+
+        /**
+        linear solver used for the jacobian matrix (KLU by default), see LinearSolver. Changing it resets the solver.
+        **/
+        void set_linear_solver(LinearSolverType solver_type){
+            if(solver_type != linear_solver_type_ || !linear_solver_){
+                linear_solver_type_ = solver_type;
+                linear_solver_ = make_linear_solver();
+            }
+            reset();
+        }
+        LinearSolverType get_linear_solver() const {
+            return linear_solver_type_;
+        }
+
+        /**
+        dS/dV and the coefficients of the jacobian matrix are computed by "nb_thread" threads for the grids with at
+        least "min_size" buses (1 thread otherwise, the cost of starting the threads being too high on small grids).
+        **/
+        void set_nb_thread(int nb_thread, int min_size){
+            if(nb_thread < 1) throw std::runtime_error("KLUSolver::set_nb_thread: nb_thread should be >= 1");
+            if(min_size < 0) throw std::runtime_error("KLUSolver::set_nb_thread: min_size should be >= 0");
+            nb_thread_ = nb_thread;
+            parallel_min_size_ = min_size;
+        }
+        std::tuple<int, int> get_nb_thread() const {
+            return std::tuple<int, int>(nb_thread_, parallel_min_size_);
+        }
+        // number of threads to use for a grid with "nb_bus" buses
+        int nb_thread_for(int nb_bus) const {
+            return nb_bus >= parallel_min_size_ ? nb_thread_ : 1;
+        }
+
+        /**
+        options of KLU (see KLULinearSolver): ordering (0: AMD, 1: COLAMD), btf (0 or 1) and scale (0: none,
+        1: sum, 2: max). The defaults are the ones of klu_defaults. Changing them resets the solver.
+        **/
+        void set_klu_options(int ordering, int btf, int scale){
+            if((ordering != 0) && (ordering != 1)) throw std::runtime_error("KLUSolver::set_klu_options: ordering should be 0 (AMD) or 1 (COLAMD)");
+            if((btf != 0) && (btf != 1)) throw std::runtime_error("KLUSolver::set_klu_options: btf should be 0 or 1");
+            if((scale < 0) || (scale > 2)) throw std::runtime_error("KLUSolver::set_klu_options: scale should be 0 (none), 1 (sum) or 2 (max)");
+            klu_ordering_ = ordering;
+            klu_btf_ = btf;
+            klu_scale_ = scale;
+            if(linear_solver_type_ == LinearSolverType::KLU) linear_solver_ = make_linear_solver();
+            reset();
+        }
+        std::tuple<int, int, int> get_klu_options() const {
+            return std::tuple<int, int, int>(klu_ordering_, klu_btf_, klu_scale_);
+        }
+        /**
+        Times the analysis, followed by "nb_run" factorizations and solves, of the jacobian matrix of the last
+        newton raphson with all the options of KLU (see set_klu_options), and keeps the fastest ones (which are
+        returned). The last newton raphson must have used KLU. This resets the solver.
+        **/
+        std::tuple<int, int, int> autotune_klu(int nb_run);
 
         Eigen::SparseMatrix<double> get_J(){
+            if(linear_solver_->is_dense()) return J_dense_.sparseView();
             return J_;
         }
         Eigen::Ref<Eigen::VectorXd> get_Va(){
@@ -79,13 +166,70 @@ class KLUSolver
         int get_nb_iter(){
             return nr_iter_;
         }
-        std::tuple<double, double, double, double, double, double, double> get_timers()
+        std::tuple<double, double, double, double, double, double, double, int, int> get_timers()
         {
-            auto res = std::tuple<double, double, double, double, double, double, double>(
-              timer_Fx_, timer_solve_, timer_initialize_, timer_check_, timer_dSbus_, timer_fillJ_, timer_total_nr_);
+            // the last two elements are the number of iterations that (re)factorized the jacobian matrix and the
+            // number of iterations that only solved the linear system (reusing a previous factorization), during
+            // the last call to "do_newton"
+            auto res = std::tuple<double, double, double, double, double, double, double, int, int>(
+              timer_Fx_, timer_solve_, timer_initialize_, timer_check_, timer_dSbus_, timer_fillJ_, timer_total_nr_,
+              nb_refactor_, nb_solve_ - nb_refactor_);
             return res;
         }
 
+        /**
+        "chord" (or "dishonest") newton raphson: the factorization of the jacobian matrix is reused across the
+        iterations (and across the calls to do_newton, as long as the solver is not reset). It is computed again
+        only when the mismatch does not decrease enough, ie when |F(k+1)| > threshold * |F(k)| (infinity norms).
+        **/
+        void set_chord(bool chord, double threshold){
+            if((threshold <= 0.) || (threshold >= 1.)){
+                throw std::runtime_error("The contraction threshold of the chord method should be in ]0, 1[.");
+            }
+            chord_ = chord;
+            chord_threshold_ = threshold;
+        }
+        bool get_chord(){
+            return chord_;
+        }
+
+        /**
+        early detection of the divergence of the newton raphson: do_newton stops (with the error 5) as soon as the
+        mismatch is not finite, as soon as it increased at "nb_growth" consecutive iterations (never if nb_growth <= 0)
+        or as soon as a voltage magnitude (pu) is outside [vm_min, vm_max].
+        **/
+        void set_divergence_detection(int nb_growth, double vm_min, double vm_max){
+            if(vm_min >= vm_max){
+                throw std::runtime_error("The voltage bounds of the divergence detection should be such that vm_min < vm_max.");
+            }
+            div_nb_growth_ = nb_growth;
+            div_vm_min_ = vm_min;
+            div_vm_max_ = vm_max;
+        }
+        std::tuple<int, double, double> get_divergence_detection(){
+            return std::tuple<int, double, double>(div_nb_growth_, div_vm_min_, div_vm_max_);
+        }
+
+        /**
+        backtracking line search: at each iteration, the newton step is halved (at most "max_backtrack" times) until
+        it decreases the (squared euclidean) norm of the mismatch enough. It costs one evaluation of the mismatch per
+        halving, and avoids the overshoots of the full step on stressed grids.
+        **/
+        void set_line_search(bool line_search, int max_backtrack){
+            if(max_backtrack < 0){
+                throw std::runtime_error("The maximum number of halvings of the step should be positive.");
+            }
+            line_search_ = line_search;
+            max_backtrack_ = max_backtrack;
+        }
+        bool get_line_search(){
+            return line_search_;
+        }
+        int get_nb_backtrack(){
+            // number of halvings of the step during the last call to do_newton
+            return nb_backtrack_;
+        }
+
         bool do_newton(const Eigen::SparseMatrix<cdouble> & Ybus,
                        Eigen::VectorXcd & V,
                        const Eigen::VectorXcd & Sbus,
@@ -98,12 +242,66 @@ class KLUSolver
 
         void reset();
 
+        /**
+        solves (for X) the linear system J.X = B, with J the jacobian matrix at the last voltages computed by
+        do_newton. B (one column per right hand side) is overwritten by X. The jacobian is computed and refactorized
+        at these voltages, all the right hand sides are then solved at once by the linear solver.
+        Returns false if no factorization is available (the solver has not been used or has failed) or if the linear
+        solver fails.
+        **/
+        bool solve_jacobian(const Eigen::SparseMatrix<cdouble> & Ybus,
+                            const Eigen::VectorXi & pv,
+                            const Eigen::VectorXi & pq,
+                            Eigen::MatrixXd & B);
+
+        /**
+        profiling of the newton raphson (jacobian matrix, mismatch, analysis, factorization and solving of the linear
+        systems), cumulated over all the calls to do_newton until reset_profile is called. Unlike the timers (see
+        get_timers), nothing is recorded unless it is enabled.
+        **/
+        void set_profiling(bool profiling){
+            profiler_.set_enabled(profiling);
+        }
+        bool get_profiling() const {
+            return profiler_.get_enabled();
+        }
+        void reset_profile(){
+            profiler_.reset();
+        }
+        const Profiler & get_profiler() const {
+            return profiler_;
+        }
+
+        /**
+        trace of the last call to do_newton (one element per iteration, plus one for the initial voltages), kept only
+        if it is enabled (nothing is done otherwise). The memory is allocated when it is enabled, and only again if
+        a call to do_newton allows more iterations than the previous ones.
+        **/
+        void set_trace(bool trace){
+            trace_enabled_ = trace;
+            trace_.clear();
+            if(trace) trace_.reserve(trace_init_size);
+            else trace_.shrink_to_fit();
+        }
+        bool get_trace_enabled() const {
+            return trace_enabled_;
+        }
+        const std::vector<NewtonTrace> & get_trace() const {
+            return trace_;
+        }
+        std::map<std::string, std::tuple<double, int> > get_profile() const {
+            return profiler_.get();
+        }
+
         bool converged(){
             return err_ == 0;
         }
 
     protected:
         void reset_timer(){
+            nb_refactor_ = 0;
+            nb_backtrack_ = 0;
+            nb_solve_ = 0;
             timer_Fx_ = 0.;
             timer_solve_ = 0.;
             timer_initialize_ = 0.;
@@ -136,6 +334,26 @@ class KLUSolver
                                   const std::vector<int> & pq_inv,
                                   const std::vector<int> & pvpq_inv
                                   );
+        // same as above, for the dense linear solvers: J_dense_ is filled instead of J_
+        void fill_jacobian_dense(const Eigen::SparseMatrix<cdouble> & Ybus,
+                                 const Eigen::VectorXcd & V,
+                                 const Eigen::VectorXi & pq,
+                                 const Eigen::VectorXi & pvpq,
+                                 const std::vector<int> & pq_inv,
+                                 const std::vector<int> & pvpq_inv
+                                 );
+        // fill J_ or J_dense_ depending on the linear solver
+        void fill_jacobian(const Eigen::SparseMatrix<cdouble> & Ybus,
+                           const Eigen::VectorXcd & V,
+                           const Eigen::VectorXi & pq,
+                           const Eigen::VectorXi & pvpq,
+                           const std::vector<int> & pq_inv,
+                           const std::vector<int> & pvpq_inv
+                           ){
+            Profiler::Scope profile(profiler_, ProfilePhase::Jacobian);
+            if(linear_solver_->is_dense()) fill_jacobian_dense(Ybus, V, pq, pvpq, pq_inv, pvpq_inv);
+            else fill_jacobian_matrix(Ybus, V, pq, pvpq, pq_inv, pvpq_inv);
+        }
 
         Eigen::VectorXd _evaluate_Fx(const Eigen::SparseMatrix<cdouble> &  Ybus,
                                      const Eigen::VectorXcd & V,
@@ -143,26 +361,41 @@ class KLUSolver
                                      const Eigen::VectorXi & pv,
                                      const Eigen::VectorXi & pq);
 
+        // whether the newton raphson diverges, given the current mismatch and Vm_
+        bool _is_diverging(double norm_F, int nb_growth) const;
+
+        void _add_trace(double mismatch, double step, int factorization, CustTimer & timer){
+            trace_.push_back(NewtonTrace{nr_iter_, mismatch, step, factorization, timer.duration()});
+        }
+
         bool _check_for_convergence(const Eigen::VectorXd & F,
                                  double tol)
         {
             auto timer = CustTimer();
-            return F.lpNorm<Eigen::Infinity>()  < tol;
+            bool res = F.lpNorm<Eigen::Infinity>()  < tol;
             timer_check_ += timer.duration();
+            return res;
+        }
+
+        std::unique_ptr<LinearSolver> make_linear_solver() const {
+            if(linear_solver_type_ == LinearSolverType::KLU){
+                return std::unique_ptr<LinearSolver>(new KLULinearSolver(klu_ordering_, klu_btf_, klu_scale_));
+            }
+            return LinearSolver::make(linear_solver_type_);
         }
 
     private:
-        // solver initialization
-        klu_symbolic* symbolic_;
-        klu_numeric* numeric_;
-        klu_common common_;
-        int n_;
+        // solver of the linear systems
+        LinearSolverType linear_solver_type_;
+        std::unique_ptr<LinearSolver> linear_solver_;
+        int n_;  // size of the last matrix factorized
 
         // solution of the problem
         Eigen::VectorXd Vm_;  // voltage magnitude
         Eigen::VectorXd Va_;  // voltage angle
         Eigen::VectorXcd V_;  // voltage angle
         Eigen::SparseMatrix<double> J_;  // the jacobian matrix
+        Eigen::MatrixXd J_dense_;  // the jacobian matrix, for the dense linear solvers (kept across resets)
         Eigen::SparseMatrix<cdouble> dS_dVm_;
         Eigen::SparseMatrix<cdouble> dS_dVa_;
         bool need_factorize_;
@@ -170,10 +403,36 @@ class KLUSolver
         int err_; //error message:
         // -1 : the solver has not been initialized (call initialize in this case)
         // 0 everything ok
-        // 1: i can't factorize the matrix (klu_factor)
-        // 2: i can't refactorize the matrix (klu_refactor)
-        // 3: i can't solve the system (klu_solve)
+        // 1: i can't factorize the matrix (LinearSolver::initialize)
+        // 2: i can't refactorize the matrix (LinearSolver::refactor)
+        // 3: i can't solve the system (LinearSolver::solve)
         // 4: end of possible iterations (divergence because nr_iter_ >= max_iter
+        // 5: divergence detected before the end of possible iterations (see set_divergence_detection)
+
+        // chord method (see set_chord)
+        bool chord_;
+        double chord_threshold_;
+        int nb_refactor_;  // number of iterations that (re)factorized the jacobian at the last call to do_newton
+        int nb_solve_;  // total number of linear systems solved at the last call to do_newton
+
+        // line search (see set_line_search)
+        bool line_search_;
+        int max_backtrack_;
+        int nb_backtrack_;
+
+        // early detection of the divergence (see set_divergence_detection)
+        int div_nb_growth_;
+        double div_vm_min_;
+        double div_vm_max_;
+
+        // options of KLU (see set_klu_options)
+        int klu_ordering_;
+        int klu_btf_;
+        int klu_scale_;
+
+        // threads used inside one newton raphson (see set_nb_thread)
+        int nb_thread_;
+        int parallel_min_size_;
 
         // timers
          double timer_Fx_;
@@ -183,64 +442,19 @@ class KLUSolver
          double timer_dSbus_;
          double timer_fillJ_;
          double timer_total_nr_;
+         Profiler profiler_;  // see set_profiling
 
-        // no copy allowed
-        KLUSolver( const KLUSolver & ) ;
+        // trace of the newton raphson (see set_trace)
+        bool trace_enabled_;
+        std::vector<NewtonTrace> trace_;
+        static const int trace_init_size = 32;
+
+        // no assignment allowed
         KLUSolver & operator=( const KLUSolver & ) ;
         static const cdouble my_i;
 
     private:
         // debug func i don't want to remove yet
-        void analyze_old(int n,
-                      Eigen::Ref<Eigen::VectorXi> Ap,
-                      Eigen::Ref<Eigen::VectorXi> Ai){
-            n_ = n;
-            symbolic_ = klu_analyze(n, &Ap(0), &Ai(0), &common_);
-        }
-        void solve_old(Eigen::Ref<Eigen::VectorXi> Ap,
-                    Eigen::Ref<Eigen::VectorXi> Ai,
-                    Eigen::Ref<Eigen::VectorXd> Ax,
-                    Eigen::Ref<Eigen::VectorXd> b){
-            numeric_ = klu_factor(&Ap(0), &Ai(0), &Ax(0), symbolic_, &common_);
-            klu_solve(symbolic_, numeric_, n_, 1, &b(0), &common_);
-        }
-
-        // TODO re add the references here for the last stuff
-        std::tuple<Eigen::VectorXd, Eigen::VectorXcd> one_iter_test(Eigen::SparseMatrix<double> J,
-                              Eigen::Ref<Eigen::VectorXd> F,
-                              Eigen::VectorXi pv,
-                              Eigen::VectorXi pq,
-                              Eigen::VectorXcd V,
-                              Eigen::SparseMatrix<cdouble>  Ybus,
-                              Eigen::VectorXcd Sbus
-                              ){
-            //TODO do not use, for DEBUG only!!!
-            // get the sizes for convenience
-            auto npv = pv.size();
-            auto npq = pq.size();
-
-            // supposes that "klu_analyze" has been already called ! klu_solver.analyze(J) should have been called
-            numeric_ = klu_factor(J.outerIndexPtr(), J.innerIndexPtr(), J.valuePtr(), symbolic_, &common_);
-            klu_solve(symbolic_, numeric_, n_, 1, &F(0), &common_);
-            auto dx = -1.0*F;
-
-            // update voltage (this should be done consistently with "klu_solver._evaluate_Fx")
-            Vm_ = V.array().abs();  // update Vm and Va again in case
-            Va_ = V.array().arg();  // we wrapped around with a negative Vm
-
-            if (npv > 0) Va_(pv) += dx.segment(0,npv);
-            if (npq > 0){
-                Va_(pq) += dx.segment(npv,npq);
-                Vm_(pq) += dx.segment(npv+npq, npq);
-            }
-
-            // TODO change here for not having to cast all the time ...
-            V = Vm_.array() * (Va_.array().cos().cast<cdouble>() + my_i * Va_.array().sin().cast<cdouble>() );
-
-            F = _evaluate_Fx(Ybus, V, Sbus, pv, pq);
-            return std::tuple<Eigen::VectorXd, Eigen::VectorXcd>(F, V);
-        }
-
         Eigen::SparseMatrix<double>
              create_jacobian_matrix_test(const Eigen::SparseMatrix<cdouble> & Ybus,
                                          const Eigen::VectorXcd & V,
@@ -259,23 +473,6 @@ class KLUSolver
             return J_;
         }
 
-        bool initialize_test(Eigen::SparseMatrix<double > & J){
-            // default Eigen representation: column major, which is good for klu !
-            // J is const here, even if it's not said in klu_analyze
-            int n = J.cols(); // should be equal to J_.nrows()
-            err_ = 0; // reset error message
-            klu_common common = klu_common();
-            bool res = true;
-            klu_symbolic* symbolic = klu_analyze(n, J.outerIndexPtr(), J.innerIndexPtr(), &common);
-//            auto numeric = klu_factor(J.outerIndexPtr(), J.innerIndexPtr(), J.valuePtr(), symbolic, &common);
-            klu_factor(J.outerIndexPtr(), J.innerIndexPtr(), J.valuePtr(), symbolic, &common);
-            if (common_.status != KLU_OK) {
-                err_ = 1;
-                res = false;
-            }
-            return res;
-        }
-
         std::tuple<Eigen::SparseMatrix<cdouble> , Eigen::SparseMatrix<cdouble> >
                     _get_ds_test(Eigen::SparseMatrix<cdouble> & Ybus,
                                 Eigen::VectorXcd & V){
@@ -0,0 +1,164 @@
+// Copyright (c) 2020, RTE (https://www.rte-france.com)
+// See AUTHORS.txt
+// This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+// If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+// you can obtain one at http://mozilla.org/MPL/2.0/.
+// SPDX-License-Identifier: MPL-2.0
+// This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+#include "LinearSolver.h"
+
+std::unique_ptr<LinearSolver> LinearSolver::make(LinearSolverType solver_type)
+{
+    switch(solver_type){
+        case LinearSolverType::SparseLU:
+            return std::unique_ptr<LinearSolver>(new SparseLULinearSolver());
+        case LinearSolverType::DenseLU:
+            return std::unique_ptr<LinearSolver>(new DenseLULinearSolver());
+        default:
+            return std::unique_ptr<LinearSolver>(new KLULinearSolver());
+    }
+}
+
+int LinearSolver::initialize(Eigen::SparseMatrix<double> & J){
+    if(analyze(J) != 0) return 1;
+    if(factor(J) != 0) return 1;
+    return 0;
+}
+
+int LinearSolver::initialize_dense(const Eigen::MatrixXd & J){
+    Eigen::SparseMatrix<double> J_sparse = J.sparseView();
+    return initialize(J_sparse);
+}
+
+int LinearSolver::refactor_dense(const Eigen::MatrixXd & J){
+    Eigen::SparseMatrix<double> J_sparse = J.sparseView();
+    return refactor(J_sparse);
+}
+
+// KLU
+int KLULinearSolver::analyze(Eigen::SparseMatrix<double> & J){
+    // default Eigen representation: column major, which is good for klu !
+    // J is const here, even if it's not said in klu_analyze
+    reset();
+    n_ = J.cols(); // should be equal to J.nrows()
+    symbolic_ = klu_analyze(n_, J.outerIndexPtr(), J.innerIndexPtr(), &common_);
+    if (common_.status != KLU_OK) return 1;
+    return 0;
+}
+
+int KLULinearSolver::factor(Eigen::SparseMatrix<double> & J){
+    klu_free_numeric(&numeric_, &common_);
+    numeric_ = klu_factor(J.outerIndexPtr(), J.innerIndexPtr(), J.valuePtr(), symbolic_, &common_);
+    if (common_.status != KLU_OK) return 1;
+    return 0;
+}
+
+int KLULinearSolver::refactor(Eigen::SparseMatrix<double> & J){
+    int ok = klu_refactor(J.outerIndexPtr(), J.innerIndexPtr(), J.valuePtr(), symbolic_, numeric_, &common_);
+    if (ok != 1) return 2;
+    return 0;
+}
+
+int KLULinearSolver::solve(Eigen::VectorXd & b){
+    int ok = klu_solve(symbolic_, numeric_, n_, 1, &b(0), &common_);
+    if (ok != 1) return 3;
+    return 0;
+}
+
+int KLULinearSolver::solve(Eigen::MatrixXd & B){
+    // B is column major, as expected by klu
+    int ok = klu_solve(symbolic_, numeric_, n_, B.cols(), B.data(), &common_);
+    if (ok != 1) return 3;
+    return 0;
+}
+
+void KLULinearSolver::reset(){
+    klu_free_symbolic(&symbolic_, &common_);
+    klu_free_numeric(&numeric_, &common_);
+    symbolic_ = nullptr;
+    numeric_ = nullptr;
+    n_ = -1;
+    common_ = klu_common();
+    klu_defaults(&common_);
+    common_.ordering = ordering_;
+    common_.btf = btf_;
+    common_.scale = scale_;
+}
+
+// Eigen SparseLU
+int SparseLULinearSolver::analyze(Eigen::SparseMatrix<double> & J){
+    solver_.analyzePattern(J);
+    return 0;
+}
+
+int SparseLULinearSolver::factor(Eigen::SparseMatrix<double> & J){
+    return refactor(J) == 0 ? 0 : 1;
+}
+
+int SparseLULinearSolver::refactor(Eigen::SparseMatrix<double> & J){
+    solver_.factorize(J);
+    if(solver_.info() != Eigen::Success) return 2;
+    return 0;
+}
+
+int SparseLULinearSolver::solve(Eigen::VectorXd & b){
+    b = solver_.solve(b);
+    if(solver_.info() != Eigen::Success) return 3;
+    return 0;
+}
+
+int SparseLULinearSolver::solve(Eigen::MatrixXd & B){
+    B = solver_.solve(B);
+    if(solver_.info() != Eigen::Success) return 3;
+    return 0;
+}
+
+void SparseLULinearSolver::reset(){
+    // Eigen solvers cannot be copied: the previous factorization is simply overwritten by the next "initialize"
+}
+
+// Eigen dense LU
+int DenseLULinearSolver::analyze(Eigen::SparseMatrix<double> &){
+    // nothing to analyze for a dense matrix
+    return 0;
+}
+
+int DenseLULinearSolver::factor(Eigen::SparseMatrix<double> & J){
+    return refactor(J) == 0 ? 0 : 1;
+}
+
+int DenseLULinearSolver::refactor(Eigen::SparseMatrix<double> & J){
+    J_dense_ = J;
+    return refactor_dense(J_dense_);
+}
+
+int DenseLULinearSolver::initialize_dense(const Eigen::MatrixXd & J){
+    return refactor_dense(J) == 0 ? 0 : 1;
+}
+
+int DenseLULinearSolver::refactor_dense(const Eigen::MatrixXd & J){
+    // the memory of the decomposition is reused as long as J keeps the same size
+    solver_.compute(J);
+    // partial pivoting does not report singular matrices: a null (or not finite) pivot is looked for
+    const auto & pivots = solver_.matrixLU().diagonal();
+    if(!pivots.allFinite() || (pivots.size() > 0 && pivots.cwiseAbs().minCoeff() == 0.)) return 2;
+    return 0;
+}
+
+int DenseLULinearSolver::solve(Eigen::VectorXd & b){
+    b = solver_.solve(b);
+    if(!b.allFinite()) return 3;
+    return 0;
+}
+
+int DenseLULinearSolver::solve(Eigen::MatrixXd & B){
+    B = solver_.solve(B);
+    if(!B.allFinite()) return 3;
+    return 0;
+}
+
+void DenseLULinearSolver::reset(){
+    solver_ = Eigen::PartialPivLU<Eigen::MatrixXd>();
+    J_dense_ = Eigen::MatrixXd();
+}
@@ -0,0 +1,147 @@
+// Copyright (c) 2020, RTE (https://www.rte-france.com)
+// See AUTHORS.txt
+// This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+// If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+// you can obtain one at http://mozilla.org/MPL/2.0/.
+// SPDX-License-Identifier: MPL-2.0
+// This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+#ifndef LINEARSOLVER_H
+#define LINEARSOLVER_H
+
+#include <memory>
+
+#include "Eigen/Core"
+#include "Eigen/Dense"
+#include "Eigen/SparseCore"
+#include "Eigen/SparseLU"
+
+// import klu package
+extern "C" {
+    #include "cs.h"
+    #include "klu.h"
+}
+
+// the linear solvers available
+enum class LinearSolverType {KLU, SparseLU, DenseLU};
+
+/**
+Interface of the linear solvers used for the jacobian matrix of the newton raphson (see KLUSolver), and for the
+matrix of the dc powerflow (see GridModel::dc_pf).
+
+Every method returns an error code, using the same values as KLUSolver:
+- 0: everything ok
+- 1: the matrix cannot be factorized (initialize)
+- 2: the matrix cannot be refactorized (refactor)
+- 3: the system cannot be solved (solve)
+**/
+class LinearSolver
+{
+    public:
+        virtual ~LinearSolver(){};
+
+        // analyze the sparsity pattern of J, and factorize it (ie "analyze" then "factor")
+        virtual int initialize(Eigen::SparseMatrix<double> & J);
+        // analyze the sparsity pattern of J
+        virtual int analyze(Eigen::SparseMatrix<double> & J) = 0;
+        // factorize J, that has the sparsity pattern given to the last call to "analyze"
+        virtual int factor(Eigen::SparseMatrix<double> & J) = 0;
+        // factorize J, that has the same sparsity pattern as the last matrix given to "initialize"
+        virtual int refactor(Eigen::SparseMatrix<double> & J) = 0;
+        // solve (for x) J.x = b with the last factorization, b is overwritten by x
+        virtual int solve(Eigen::VectorXd & b) = 0;
+        // same as above for many right hand sides at once (one per column of B)
+        virtual int solve(Eigen::MatrixXd & B) = 0;
+        // forget the last factorization
+        virtual void reset() = 0;
+
+        // whether the matrix is better given as a dense matrix (see "initialize_dense" and "refactor_dense")
+        virtual bool is_dense() const {return false;}
+        // same as "initialize" and "refactor" for a dense matrix J, by default J is converted to a sparse matrix
+        virtual int initialize_dense(const Eigen::MatrixXd & J);
+        virtual int refactor_dense(const Eigen::MatrixXd & J);
+
+        static std::unique_ptr<LinearSolver> make(LinearSolverType solver_type);
+};
+
+/**
+Sparse LU decomposition of KLU (from SuiteSparse), well suited for the matrices of the powerflow
+**/
+class KLULinearSolver : public LinearSolver
+{
+    public:
+        /**
+        The options are the ones of klu_common (the default values are the ones of klu_defaults):
+        - ordering: 0 for AMD, 1 for COLAMD
+        - btf: 1 to permute the matrix to a block triangular form, 0 otherwise
+        - scale: 0 for no scaling, 1 to scale the rows by the sum of their absolute values, 2 by their maximum
+        **/
+        KLULinearSolver(int ordering=0, int btf=1, int scale=2):
+            symbolic_(nullptr),numeric_(nullptr),common_(),n_(-1),ordering_(ordering),btf_(btf),scale_(scale){
+            reset();
+        }
+        ~KLULinearSolver(){
+            reset();
+        }
+
+        virtual int analyze(Eigen::SparseMatrix<double> & J);
+        virtual int factor(Eigen::SparseMatrix<double> & J);
+        virtual int refactor(Eigen::SparseMatrix<double> & J);
+        virtual int solve(Eigen::VectorXd & b);
+        virtual int solve(Eigen::MatrixXd & B);
+        virtual void reset();
+
+    private:
+        klu_symbolic* symbolic_;
+        klu_numeric* numeric_;
+        klu_common common_;
+        int n_;
+        int ordering_;
+        int btf_;
+        int scale_;
+
+        // no copy allowed
+        KLULinearSolver(const KLULinearSolver &);
+        KLULinearSolver & operator=(const KLULinearSolver &);
+};
+
+/**
+Sparse LU decomposition of Eigen (with the COLAMD ordering), does not depend on any external library
+**/
+class SparseLULinearSolver : public LinearSolver
+{
+    public:
+        virtual int analyze(Eigen::SparseMatrix<double> & J);
+        virtual int factor(Eigen::SparseMatrix<double> & J);
+        virtual int refactor(Eigen::SparseMatrix<double> & J);
+        virtual int solve(Eigen::VectorXd & b);
+        virtual int solve(Eigen::MatrixXd & B);
+        virtual void reset();
+
+    private:
+        Eigen::SparseLU<Eigen::SparseMatrix<double>, Eigen::COLAMDOrdering<int> > solver_;
+};
+
+/**
+Dense LU decomposition (with partial pivoting) of Eigen, faster than the sparse ones for very small grids only
+**/
+class DenseLULinearSolver : public LinearSolver
+{
+    public:
+        virtual int analyze(Eigen::SparseMatrix<double> & J);
+        virtual int factor(Eigen::SparseMatrix<double> & J);
+        virtual int refactor(Eigen::SparseMatrix<double> & J);
+        virtual int solve(Eigen::VectorXd & b);
+        virtual int solve(Eigen::MatrixXd & B);
+        virtual void reset();
+
+        virtual bool is_dense() const {return true;}
+        virtual int initialize_dense(const Eigen::MatrixXd & J);
+        virtual int refactor_dense(const Eigen::MatrixXd & J);
+
+    private:
+        Eigen::PartialPivLU<Eigen::MatrixXd> solver_;
+        Eigen::MatrixXd J_dense_;  // buffer for the matrices given as sparse matrices
+};
+
+#endif  //LINEARSOLVER_H
@@ -0,0 +1,65 @@
+// Copyright (c) 2020, RTE (https://www.rte-france.com)
+// See AUTHORS.txt
+// This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+// If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+// you can obtain one at http://mozilla.org/MPL/2.0/.
+// SPDX-License-Identifier: MPL-2.0
+// This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+#ifndef PARALLEL_H
+#define PARALLEL_H
+
+#include <vector>
+#include <thread>
+#include <exception>
+#include <functional>
+
+/**
+Small helpers to split the work of one powerflow (jacobian matrix, results...) between threads, for the large grids.
+
+The calling thread always takes its share of the work, so that nothing is started when nb_thread is 1. If a
+task throws an exception, the first one is rethrown in the calling thread once all the threads are done.
+**/
+
+/**
+Calls f(begin, end) on nb_thread contiguous chunks of [0, nb_el) (each chunk in its own thread).
+**/
+template<class F>
+void parallel_for(int nb_el, int nb_thread, const F & f)
+{
+    if(nb_thread > nb_el) nb_thread = nb_el;
+    if(nb_thread <= 1){
+        if(nb_el > 0) f(0, nb_el);
+        return;
+    }
+    std::vector<std::exception_ptr> errors(nb_thread);
+    auto run_chunk = [&](int thread_id){
+        int begin = (nb_el * thread_id) / nb_thread;
+        int end = (nb_el * (thread_id + 1)) / nb_thread;
+        try{
+            f(begin, end);
+        } catch(...) {
+            errors[thread_id] = std::current_exception();
+        }
+    };
+    std::vector<std::thread> threads;
+    for(int thread_id = 1; thread_id < nb_thread; ++thread_id) threads.push_back(std::thread(run_chunk, thread_id));
+    run_chunk(0);
+    for(auto & thread : threads) thread.join();
+    for(auto & error : errors){
+        if(error) std::rethrow_exception(error);
+    }
+}
+
+/**
+Calls all the tasks, with at most nb_thread of them at the same time.
+**/
+inline void parallel_invoke(const std::vector<std::function<void()> > & tasks, int nb_thread)
+{
+    int nb_task = tasks.size();
+    parallel_for(nb_task, nb_thread, [&](int begin, int end){
+        for(int task_id = begin; task_id < end; ++task_id) tasks[task_id]();
+    });
+}
+
+#endif // PARALLEL_H
@@ -0,0 +1,101 @@
+// Copyright (c) 2020, RTE (https://www.rte-france.com)
+// See AUTHORS.txt
+// This Source Code Form is subject to the terms of the Mozilla Public License, version 2.0.
+// If a copy of the Mozilla Public License, version 2.0 was not distributed with this file,
+// you can obtain one at http://mozilla.org/MPL/2.0/.
+// SPDX-License-Identifier: MPL-2.0
+// This file is part of LightSim2grid, LightSim2grid implements a c++ backend targeting the Grid2Op platform.
+
+#ifndef PROFILER_H
+#define PROFILER_H
+
+#include <map>
+#include <array>
+#include <tuple>
+#include <string>
+#include <chrono>
+
+// the phases of a powerflow that are timed (see GridModel::get_profile)
+enum class ProfilePhase {Ybus, Sbus, PvPq, Analyze, Factor, Refactor, Solve, Jacobian, Mismatch, Newton, ResultsInit,
+                         Results, AcPf, DcPf, NbPhase};
+
+/**
+Cumulated time (in s, measured with a monotonic clock) and number of calls of each phase of the powerflows.
+
+Nothing is recorded (and the clock is not even read) unless it has been enabled with "set_enabled(true)": a
+disabled profiler only costs a test of a boolean per phase.
+**/
+class Profiler
+{
+    public:
+        Profiler():enabled_(false){
+            reset();
+        }
+
+        void set_enabled(bool enabled){enabled_ = enabled;}
+        bool get_enabled() const {return enabled_;}
+
+        void reset(){
+            times_.fill(0.);
+            counts_.fill(0);
+        }
+
+        void add(ProfilePhase phase, double time){
+            times_[static_cast<int>(phase)] += time;
+            ++counts_[static_cast<int>(phase)];
+        }
+
+        // add all the phases of another profiler to this one
+        void add(const Profiler & other){
+            for(int phase_id = 0; phase_id < nb_phase; ++phase_id){
+                times_[phase_id] += other.times_[phase_id];
+                counts_[phase_id] += other.counts_[phase_id];
+            }
+        }
+
+        // (time, number of calls) of each phase, by name
+        std::map<std::string, std::tuple<double, int> > get() const {
+            static const std::array<const char *, nb_phase> names = {
+                "ybus", "sbus", "pv_pq", "analyze", "factor", "refactor", "solve", "jacobian", "mismatch", "newton",
+                "results_init", "results", "ac_pf", "dc_pf"};
+            std::map<std::string, std::tuple<double, int> > res;
+            for(int phase_id = 0; phase_id < nb_phase; ++phase_id){
+                res[names[phase_id]] = std::tuple<double, int>(times_[phase_id], counts_[phase_id]);
+            }
+            return res;
+        }
+
+        /**
+        Times the phase from its creation to its destruction (if the profiler is enabled at its creation)
+        **/
+        class Scope
+        {
+            public:
+                Scope(Profiler & profiler, ProfilePhase phase):
+                    profiler_(profiler.enabled_ ? &profiler : nullptr),phase_(phase){
+                    if(profiler_ != nullptr) start_ = std::chrono::steady_clock::now();
+                }
+                ~Scope(){
+                    if(profiler_ == nullptr) return;
+                    std::chrono::duration<double> time = std::chrono::steady_clock::now() - start_;
+                    profiler_->add(phase_, time.count());
+                }
+            private:
+                Profiler * profiler_;
+                ProfilePhase phase_;
+                std::chrono::time_point<std::chrono::steady_clock> start_;
+
+                // no copy allowed
+                Scope(const Scope &);
+                Scope & operator=(const Scope &);
+        };
+
+    private:
+        static const int nb_phase = static_cast<int>(ProfilePhase::NbPhase);
+
+        bool enabled_;
+        std::array<double, nb_phase> times_;
+        std::array<int, nb_phase> counts_;
+};
+
+#endif // PROFILER_H
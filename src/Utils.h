@@ -15,5 +15,7 @@ Some typedef and other structures define here and used everywhere else
 typedef std::complex<double> cdouble;
 typedef std::tuple<Eigen::VectorXd, Eigen::VectorXd, Eigen::VectorXd> tuple3d;
 typedef std::tuple<Eigen::VectorXd, Eigen::VectorXd, Eigen::VectorXd, Eigen::VectorXd> tuple4d;
+// row major, to match the default memory layout of numpy arrays
+typedef Eigen::Matrix<double, Eigen::Dynamic, Eigen::Dynamic, Eigen::RowMajor> RealMat;
 
 #endif // UTILS_H
\ No newline at end of file
@@ -9,6 +9,7 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/eigen.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
 
 #include "KLUSolver.h"
 #include "DataConverter.h"
@@ -16,7 +17,21 @@
 
 namespace py = pybind11;
 
+// trace of the newton raphson, as a numpy structured array (copy of the trace of the solver)
+template<class T>
+py::array_t<NewtonTrace> get_trace_array(const T & solver){
+    const std::vector<NewtonTrace> & trace = solver.get_trace();
+    return py::array_t<NewtonTrace>(trace.size(), trace.data());
+}
+
 PYBIND11_MODULE(lightsim2grid_cpp, m) {
+    PYBIND11_NUMPY_DTYPE(NewtonTrace, iter, mismatch, step, factorization, time);
+
+    py::enum_<LinearSolverType>(m, "LinearSolverType")  // linear solver used by the powerflows
+        .value("KLU", LinearSolverType::KLU)
+        .value("SparseLU", LinearSolverType::SparseLU)
+        .value("DenseLU", LinearSolverType::DenseLU);
+
     py::class_<KLUSolver>(m, "KLUSolver")
         .def(py::init<>())
         .def("get_J", &KLUSolver::get_J)  // (get the jacobian matrix, sparse csc matrix)
@@ -28,6 +43,27 @@ PYBIND11_MODULE(lightsim2grid_cpp, m) {
         .def("converged", &KLUSolver::converged)  // whether the solver has converged
         .def("do_newton", &KLUSolver::do_newton, py::call_guard<py::gil_scoped_release>())  // perform the newton raphson optimization
         .def("get_timers", &KLUSolver::get_timers)  // returns the timers corresponding to times the solver spent in different part
+        .def("set_profiling", &KLUSolver::set_profiling)  // cumulated time and number of calls of each phase of the newton raphson
+        .def("get_profiling", &KLUSolver::get_profiling)
+        .def("reset_profile", &KLUSolver::reset_profile)
+        .def("get_profile", &KLUSolver::get_profile)
+        .def("set_trace", &KLUSolver::set_trace)  // record the iterations of the newton raphson
+        .def("get_trace_enabled", &KLUSolver::get_trace_enabled)
+        .def("get_trace", &get_trace_array<KLUSolver>)  // iter, mismatch, step, factorization (0: none, 1: full, 2: refactorization), time
+        .def("set_chord", &KLUSolver::set_chord, py::arg("chord"), py::arg("threshold") = 0.2)  // reuse the factorization of the jacobian matrix across iterations
+        .def("get_chord", &KLUSolver::get_chord)
+        .def("set_divergence_detection", &KLUSolver::set_divergence_detection, py::arg("nb_growth") = 2, py::arg("vm_min") = 0., py::arg("vm_max") = 3.)  // stop the newton raphson as soon as it diverges (error 5)
+        .def("get_divergence_detection", &KLUSolver::get_divergence_detection)
+        .def("set_linear_solver", &KLUSolver::set_linear_solver)  // see LinearSolverType
+        .def("get_linear_solver", &KLUSolver::get_linear_solver)
+        .def("set_klu_options", &KLUSolver::set_klu_options, py::arg("ordering") = 0, py::arg("btf") = 1, py::arg("scale") = 2)  // ordering (0: AMD, 1: COLAMD), btf and scaling (0: none, 1: sum, 2: max) of KLU
+        .def("get_klu_options", &KLUSolver::get_klu_options)
+        .def("set_nb_thread", &KLUSolver::set_nb_thread, py::arg("nb_thread"), py::arg("min_size") = 5000)  // threads for dS/dV and the jacobian matrix of the large grids
+        .def("get_nb_thread", &KLUSolver::get_nb_thread)
+        .def("autotune_klu", &KLUSolver::autotune_klu, py::arg("nb_run") = 10)  // keep the fastest options of KLU for the last jacobian matrix
+        .def("set_line_search", &KLUSolver::set_line_search, py::arg("line_search"), py::arg("max_backtrack") = 4)  // backtracking line search on the newton step
+        .def("get_line_search", &KLUSolver::get_line_search)
+        .def("get_nb_backtrack", &KLUSolver::get_nb_backtrack)
         .def("solve", &KLUSolver::do_newton, py::call_guard<py::gil_scoped_release>() );  // perform the newton raphson optimization
 
 
@@ -41,6 +77,7 @@ PYBIND11_MODULE(lightsim2grid_cpp, m) {
 
     py::class_<GridModel>(m, "GridModel")
         .def(py::init<>())
+        .def("copy", &GridModel::copy)
         // general parameters
 
         // init the grid
@@ -51,6 +88,7 @@ PYBIND11_MODULE(lightsim2grid_cpp, m) {
         .def("init_generators", &GridModel::init_generators)
         .def("init_loads", &GridModel::init_loads)
         .def("add_gen_slackbus", &GridModel::add_gen_slackbus)
+        .def("init_from_ppc", &GridModel::init_from_ppc)
 
         // modify the grid
         .def("deactivate_bus", &GridModel::deactivate_bus)
@@ -95,6 +133,37 @@ PYBIND11_MODULE(lightsim2grid_cpp, m) {
         // get back the results
         .def("get_Va", &GridModel::get_Va)
         .def("get_Vm", &GridModel::get_Vm)
+        .def("get_nb_iter", &GridModel::get_nb_iter)
+        .def("get_timers", &GridModel::get_timers)
+        .def("set_profiling", &GridModel::set_profiling)  // cumulated time and number of calls of each phase of the powerflows
+        .def("get_profiling", &GridModel::get_profiling)
+        .def("reset_profile", &GridModel::reset_profile)
+        .def("get_profile", &GridModel::get_profile)  // {phase: (time, number of calls)}
+        .def("set_trace", &GridModel::set_trace)  // see KLUSolver
+        .def("get_trace_enabled", &GridModel::get_trace_enabled)
+        .def("get_trace", &get_trace_array<GridModel>)
+        .def("set_chord", &GridModel::set_chord, py::arg("chord"), py::arg("threshold") = 0.2)
+        .def("set_divergence_detection", &GridModel::set_divergence_detection, py::arg("nb_growth") = 2, py::arg("vm_min") = 0., py::arg("vm_max") = 3.)
+        .def("set_line_search", &GridModel::set_line_search, py::arg("line_search"), py::arg("max_backtrack") = 4)
+        .def("set_linear_solver", &GridModel::set_linear_solver)  // see LinearSolverType
+        .def("get_linear_solver", &GridModel::get_linear_solver)
+        .def("set_klu_options", &GridModel::set_klu_options, py::arg("ordering") = 0, py::arg("btf") = 1, py::arg("scale") = 2)  // see KLUSolver
+        .def("get_klu_options", &GridModel::get_klu_options)
+        .def("set_nb_thread", &GridModel::set_nb_thread, py::arg("nb_thread"), py::arg("min_size") = 5000)  // threads inside one powerflow of the large grids
+        .def("get_nb_thread", &GridModel::get_nb_thread)
+        .def("autotune_klu", &GridModel::autotune_klu, py::arg("nb_run") = 10)  // after a converged ac powerflow
+        .def("set_small_grid_threshold", &GridModel::set_small_grid_threshold)  // dense LU decomposition for the grids with at most this number of buses
+        .def("get_small_grid_threshold", &GridModel::get_small_grid_threshold)
+        .def("get_linear_solver_used", &GridModel::get_linear_solver_used)
+        .def("get_solver_error", &GridModel::get_solver_error)
+        .def("get_sensitivities", &GridModel::get_sensitivities)  // dV_dP, dV_dQ and dP_dP (flows) at the last ac powerflow
+        .def("change_topology", &GridModel::change_topology)
+        .def("simulate_topologies", &GridModel::simulate_topologies, py::call_guard<py::gil_scoped_release>())  // evaluate many topologies in parallel
+        .def("get_nb_components", &GridModel::get_nb_components)  // connected components found at the last powerflow
+        .def("get_bus_components", &GridModel::get_bus_components)
+        .def("get_island_status", &GridModel::get_island_status)  // 0: connected, 1: islands with generators, 2: island without generator
+        .def("set_solve_islands", &GridModel::set_solve_islands)  // solve each component with its own reference bus
+        .def("get_solve_islands", &GridModel::get_solve_islands)
 
         .def("get_loads_res", &GridModel::get_loads_res)
         .def("get_loads_status", &GridModel::get_loads_status)